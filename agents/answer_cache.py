@@ -0,0 +1,162 @@
+from config.settings import settings
+from config.constants import PROMPT_VERSION
+from .model_pool import get_model_pool
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import threading
+import hashlib
+import pickle
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored entry format or the embedded question text changes
+# (2: questions are embedded as asked rather than normalised)
+CACHE_VERSION = "2"
+
+# Settings that change the answer for the same files and question; part of the corpus key
+ANSWER_SETTINGS = (
+    "OLLAMA_MODEL", "OLLAMA_EMBEDDING_MODEL",
+    "CHUNK_SIZE", "CHUNK_OVERLAP",
+    "VECTOR_SEARCH_K", "HYBRID_RETRIEVER_WEIGHTS",
+    "RERANKER_ENABLED", "RERANKER_BACKEND", "RERANKER_MODEL", "RERANKER_TOP_N",
+    "VERIFICATION_OUTPUT_FORMAT", "VERIFICATION_STRATEGY", "MAX_RESEARCH_ITERATIONS",
+)
+
+class AnswerCache:
+    """
+    Persistent cache of workflow answers per corpus.
+
+    Entries are grouped by a corpus key derived from the file-set hash, the prompt
+    version and the settings that shape answers (models, chunking, retrieval,
+    reranking, verification), so any change to them lands in a fresh namespace.
+    Only verified answers are stored. Within a corpus, questions hit on an exact
+    (normalised) match or on a near-paraphrase above the similarity threshold.
+    """
+
+    def __init__(self, embeddings=None):
+        self.cache_dir = Path(settings.ANSWER_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.embeddings = embeddings or get_model_pool().get_embeddings()
+        self.similarity_threshold = settings.ANSWER_CACHE_SIMILARITY
+        self.max_entries = settings.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl = timedelta(days=settings.ANSWER_CACHE_TTL_DAYS)
+        self._corpora: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self.prune()
+
+    def corpus_key(self, file_hashes) -> str:
+        """Namespace for a file set under the current prompt version and answer-shaping settings."""
+        parts = sorted(file_hashes) + [PROMPT_VERSION, CACHE_VERSION]
+        parts += [f"{name}={getattr(settings, name)}" for name in ANSWER_SETTINGS]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def embed(self, question: str) -> List[float]:
+        # Same text the retriever embeds, so the shared query-vector cache is reused
+        return self.embeddings.embed_query(question)
+
+    def lookup(self, corpus_key: str, question: str, embedding: Optional[List[float]] = None) -> Optional[Dict]:
+        """Return the cached answer for an exact or paraphrased question, or None."""
+        normalized = self._normalize(question)
+        with self._lock:
+            entries = self._entries(corpus_key)
+            if not entries:
+                return None
+
+            match, match_type = None, None
+            for entry in entries:
+                if entry["normalized"] == normalized:
+                    match, match_type = entry, "exact"
+                    break
+
+            if match is None and embedding is not None:
+                matrix = np.asarray([entry["embedding"] for entry in entries], dtype=np.float32)
+                query = np.asarray(embedding, dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+                scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    match, match_type = entries[best], "semantic"
+
+            if match is None:
+                return None
+
+            match["last_hit"] = datetime.now().timestamp()
+            logger.info(f"Answer cache {match_type} hit for question '{question}'")
+            return {
+                "draft_answer": match["draft_answer"],
+                "verification_report": match["verification_report"],
+                "verified": match.get("verified", False),
+                "cache_hit": match_type
+            }
+
+    def store(self, corpus_key: str, question: str, result: Dict, embedding: List[float]):
+        """Add an answer to the corpus namespace, evicting least recently used entries."""
+        now = datetime.now().timestamp()
+        normalized = self._normalize(question)
+        with self._lock:
+            entries = [e for e in self._entries(corpus_key) if e["normalized"] != normalized]
+            entries.append({
+                "question": question,
+                "normalized": normalized,
+                "embedding": list(embedding),
+                "draft_answer": result["draft_answer"],
+                "verification_report": result["verification_report"],
+                "verified": result.get("verified", False),
+                "created": now,
+                "last_hit": now
+            })
+            if len(entries) > self.max_entries:
+                entries.sort(key=lambda e: e["last_hit"], reverse=True)
+                entries = entries[:self.max_entries]
+            self._corpora[corpus_key] = entries
+            self._save(corpus_key, entries)
+
+    def invalidate(self, corpus_key: str):
+        """Drop every cached answer for a corpus."""
+        with self._lock:
+            self._corpora.pop(corpus_key, None)
+            self._cache_path(corpus_key).unlink(missing_ok=True)
+
+    def prune(self):
+        """Remove corpus namespaces that have not been written within the TTL."""
+        cutoff = datetime.now() - self.ttl
+        for cache_path in self.cache_dir.glob("*.pkl"):
+            if datetime.fromtimestamp(cache_path.stat().st_mtime) < cutoff:
+                logger.info(f"Removing expired answer cache: {cache_path.name}")
+                cache_path.unlink(missing_ok=True)
+
+    def _entries(self, corpus_key: str) -> List[Dict]:
+        """Load a corpus namespace (once) and drop entries older than the TTL."""
+        if corpus_key not in self._corpora:
+            cache_path = self._cache_path(corpus_key)
+            entries = []
+            if cache_path.exists():
+                try:
+                    with open(cache_path, "rb") as f:
+                        entries = pickle.load(f)["entries"]
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable answer cache {cache_path.name}: {e}")
+            self._corpora[corpus_key] = entries
+
+        cutoff = (datetime.now() - self.ttl).timestamp()
+        entries = [e for e in self._corpora[corpus_key] if e["created"] >= cutoff]
+        self._corpora[corpus_key] = entries
+        return entries
+
+    def _save(self, corpus_key: str, entries: List[Dict]):
+        cache_path = self._cache_path(corpus_key)
+        tmp_path = cache_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"timestamp": datetime.now().timestamp(), "entries": entries}, f)
+        tmp_path.replace(cache_path)
+
+    def _cache_path(self, corpus_key: str) -> Path:
+        return self.cache_dir / f"{corpus_key}.pkl"
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return re.sub(r"\s+", " ", question.strip().lower()).rstrip("?.! ")
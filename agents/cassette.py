@@ -0,0 +1,221 @@
+from config.settings import settings
+from pathlib import Path
+from typing import Dict, List
+import threading
+import asyncio
+import atexit
+import hashlib
+import base64
+import gzip
+import json
+import time
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Request fields that do not change the response and would break replay matching
+VOLATILE_FIELDS = ("keep_alive",)
+
+# Cassettes already started by this process; later transports for one continue it
+_recording_paths = set()
+
+class CassetteMissError(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+class CassetteTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport that records Ollama requests and responses to a cassette, or replays them.
+
+    Installed through ModelClientPool.client_kwargs(), so every chat, embedding
+    and warm-up call goes through it. The cassette is JSON lines (gzip-compressed
+    when the path ends in .gz), one interaction per line, keyed by a hash of the
+    method, path and canonical request body. Repeated identical requests are
+    replayed in recorded order, the last one repeating once they run out.
+
+    `latency_scale` replays each response after its recorded duration times the
+    scale (0 answers immediately); `latency` adds a fixed delay on top.
+
+    Record mode starts a new cassette (an existing file is overwritten; a later
+    transport for the same path in this process continues it) and keeps one
+    writer open until `finish()` or interpreter exit. Closing a client does
+    not end the recording, since every client shares this transport. While
+    recording, the LLM response cache, the answer cache and the persistent
+    embedding store are bypassed (see `recording()`): a call they answered
+    would never reach the cassette, and replaying with a colder cache would
+    then miss it.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0, latency: float = 0.0,
+                 limits: httpx.Limits = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict]] = {}
+        self._positions: Dict[str, int] = {}
+        self.recorded = 0
+        self.replayed = 0
+        self._writer = None
+        if mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            resolved = self.path.resolve()
+            self._writer = self._open("a" if resolved in _recording_paths else "w")
+            _recording_paths.add(resolved)
+            atexit.register(self.finish)
+            self._sync = httpx.HTTPTransport(limits=limits or httpx.Limits())
+            self._async = httpx.AsyncHTTPTransport(limits=limits or httpx.Limits())
+        else:
+            self._load()
+
+    @staticmethod
+    def request_key(request: httpx.Request) -> str:
+        body = request.content
+        try:
+            payload = json.loads(body) if body else None
+            if isinstance(payload, dict):
+                payload = {k: v for k, v in payload.items() if k not in VOLATILE_FIELDS}
+            body = json.dumps(payload, sort_keys=True).encode()
+        except ValueError:
+            pass
+        digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode() + body)
+        return digest.hexdigest()
+
+    def _open(self, mode: str):
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self):
+        if not self.path.exists():
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions.setdefault(interaction["key"], []).append(interaction)
+        logger.info(f"Loaded {sum(map(len, self._interactions.values()))} interactions from cassette {self.path}")
+
+    # Replay
+
+    def _next_interaction(self, request: httpx.Request) -> Dict:
+        key = self.request_key(request)
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMissError(f"No recorded response for {request.method} {request.url.path} (key {key[:12]})")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.replayed += 1
+        return recorded[min(position, len(recorded) - 1)]
+
+    def _delay(self, interaction: Dict) -> float:
+        return interaction.get("duration", 0.0) * self.latency_scale + self.latency
+
+    @staticmethod
+    def _response(interaction: Dict, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            interaction["status"],
+            headers={"content-type": interaction.get("content_type", "application/json")},
+            content=base64.b64decode(interaction["body"]) if interaction.get("binary") else interaction["body"].encode(),
+            request=request,
+        )
+
+    # Record
+
+    def _record(self, request: httpx.Request, response: httpx.Response, content: bytes, duration: float):
+        # Stored decoded, so replay does not depend on the server's content encoding
+        content = httpx.Response(response.status_code, headers=response.headers, content=content).content
+        try:
+            body, binary = content.decode("utf-8"), False
+        except UnicodeDecodeError:
+            body, binary = base64.b64encode(content).decode(), True
+        interaction = {
+            "key": self.request_key(request),
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", ""),
+            "duration": round(duration, 4),
+            "body": body,
+        }
+        if binary:
+            interaction["binary"] = True
+        with self._lock:
+            if self._writer is None:
+                logger.warning(f"Cassette {self.path} is finished; not recording {request.url.path}")
+                return
+            self._writer.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+            # Flushed per interaction, so an interrupted run keeps what it recorded
+            self._writer.flush()
+            self.recorded += 1
+
+    # httpx transport interface
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == "replay":
+            interaction = self._next_interaction(request)
+            time.sleep(self._delay(interaction))
+            return self._response(interaction, request)
+        request.read()
+        started = time.perf_counter()
+        response = self._sync.handle_request(request)
+        try:
+            # Streamed (NDJSON) bodies are read in full, then handed back as one block
+            content = b"".join(response.stream)
+        finally:
+            response.close()
+        self._record(request, response, content, time.perf_counter() - started)
+        return httpx.Response(response.status_code, headers=response.headers, content=content, request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == "replay":
+            interaction = self._next_interaction(request)
+            await asyncio.sleep(self._delay(interaction))
+            return self._response(interaction, request)
+        await request.aread()
+        started = time.perf_counter()
+        response = await self._async.handle_async_request(request)
+        try:
+            content = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+        self._record(request, response, content, time.perf_counter() - started)
+        return httpx.Response(response.status_code, headers=response.headers, content=content, request=request)
+
+    def close(self):
+        if self.mode == "record":
+            self._sync.close()
+
+    async def aclose(self):
+        if self.mode == "record":
+            await self._async.aclose()
+
+    def finish(self):
+        """Close the cassette being recorded."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+def recording() -> bool:
+    """True when Ollama traffic is being recorded, so caches that would skip requests must stay off."""
+    return settings.OLLAMA_CASSETTE_MODE == "record"
+
+def cassette_from_settings(limits: httpx.Limits = None):
+    """
+    The transport configured by OLLAMA_CASSETTE_MODE, or None when recording/replay is off.
+    In record mode the pool and workflow also leave their caches out (see `recording()`).
+    """
+    if not settings.OLLAMA_CASSETTE_MODE:
+        return None
+    return CassetteTransport(
+        settings.OLLAMA_CASSETTE_PATH,
+        mode=settings.OLLAMA_CASSETTE_MODE,
+        latency_scale=settings.OLLAMA_CASSETTE_LATENCY_SCALE,
+        latency=settings.OLLAMA_CASSETTE_LATENCY,
+        limits=limits,
+    )
@@ -0,0 +1,163 @@
+from config.settings import settings
+from .model_pool import get_model_pool, ModelBusyError
+from .verification_agent import VerificationResult
+from utils import progress, metrics
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from langchain.schema import Document
+import threading
+import hashlib
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+VALID_VERDICTS = {"SUPPORTED", "UNSUPPORTED", "CONTRADICTED"}
+
+class ClaimVerifier:
+    """
+    Verifies an answer claim by claim instead of in one large prompt.
+
+    The answer is split into atomic claims, each claim is matched to its own top
+    evidence chunks with the hybrid retriever, and claims are verified in small
+    batches in parallel. Verdicts are cached per (claim, evidence), so after a
+    re-research pass only new or changed claims go back to the model.
+    """
+
+    def __init__(self):
+        self.model = get_model_pool().get_chat_model(temperature=0.0, format="json")
+        self._verdicts: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.OLLAMA_MAX_CONCURRENT_PER_MODEL,
+            thread_name_prefix="claim-verifier"
+        )
+
+    def split_claims(self, answer: str) -> List[str]:
+        """Split an answer into sentence-level claims, dropping headings and fragments."""
+        claims = []
+        for line in answer.splitlines():
+            line = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+            for sentence in re.split(r"(?<=[.!?])\s+", line):
+                sentence = sentence.strip().strip("*").strip()
+                if len(sentence.split()) >= settings.CLAIM_MIN_WORDS and not sentence.endswith(":"):
+                    claims.append(sentence)
+        # Keep order, drop repeats
+        return list(dict.fromkeys(claims))[:settings.CLAIM_MAX_CLAIMS]
+
+    def verify(self, answer: str, retriever) -> Tuple[VerificationResult, List[Document]]:
+        """Verify each claim against its own evidence; returns the result and the evidence used."""
+        claims = self.split_claims(answer)
+        if not claims:
+            return VerificationResult(parsed=False, additional_details="No verifiable claims found in the answer."), []
+
+        evidence = list(self._executor.map(
+            progress.bind(lambda claim: retriever.invoke(claim)[:settings.CLAIM_EVIDENCE_K]), claims
+        ))
+
+        verdicts: Dict[int, Dict] = {}
+        pending = []
+        for i, (claim, docs) in enumerate(zip(claims, evidence)):
+            key = self._cache_key(claim, docs)
+            with self._lock:
+                cached = self._verdicts.get(key)
+                if cached is not None:
+                    self._verdicts.move_to_end(key)
+            if cached is not None:
+                verdicts[i] = cached
+            else:
+                pending.append((i, key, claim, docs))
+
+        logger.info(f"Claim verification: {len(claims)} claims, {len(claims) - len(pending)} cached, {len(pending)} to verify")
+
+        batch_size = settings.CLAIM_BATCH_SIZE
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        for batch, batch_verdicts in zip(batches, self._executor.map(progress.bind(self._verify_batch), batches)):
+            for (i, key, _, _), verdict in zip(batch, batch_verdicts):
+                verdicts[i] = verdict
+                if verdict["verdict"] in VALID_VERDICTS:
+                    self._remember(key, verdict)
+
+        used_docs = list({doc.page_content: doc for docs in evidence for doc in docs}.values())
+        return self._aggregate(claims, verdicts), used_docs
+
+    def _verify_batch(self, batch: List) -> List[Dict]:
+        """Ask the model for one verdict per claim in the batch."""
+        sections = []
+        for n, (_, _, claim, docs) in enumerate(batch, start=1):
+            passages = "\n".join(f"- {doc.page_content}" for doc in docs) or "- (no evidence found)"
+            sections.append(f"Claim {n}: {claim}\nEvidence for claim {n}:\n{passages}")
+
+        prompt = f"""
+        You are an AI assistant verifying individual claims against evidence passages.
+
+        **Instructions:**
+        - For each claim, decide using only its evidence passages whether it is SUPPORTED, UNSUPPORTED or CONTRADICTED.
+        - Respond with a JSON object: {{"verdicts": [{{"claim": <claim number>, "verdict": "SUPPORTED|UNSUPPORTED|CONTRADICTED", "note": "<short reason>"}}]}}
+        - Include exactly one verdict per claim.
+
+        {chr(10).join(sections)}
+
+        **Respond ONLY with the JSON object.**
+        """
+
+        unknown = [{"verdict": "UNKNOWN", "note": ""} for _ in batch]
+        try:
+            with metrics.AGENT_LLM_SECONDS.labels(agent="claims").time():
+                response = self.model.invoke(prompt)
+            data = json.loads(response.content)
+        except ModelBusyError:
+            raise
+        except Exception as e:
+            logger.warning(f"Claim batch verification failed: {e}")
+            return unknown
+
+        results = list(unknown)
+        for item in data.get("verdicts", []) if isinstance(data, dict) else []:
+            try:
+                n = int(item.get("claim")) - 1
+            except (TypeError, ValueError):
+                continue
+            verdict = str(item.get("verdict", "")).strip().upper()
+            if 0 <= n < len(batch) and verdict in VALID_VERDICTS:
+                results[n] = {"verdict": verdict, "note": str(item.get("note") or "")}
+        return results
+
+    def _aggregate(self, claims: List[str], verdicts: Dict[int, Dict]) -> VerificationResult:
+        """Fold per-claim verdicts into a single verification result."""
+        unsupported = [claims[i] for i in sorted(verdicts) if verdicts[i]["verdict"] == "UNSUPPORTED"]
+        contradictions = [claims[i] for i in sorted(verdicts) if verdicts[i]["verdict"] == "CONTRADICTED"]
+        supported = [claims[i] for i in sorted(verdicts) if verdicts[i]["verdict"] == "SUPPORTED"]
+        unknown = len(claims) - len(supported) - len(unsupported) - len(contradictions)
+
+        if unknown == len(claims):
+            return VerificationResult(parsed=False, additional_details="Failed to parse the model's claim verdicts.")
+
+        details = f"{len(supported)}/{len(claims)} claims supported"
+        if unknown:
+            details += f", {unknown} could not be verified"
+        # A claim the model gave no verdict for is not evidence that the answer holds
+        return VerificationResult(
+            supported=not unsupported and not contradictions and not unknown,
+            unsupported_claims=unsupported,
+            contradictions=contradictions,
+            # As in the single-prompt check, relevance is about the documents, not correctness:
+            # the answer is on topic when its evidence speaks to its claims, for or against
+            relevant=bool(supported or contradictions),
+            additional_details=details + ".",
+        )
+
+    def _remember(self, key: str, verdict: Dict):
+        with self._lock:
+            self._verdicts[key] = verdict
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > settings.CLAIM_CACHE_SIZE:
+                self._verdicts.popitem(last=False)
+
+    @staticmethod
+    def _cache_key(claim: str, docs: List[Document]) -> str:
+        normalized = re.sub(r"\s+", " ", claim.lower()).strip()
+        evidence = "|".join(hashlib.sha256(doc.page_content.encode()).hexdigest() for doc in docs)
+        return hashlib.sha256(f"{normalized}||{evidence}".encode()).hexdigest()
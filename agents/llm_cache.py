@@ -0,0 +1,167 @@
+from langchain_core.messages import AIMessage
+from config.settings import settings
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+import threading
+import hashlib
+import pickle
+import json
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """
+    Disk-backed LRU cache of chat completions.
+
+    One pickle file per entry; file modification time doubles as the LRU clock so
+    recency survives restarts. Size is bounded by LLM_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = None):
+        self.cache_dir = Path(cache_dir or settings.LLM_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self._lock = threading.Lock()
+        # Oldest first; rebuilt from file mtimes on start-up
+        files = sorted(self.cache_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+        self._index = OrderedDict((p.stem, None) for p in files)
+
+    def make_key(self, model: str, options: Dict, prompt) -> str:
+        """Hash of model, generation options and the whitespace-normalised prompt."""
+        if isinstance(prompt, str):
+            normalized_prompt = re.sub(r"\s+", " ", prompt).strip()
+        else:
+            normalized_prompt = [
+                (getattr(m, "type", type(m).__name__), re.sub(r"\s+", " ", str(getattr(m, "content", m))).strip())
+                for m in prompt
+            ]
+        payload = json.dumps(
+            {"model": model, "options": options, "prompt": normalized_prompt},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        cache_path = self.cache_dir / f"{key}.pkl"
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        # File I/O outside the lock, so concurrent lookups do not queue behind each other
+        try:
+            with open(cache_path, "rb") as f:
+                content = pickle.load(f)["content"]
+            os.utime(cache_path)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable LLM cache entry {key}: {e}")
+            with self._lock:
+                self._index.pop(key, None)
+                self.misses += 1
+            cache_path.unlink(missing_ok=True)
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, key: str, content: str):
+        cache_path = self.cache_dir / f"{key}.pkl"
+        # Written aside and renamed, so a concurrent get never reads a partial entry
+        tmp_path = cache_path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"timestamp": datetime.now().timestamp(), "content": content}, f)
+        tmp_path.replace(cache_path)
+        evicted = []
+        with self._lock:
+            self._index[key] = None
+            self._index.move_to_end(key)
+            while len(self._index) > self.max_entries:
+                evicted.append(self._index.popitem(last=False)[0])
+        for oldest in evicted:
+            (self.cache_dir / f"{oldest}.pkl").unlink(missing_ok=True)
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "entries": len(self._index),
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+class CachedChatModel:
+    """
+    Wraps a ChatOllama so deterministic (temperature 0) calls are served from the cache.
+
+    Calls at any other temperature go straight to the model. Other attributes are
+    delegated to the wrapped model.
+    """
+
+    def __init__(self, model, cache: LLMResponseCache = None):
+        self.model = model
+        self.cache = cache or get_llm_cache()
+
+    def invoke(self, prompt, **kwargs):
+        if getattr(self.model, "temperature", None) != 0:
+            self.cache.record_bypass()
+            return self.model.invoke(prompt, **kwargs)
+
+        options = {
+            "temperature": 0,
+            "format": getattr(self.model, "format", None),
+            "num_ctx": getattr(self.model, "num_ctx", None),
+            "num_predict": getattr(self.model, "num_predict", None),
+            "seed": getattr(self.model, "seed", None),
+            "call_kwargs": kwargs,
+        }
+        key = self.cache.make_key(self.model_name, options, prompt)
+        content = self.cache.get(key)
+        if content is not None:
+            logger.debug(f"LLM cache hit ({self.model_name})")
+            return AIMessage(content=content, response_metadata={"cache_hit": True})
+
+        response = self.model.invoke(prompt, **kwargs)
+        content = getattr(response, "content", None)
+        if isinstance(content, str) and content.strip():
+            self.cache.put(key, content)
+        return response
+
+    @property
+    def model_name(self) -> str:
+        """Name of the underlying Ollama model, through any wrappers (e.g. GatedChatModel)."""
+        model = self.model
+        while not isinstance(model, str) and hasattr(model, "model"):
+            model = model.model
+        return str(model)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    """Process-wide LLM response cache shared by all agents."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache()
+        return _llm_cache
+
+def with_llm_cache(model):
+    """Wrap a chat model in the shared response cache when caching is enabled."""
+    return CachedChatModel(model) if settings.LLM_CACHE_ENABLED else model
@@ -0,0 +1,179 @@
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+from config.settings import settings
+from .llm_cache import with_llm_cache
+from .cassette import cassette_from_settings, recording
+from retriever.embeddings import CachingEmbeddings, EmbeddingStore
+from utils import tracing, metrics
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict
+import threading
+import httpx
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ModelBusyError(RuntimeError):
+    """Raised when the Ollama server is saturated and a call cannot get a slot quickly."""
+
+class GatedChatModel:
+    """Runs each call inside a generation slot from the pool; other attributes are delegated."""
+
+    def __init__(self, model: ChatOllama, pool: "ModelClientPool"):
+        self.model = model
+        self.pool = pool
+
+    def invoke(self, prompt, **kwargs):
+        attributes = {"gen_ai.system": "ollama", "gen_ai.request.model": self.model.model}
+        with tracing.span("llm.generate", attributes) as current:
+            queued_at = time.monotonic()
+            with self.pool.generation_slot(self.model.model):
+                current.set_attribute("llm.queue_wait_ms", round((time.monotonic() - queued_at) * 1000, 1))
+                with metrics.LLM_REQUEST_SECONDS.labels(model=self.model.model).time():
+                    response = self.model.invoke(prompt, **kwargs)
+            tracing.record_llm_usage(current, response)
+            usage = getattr(response, "usage_metadata", None) or {}
+            for kind, key in (("prompt", "input_tokens"), ("completion", "output_tokens")):
+                if usage.get(key):
+                    metrics.LLM_TOKENS.labels(model=self.model.model, kind=kind).inc(usage[key])
+            return response
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+class ModelClientPool:
+    """
+    Central factory for Ollama chat and embedding clients.
+
+    Identical model configurations share one client (and so one keep-alive HTTP
+    connection pool). Generations are bounded by a global semaphore plus a
+    per-model one; callers queue for a slot up to OLLAMA_QUEUE_TIMEOUT seconds,
+    and once OLLAMA_MAX_QUEUE_PER_MODEL callers are already waiting new calls
+    fail fast with ModelBusyError instead of piling up timeouts.
+    """
+
+    def __init__(self):
+        self._global_slots = threading.BoundedSemaphore(settings.OLLAMA_MAX_CONCURRENT_GENERATIONS)
+        self._model_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._rejected: Dict[str, int] = defaultdict(int)
+        self._chat_models = {}
+        self._embeddings = {}
+        # Recording bypasses the persistent caches, so every request reaches the cassette
+        self._embedding_store = EmbeddingStore() if settings.EMBEDDING_CACHE_ENABLED and not recording() else None
+        # One record/replay transport shared by all clients, when OLLAMA_CASSETTE_MODE is set
+        self._cassette = cassette_from_settings(self._limits())
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY,
+        )
+
+    def client_kwargs(self) -> Dict:
+        """httpx options shared by every Ollama client."""
+        kwargs = {"limits": self._limits(), "timeout": settings.OLLAMA_REQUEST_TIMEOUT}
+        if self._cassette is not None:
+            # httpx ignores `limits` when a transport is given; the recorder applies them itself
+            kwargs["transport"] = self._cassette
+        return kwargs
+
+    def get_chat_model(self, temperature=None, model: str = None, **options):
+        """Return the shared, gated (and, at temperature 0 and not recording, cached) chat model for a configuration."""
+        model = model or settings.OLLAMA_MODEL
+        key = (model, temperature, json.dumps(options, sort_keys=True))
+        with self._lock:
+            if key not in self._chat_models:
+                chat = ChatOllama(
+                    base_url=settings.OLLAMA_BASE_URL,
+                    model=model,
+                    temperature=temperature,
+                    keep_alive=settings.OLLAMA_KEEP_ALIVE,
+                    client_kwargs=self.client_kwargs(),
+                    **options
+                )
+                gated = GatedChatModel(chat, self)
+                self._chat_models[key] = gated if recording() else with_llm_cache(gated)
+            return self._chat_models[key]
+
+    def get_embeddings(self, model: str = None) -> CachingEmbeddings:
+        """Return the shared embeddings client for a model, backed by the query and document caches."""
+        model = model or settings.OLLAMA_EMBEDDING_MODEL
+        with self._lock:
+            if model not in self._embeddings:
+                self._embeddings[model] = CachingEmbeddings(OllamaEmbeddings(
+                    base_url=settings.OLLAMA_BASE_URL,
+                    model=model,
+                    client_kwargs=self.client_kwargs(),
+                ), store=self._embedding_store)
+            return self._embeddings[model]
+
+    @contextmanager
+    def generation_slot(self, model: str):
+        """Hold a per-model and a global generation slot for the duration of a call."""
+        with self._lock:
+            if self._waiting[model] >= settings.OLLAMA_MAX_QUEUE_PER_MODEL:
+                self._rejected[model] += 1
+                metrics.MODEL_REJECTED.labels(model=model).inc()
+                raise ModelBusyError(f"Model '{model}' is busy ({self._waiting[model]} requests queued). Please retry shortly.")
+            self._waiting[model] += 1
+            metrics.MODEL_WAITING.labels(model=model).inc()
+            model_slots = self._model_slots.setdefault(
+                model, threading.BoundedSemaphore(settings.OLLAMA_MAX_CONCURRENT_PER_MODEL)
+            )
+
+        deadline = time.monotonic() + settings.OLLAMA_QUEUE_TIMEOUT
+        acquired_model = acquired_global = False
+        try:
+            acquired_model = model_slots.acquire(timeout=settings.OLLAMA_QUEUE_TIMEOUT)
+            if acquired_model:
+                acquired_global = self._global_slots.acquire(timeout=max(0.0, deadline - time.monotonic()))
+        finally:
+            with self._lock:
+                self._waiting[model] -= 1
+                metrics.MODEL_WAITING.labels(model=model).dec()
+                if not (acquired_model and acquired_global):
+                    self._rejected[model] += 1
+                    metrics.MODEL_REJECTED.labels(model=model).inc()
+
+        if not (acquired_model and acquired_global):
+            if acquired_model:
+                model_slots.release()
+            raise ModelBusyError(f"Timed out waiting for a '{model}' generation slot. Please retry shortly.")
+
+        with self._lock:
+            self._in_flight[model] += 1
+        metrics.MODEL_IN_FLIGHT.labels(model=model).inc()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[model] -= 1
+            metrics.MODEL_IN_FLIGHT.labels(model=model).dec()
+            self._global_slots.release()
+            model_slots.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": dict(self._in_flight),
+                "waiting": dict(self._waiting),
+                "rejected": dict(self._rejected),
+            }
+
+_model_pool = None
+_model_pool_lock = threading.Lock()
+
+def get_model_pool() -> ModelClientPool:
+    """Process-wide model client pool."""
+    global _model_pool
+    with _model_pool_lock:
+        if _model_pool is None:
+            _model_pool = ModelClientPool()
+        return _model_pool
@@ -1,38 +1,220 @@
-from langchain_ollama import ChatOllama
 from config.settings import settings
+from .model_pool import get_model_pool, ModelBusyError
+from utils import metrics
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import threading
+import hashlib
+import json
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Words ignored when measuring how much of the question the retrieved chunks cover
+STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "what", "which", "who", "whom", "when", "where",
+    "why", "how", "does", "did", "with", "from", "that", "this", "these", "those", "about",
+    "into", "also", "there", "their", "have", "has", "had", "all", "any", "can", "its", "our",
+}
+
 class RelevanceChecker:
     def __init__(self):
         # Initialize the Ollama ChatModel
-        self.model = ChatOllama(
-            base_url=settings.OLLAMA_BASE_URL,
-            model=settings.OLLAMA_MODEL,
-            temperature=0,
-        )
+        self.model = get_model_pool().get_chat_model(temperature=0)
+        # Embeddings for the fast similarity tier in front of the LLM
+        self.embeddings = get_model_pool().get_embeddings()
+        self.fast_tier_enabled = settings.RELEVANCE_FAST_TIER
+        self.can_answer_threshold = settings.RELEVANCE_CAN_ANSWER_THRESHOLD
+        self.no_match_threshold = settings.RELEVANCE_NO_MATCH_THRESHOLD
+        self.outcome_log_path = Path(settings.RELEVANCE_LOG_PATH)
+        self.calibration_path = Path(settings.RELEVANCE_CALIBRATION_PATH)
+        self._chunk_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_calibration()
 
     def check(self, question: str, retriever, k=3) -> str:
         """
-        1. Retrieve the top-k document chunks from the global retriever.
-        2. Combine them into a single text string.
-        3. Pass that text + question to the LLM for classification.
+        Classify how well the retrieved chunks cover the question.
 
         Returns: "CAN_ANSWER", "PARTIAL", or "NO_MATCH".
         """
+        return self.classify(question, retriever, k)["classification"]
+
+    def classify(self, question: str, retriever, k=3) -> Dict:
+        """
+        1. Retrieve the top-k document chunks from the global retriever.
+        2. Score them against the question (cosine similarity + term coverage).
+        3. Clear cases are decided from the scores; only the ambiguous band
+           is passed to the LLM for classification.
+
+        Returns a dict with the classification, the path taken ("empty", "fast" or "llm")
+        and the similarity scores used.
+        """
 
-        logger.debug(f"RelevanceChecker.check called with question='{question}' and k={k}")
+        logger.debug("RelevanceChecker.classify called with question=%r and k=%d", question[:200], k)
 
         # Retrieve doc chunks from the ensemble retriever
         top_docs = retriever.invoke(question)
         if not top_docs:
             logger.debug("No documents returned from retriever.invoke(). Classifying as NO_MATCH.")
+            return {"classification": "NO_MATCH", "path": "empty", "similarity": 0.0, "coverage": 0.0}
+
+        top_docs = top_docs[:k]
+        similarity, coverage = None, None
+
+        if self.fast_tier_enabled:
+            try:
+                similarity, coverage = self._score(question, top_docs[:settings.RELEVANCE_FAST_TIER_K])
+            except Exception as e:
+                logger.warning(f"Fast relevance tier failed, falling back to the LLM: {e}")
+            else:
+                fast_label = self._fast_classification(similarity, coverage)
+                if fast_label:
+                    logger.debug("Fast tier classified as '%s' (similarity=%.3f, coverage=%.2f).", fast_label, similarity, coverage)
+                    return self._record(question, fast_label, "fast", similarity, coverage)
+
+        classification = self._llm_classification(question, top_docs)
+        return self._record(question, classification, "llm", similarity, coverage)
+
+    def _fast_classification(self, similarity: float, coverage: float):
+        """Return a label for clear-cut scores, or None when the LLM should decide."""
+        if similarity >= self.can_answer_threshold and coverage >= settings.RELEVANCE_MIN_COVERAGE:
+            return "CAN_ANSWER"
+        if similarity <= self.no_match_threshold and coverage < settings.RELEVANCE_MIN_COVERAGE:
             return "NO_MATCH"
+        return None
+
+    def _score(self, question: str, docs: List) -> tuple:
+        """Max query-to-chunk cosine similarity and the share of question terms found in the chunks."""
+        query_vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        chunk_vectors = self._embed_chunks([doc.page_content for doc in docs])
+        norms = np.linalg.norm(chunk_vectors, axis=1) * np.linalg.norm(query_vector)
+        similarity = float(np.max(chunk_vectors @ query_vector / np.where(norms == 0, 1.0, norms)))
+
+        terms = {t for t in re.findall(r"[a-z0-9]+", question.lower()) if len(t) > 2 and t not in STOPWORDS}
+        if not terms:
+            return similarity, 0.0
+        chunk_text = " ".join(doc.page_content for doc in docs).lower()
+        chunk_terms = set(re.findall(r"[a-z0-9]+", chunk_text))
+        coverage = len(terms & chunk_terms) / len(terms)
+        return similarity, coverage
+
+    def _embed_chunks(self, texts: List[str]) -> np.ndarray:
+        """Embed chunk texts, reusing vectors for chunks seen on earlier questions."""
+        keys = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._chunk_vectors:
+                    self._chunk_vectors.move_to_end(key)
+                    found[key] = self._chunk_vectors[key]
+        missing = [(key, text) for key, text in zip(keys, texts) if key not in found]
+        if missing:
+            vectors = self.embeddings.embed_documents([text for _, text in missing])
+            with self._lock:
+                for (key, _), vector in zip(missing, vectors):
+                    found[key] = self._chunk_vectors[key] = np.asarray(vector, dtype=np.float32)
+                    self._chunk_vectors.move_to_end(key)
+                while len(self._chunk_vectors) > settings.RELEVANCE_VECTOR_CACHE_SIZE:
+                    self._chunk_vectors.popitem(last=False)
+        return np.stack([found[key] for key in keys])
+
+    def _record(self, question: str, classification: str, path: str, similarity, coverage) -> Dict:
+        """Append the outcome to the relevance log used for threshold calibration."""
+        outcome = {
+            "classification": classification,
+            "path": path,
+            "similarity": similarity,
+            "coverage": coverage,
+        }
+        if similarity is not None:
+            line = json.dumps({
+                "timestamp": datetime.now().isoformat(),
+                "question_hash": hashlib.sha256(question.encode()).hexdigest()[:16],
+                **outcome
+            }) + "\n"
+            try:
+                self.outcome_log_path.parent.mkdir(parents=True, exist_ok=True)
+                with self._lock:
+                    # One rotated file is kept, so calibration still sees recent history
+                    if (self.outcome_log_path.exists()
+                            and self.outcome_log_path.stat().st_size > settings.RELEVANCE_LOG_MAX_BYTES):
+                        self.outcome_log_path.replace(self._rotated_log_path())
+                    with open(self.outcome_log_path, "a", encoding="utf-8") as f:
+                        f.write(line)
+            except OSError as e:
+                logger.warning(f"Could not write relevance outcome log: {e}")
+        return outcome
 
+    def _rotated_log_path(self) -> Path:
+        return self.outcome_log_path.with_name(self.outcome_log_path.name + ".1")
+
+    def calibrate(self, min_samples: int = 50) -> Dict:
+        """
+        Recompute the fast-tier thresholds from LLM-labelled outcomes in the relevance log.
+
+        CAN_ANSWER threshold: just above the highest similarity the LLM still called NO_MATCH.
+        NO_MATCH threshold: just below the lowest similarity the LLM called CAN_ANSWER/PARTIAL.
+        Extreme outliers are ignored (1st/99th percentile).
+        """
+        if not self.outcome_log_path.exists():
+            raise ValueError(f"No relevance log found at {self.outcome_log_path}")
+
+        no_match, relevant = [], []
+        for log_path in (self._rotated_log_path(), self.outcome_log_path):
+            if not log_path.exists():
+                continue
+            with open(log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if row.get("path") != "llm" or row.get("similarity") is None:
+                        continue
+                    (no_match if row["classification"] == "NO_MATCH" else relevant).append(row["similarity"])
+
+        if len(no_match) + len(relevant) < min_samples:
+            raise ValueError(f"Need at least {min_samples} LLM-labelled outcomes, found {len(no_match) + len(relevant)}")
+
+        can_answer_threshold = float(np.percentile(no_match, 99)) + 0.01 if no_match else self.can_answer_threshold
+        no_match_threshold = float(np.percentile(relevant, 1)) - 0.01 if relevant else self.no_match_threshold
+        if no_match_threshold >= can_answer_threshold:
+            # Overlapping distributions: keep an ambiguous band around the midpoint
+            midpoint = (no_match_threshold + can_answer_threshold) / 2
+            no_match_threshold, can_answer_threshold = midpoint - 0.05, midpoint + 0.05
+
+        self.can_answer_threshold = can_answer_threshold
+        self.no_match_threshold = no_match_threshold
+        calibration = {
+            "can_answer_threshold": can_answer_threshold,
+            "no_match_threshold": no_match_threshold,
+            "samples": len(no_match) + len(relevant),
+            "calibrated_at": datetime.now().isoformat(),
+        }
+        self.calibration_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.calibration_path, "w", encoding="utf-8") as f:
+            json.dump(calibration, f, indent=2)
+        logger.info(f"Relevance thresholds calibrated: {calibration}")
+        return calibration
+
+    def _load_calibration(self):
+        """Use calibrated thresholds when a calibration file exists."""
+        if not self.calibration_path.exists():
+            return
+        try:
+            with open(self.calibration_path, "r", encoding="utf-8") as f:
+                calibration = json.load(f)
+            self.can_answer_threshold = calibration["can_answer_threshold"]
+            self.no_match_threshold = calibration["no_match_threshold"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring invalid relevance calibration file: {e}")
+
+    def _llm_classification(self, question: str, top_docs: List) -> str:
+        """Ask the LLM for a CAN_ANSWER / PARTIAL / NO_MATCH label."""
         # Combine the top k chunk texts into one string
-        document_content = "\n\n".join(doc.page_content for doc in top_docs[:k])
+        document_content = "\n\n".join(doc.page_content for doc in top_docs)
 
         # Create a prompt for the LLM to classify relevance
         prompt = f"""
@@ -58,7 +240,10 @@ class RelevanceChecker:
 
         # Call the LLM
         try:
-            response = self.model.invoke(prompt)
+            with metrics.AGENT_LLM_SECONDS.labels(agent="relevance").time():
+                response = self.model.invoke(prompt)
+        except ModelBusyError:
+            raise
         except Exception as e:
             logger.error(f"Error during model inference: {e}")
             return "NO_MATCH"
@@ -66,20 +251,22 @@ class RelevanceChecker:
         # Extract the content from the response
         try:
             llm_response = response.content.strip().upper()
-            logger.debug(f"LLM response: {llm_response}")
+            logger.debug("LLM response: %s", llm_response)
         except AttributeError as e:
             logger.error(f"Unexpected response structure: {e}")
             return "NO_MATCH"
 
-        print(f"Checker response: {llm_response}")
-
         # Validate the response
         valid_labels = {"CAN_ANSWER", "PARTIAL", "NO_MATCH"}
         if llm_response not in valid_labels:
             logger.debug("LLM did not respond with a valid label. Forcing 'NO_MATCH'.")
             classification = "NO_MATCH"
         else:
-            logger.debug(f"Classification recognized as '{llm_response}'.")
+            logger.debug("Classification recognized as '%s'.", llm_response)
             classification = llm_response
 
         return classification
+
+
+if __name__ == "__main__":
+    print(json.dumps(RelevanceChecker().calibrate(), indent=2))
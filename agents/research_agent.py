@@ -1,7 +1,8 @@
-from langchain_ollama import ChatOllama
 from typing import Dict, List
 from langchain.schema import Document
-from config.settings import settings
+from .model_pool import get_model_pool, ModelBusyError
+from utils import metrics
+from utils.logging import logger, truncate, debug_sampled
 import json
 
 
@@ -11,13 +12,11 @@ class ResearchAgent:
         Initialize the research agent with Ollama Gemma2:9b.
         """
         # Initialize the Ollama ChatModel
-        print("Initializing ResearchAgent with Ollama Gemma2:9b...")
-        self.model = ChatOllama(
-            base_url=settings.OLLAMA_BASE_URL,
-            model=settings.OLLAMA_MODEL,
+        logger.debug("Initializing ResearchAgent with Ollama Gemma2:9b...")
+        self.model = get_model_pool().get_chat_model(
             temperature=0.3,           # Controls randomness; lower values make output more deterministic
         )
-        print("Ollama model initialized successfully.")
+        logger.debug("Ollama model initialized successfully.")
 
     def sanitize_response(self, response_text: str) -> str:
         """
@@ -49,37 +48,39 @@ class ResearchAgent:
         """
         Generate an initial answer using the provided documents.
         """
-        print(f"ResearchAgent.generate called with question='{question}' and {len(documents)} documents.")
-
         # Combine the top document contents into one string
         context = "\n\n".join([doc.page_content for doc in documents])
-        print(f"Combined context length: {len(context)} characters.")
+        logger.debug(
+            "ResearchAgent.generate: {documents} documents, {context_chars} context chars",
+            question=truncate(question), documents=len(documents), context_chars=len(context)
+        )
 
         # Create a prompt for the LLM
         prompt = self.generate_prompt(question, context)
-        print("Prompt created for the LLM.")
+        debug_sampled("Research prompt: {prompt}", prompt=truncate(prompt))
 
         # Call the LLM to generate the answer
         try:
-            print("Sending prompt to the model...")
-            response = self.model.invoke(prompt)
-            print("LLM response received.")
+            with metrics.AGENT_LLM_SECONDS.labels(agent="research").time():
+                response = self.model.invoke(prompt)
+        except ModelBusyError:
+            raise
         except Exception as e:
-            print(f"Error during model inference: {e}")
+            logger.error("Error during model inference: {error}", error=str(e))
             raise RuntimeError("Failed to generate answer due to a model error.") from e
 
         # Extract and process the LLM's response
         try:
             llm_response = response.content.strip()
-            print(f"Raw LLM response:\n{llm_response}")
+            debug_sampled("Raw research response: {response}", response=truncate(llm_response))
         except AttributeError as e:
-            print(f"Unexpected response structure: {e}")
+            logger.warning("Unexpected response structure: {error}", error=str(e))
             llm_response = "I cannot answer this question based on the provided documents."
 
         # Sanitize the response
         draft_answer = self.sanitize_response(llm_response) if llm_response else "I cannot answer this question based on the provided documents."
 
-        print(f"Generated answer: {draft_answer}")
+        logger.debug("Generated answer ({answer_chars} chars)", answer_chars=len(draft_answer))
 
         return {
             "draft_answer": draft_answer,
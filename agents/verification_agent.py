@@ -1,22 +1,97 @@
 import json  # Import for JSON serialization
-from langchain_ollama import ChatOllama
+import re
+import threading
 from typing import Dict, List
+from pydantic import BaseModel, Field
 from langchain.schema import Document
 from config.settings import settings
+from .model_pool import get_model_pool, ModelBusyError
+from utils.logging import logger, truncate, debug_sampled
+from utils import metrics
+
+class VerificationResult(BaseModel):
+    """Typed verification outcome used for routing."""
+    supported: bool = False
+    unsupported_claims: List[str] = Field(default_factory=list)
+    contradictions: List[str] = Field(default_factory=list)
+    relevant: bool = False
+    additional_details: str = ""
+    # False when the model's output could not be parsed; such results never trigger re-research
+    parsed: bool = True
+
+    @property
+    def needs_re_research(self) -> bool:
+        return self.parsed and not (self.supported and self.relevant)
+
+    def to_report(self) -> Dict:
+        """Convert to the report dictionary used by format_verification_report."""
+        return {
+            "Supported": "YES" if self.supported else "NO",
+            "Unsupported Claims": self.unsupported_claims,
+            "Contradictions": self.contradictions,
+            "Relevant": "YES" if self.relevant else "NO",
+            "Additional Details": self.additional_details,
+        }
+
+    @classmethod
+    def from_report(cls, report: Dict, parsed: bool = True) -> "VerificationResult":
+        """Build from the report dictionary produced by the text parser."""
+        return cls(
+            supported=str(report.get("Supported", "NO")).upper().startswith("YES"),
+            unsupported_claims=report.get("Unsupported Claims", []),
+            contradictions=report.get("Contradictions", []),
+            relevant=str(report.get("Relevant", "NO")).upper().startswith("YES"),
+            additional_details=report.get("Additional Details", ""),
+            parsed=parsed,
+        )
+
+# Schema sent to Ollama in "schema" output mode (excludes the internal parsed flag)
+VERIFICATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "supported": {"type": "boolean"},
+        "unsupported_claims": {"type": "array", "items": {"type": "string"}},
+        "contradictions": {"type": "array", "items": {"type": "string"}},
+        "relevant": {"type": "boolean"},
+        "additional_details": {"type": "string"},
+    },
+    "required": ["supported", "unsupported_claims", "contradictions", "relevant", "additional_details"],
+}
 
 class VerificationAgent:
     def __init__(self):
         """
         Initialize the verification agent with Ollama Gemma2:9b.
+
+        VERIFICATION_OUTPUT_FORMAT selects the response format: "text" (free-form, parsed
+        line by line), "json" (Ollama JSON mode) or "schema" (JSON constrained to
+        VERIFICATION_SCHEMA).
         """
         # Initialize the Ollama ChatModel
-        print("Initializing VerificationAgent with Ollama Gemma2:9b...")
-        self.model = ChatOllama(
-            base_url=settings.OLLAMA_BASE_URL,
-            model=settings.OLLAMA_MODEL,
+        logger.debug("Initializing VerificationAgent with Ollama Gemma2:9b...")
+        self.output_format = settings.VERIFICATION_OUTPUT_FORMAT
+        model_options = {}
+        if self.output_format == "json":
+            model_options["format"] = "json"
+        elif self.output_format == "schema":
+            model_options["format"] = VERIFICATION_SCHEMA
+        self.model = get_model_pool().get_chat_model(
             temperature=0.0,           # Remove randomness for consistency
+            **model_options
         )
-        print("Ollama model initialized successfully.")
+        # Created on first use: VERIFICATION_STRATEGY is read per call and may change at runtime
+        self.claim_verifier = None
+        self._claim_verifier_lock = threading.Lock()
+        logger.debug("Ollama model initialized successfully.")
+
+    def get_claim_verifier(self):
+        """The claim-by-claim verifier, created on first use."""
+        with self._claim_verifier_lock:
+            if self.claim_verifier is None:
+                # Imported here: claim_verifier depends on VerificationResult defined in this module
+                from .claim_verifier import ClaimVerifier
+                self.claim_verifier = ClaimVerifier()
+            return self.claim_verifier
 
     def sanitize_response(self, response_text: str) -> str:
         """
@@ -28,6 +103,9 @@ class VerificationAgent:
         """
         Generate a structured prompt for the LLM to verify the answer against the context.
         """
+        if self.output_format in {"json", "schema"}:
+            return self.generate_json_prompt(answer, context)
+
         prompt = f"""
         You are an AI assistant designed to verify the accuracy and relevance of answers based on provided context.
 
@@ -56,6 +134,67 @@ class VerificationAgent:
         """
         return prompt
 
+    def generate_json_prompt(self, answer: str, context: str) -> str:
+        """
+        Generate a prompt asking for the verification as a JSON object.
+        """
+        prompt = f"""
+        You are an AI assistant designed to verify the accuracy and relevance of answers based on provided context.
+
+        **Instructions:**
+        - Verify the following answer against the provided context.
+        - Respond with a single JSON object with exactly these keys:
+          "supported": true if the answer is directly or indirectly supported by the context, else false
+          "unsupported_claims": list of claims in the answer not supported by the context
+          "contradictions": list of statements in the answer that contradict the context
+          "relevant": true if the answer is relevant to the question, else false
+          "additional_details": short string with any extra explanation
+
+        **Answer:** {answer}
+        **Context:**
+        {context}
+
+        **Respond ONLY with the JSON object.**
+        """
+        return prompt
+
+    def parse_json_verification_response(self, response_text: str) -> VerificationResult:
+        """
+        Parse a JSON verification response into a VerificationResult.
+
+        Returns a result with parsed=False when the response is not valid JSON.
+        """
+        try:
+            data = json.loads(response_text)
+        except json.JSONDecodeError:
+            # Tolerate prose or code fences around the object
+            match = re.search(r"\{.*\}", response_text, re.S)
+            try:
+                data = json.loads(match.group(0)) if match else None
+            except json.JSONDecodeError:
+                data = None
+        if not isinstance(data, dict):
+            logger.warning("LLM did not return a JSON object.")
+            return VerificationResult(parsed=False, additional_details="Failed to parse the model's response.")
+
+        def as_bool(value) -> bool:
+            if isinstance(value, str):
+                return value.strip().upper() in {"YES", "TRUE"}
+            return bool(value)
+
+        def as_list(value) -> List[str]:
+            if isinstance(value, str):
+                return [value] if value.strip() and value.strip().lower() not in {"none", "n/a"} else []
+            return [str(item) for item in value or []]
+
+        return VerificationResult(
+            supported=as_bool(data.get("supported", False)),
+            unsupported_claims=as_list(data.get("unsupported_claims")),
+            contradictions=as_list(data.get("contradictions")),
+            relevant=as_bool(data.get("relevant", False)),
+            additional_details=str(data.get("additional_details") or ""),
+        )
+
     def parse_verification_response(self, response_text: str) -> Dict:
         """
         Parse the LLM's verification response into a structured dictionary.
@@ -63,13 +202,20 @@ class VerificationAgent:
         try:
             lines = response_text.split('\n')
             verification = {}
+            canonical_keys = {
+                "supported": "Supported",
+                "unsupported claims": "Unsupported Claims",
+                "contradictions": "Contradictions",
+                "relevant": "Relevant",
+                "additional details": "Additional Details",
+            }
             for line in lines:
                 if ':' in line:
                     key, value = line.split(':', 1)
-                    key = key.strip().capitalize()
-                    value = value.strip()
-                    if key in {"Supported", "Unsupported claims", "Contradictions", "Relevant", "Additional details"}:
-                        if key in {"Unsupported claims", "Contradictions"}:
+                    key = canonical_keys.get(key.strip().strip('*').strip().lower())
+                    value = value.strip().strip('*').strip()
+                    if key:
+                        if key in {"Unsupported Claims", "Contradictions"}:
                             # Convert string list to actual list
                             if value.startswith('[') and value.endswith(']'):
                                 items = value[1:-1].split(',')
@@ -78,10 +224,14 @@ class VerificationAgent:
                                 verification[key] = items
                             else:
                                 verification[key] = []
-                        elif key == "Additional details":
+                        elif key == "Additional Details":
                             verification[key] = value
                         else:
                             verification[key] = value.upper()
+            if not verification:
+                # Nothing recognisable in the response
+                return None
+
             # Ensure all keys are present
             for key in ["Supported", "Unsupported Claims", "Contradictions", "Relevant", "Additional Details"]:
                 if key not in verification:
@@ -94,7 +244,7 @@ class VerificationAgent:
 
             return verification
         except Exception as e:
-            print(f"Error parsing verification response: {e}")
+            logger.warning("Error parsing verification response: {error}", error=str(e))
             return None
 
     def format_verification_report(self, verification: Dict) -> str:
@@ -127,80 +277,82 @@ class VerificationAgent:
 
         return report
 
-    def check(self, answer: str, documents: List[Document]) -> Dict:
+    def check(self, answer: str, documents: List[Document], retriever=None) -> Dict:
         """
         Verify the answer against the provided documents.
+
+        With VERIFICATION_STRATEGY="claims" and a retriever, each claim is verified
+        against its own evidence instead (see ClaimVerifier).
         """
-        print(f"VerificationAgent.check called with answer='{answer}' and {len(documents)} documents.")
+        logger.debug(
+            "VerificationAgent.check: {answer_chars} answer chars, {documents} documents",
+            answer_chars=len(answer), documents=len(documents)
+        )
+
+        if settings.VERIFICATION_STRATEGY == "claims" and retriever is not None:
+            verification, evidence = self.get_claim_verifier().verify(answer, retriever)
+            return self._build_result(verification, "\n\n".join(doc.page_content for doc in evidence))
 
         # Combine all document contents into one string without truncation
         context = "\n\n".join([doc.page_content for doc in documents])
-        print(f"Combined context length: {len(context)} characters.")
+        logger.debug("Combined context length: {context_chars} characters.", context_chars=len(context))
 
         # Create a prompt for the LLM to verify the answer
         prompt = self.generate_prompt(answer, context)
-        print("Prompt created for the LLM.")
+        debug_sampled("Verification prompt: {prompt}", prompt=truncate(prompt))
 
         # Call the LLM to generate the verification report
         try:
-            print("Sending prompt to the model...")
-            response = self.model.invoke(prompt)
-            print("LLM response received.")
+            with metrics.AGENT_LLM_SECONDS.labels(agent="verification").time():
+                response = self.model.invoke(prompt)
+        except ModelBusyError:
+            raise
         except Exception as e:
-            print(f"Error during model inference: {e}")
+            logger.error("Error during model inference: {error}", error=str(e))
             raise RuntimeError("Failed to verify answer due to a model error.") from e
 
         # Extract and process the LLM's response
         try:
             llm_response = response.content.strip()
-            print(f"Raw LLM response:\n{llm_response}")
+            debug_sampled("Raw verification response: {response}", response=truncate(llm_response))
         except AttributeError as e:
-            print(f"Unexpected response structure: {e}")
-            verification_report = {
-                "Supported": "NO",
-                "Unsupported Claims": [],
-                "Contradictions": [],
-                "Relevant": "NO",
-                "Additional Details": "Invalid response structure from the model."
-            }
-            verification_report_formatted = self.format_verification_report(verification_report)
-            print(f"Verification report:\n{verification_report_formatted}")
-            print(f"Context used: {context}")
-            return {
-                "verification_report": verification_report_formatted,
-                "context_used": context
-            }
+            logger.warning("Unexpected response structure: {error}", error=str(e))
+            verification = VerificationResult(parsed=False, additional_details="Invalid response structure from the model.")
+            return self._build_result(verification, context)
 
         # Sanitize the response
         sanitized_response = self.sanitize_response(llm_response) if llm_response else ""
         if not sanitized_response:
-            print("LLM returned an empty response.")
-            verification_report = {
-                "Supported": "NO",
-                "Unsupported Claims": [],
-                "Contradictions": [],
-                "Relevant": "NO",
-                "Additional Details": "Empty response from the model."
-            }
+            logger.warning("LLM returned an empty response.")
+            verification = VerificationResult(parsed=False, additional_details="Empty response from the model.")
+        elif self.output_format in {"json", "schema"}:
+            verification = self.parse_json_verification_response(sanitized_response)
         else:
             # Parse the response into the expected format
             verification_report = self.parse_verification_response(sanitized_response)
             if verification_report is None:
-                print("LLM did not respond with the expected format. Using default verification report.")
-                verification_report = {
-                    "Supported": "NO",
-                    "Unsupported Claims": [],
-                    "Contradictions": [],
-                    "Relevant": "NO",
-                    "Additional Details": "Failed to parse the model's response."
-                }
+                logger.warning("LLM did not respond with the expected format. Using default verification report.")
+                verification = VerificationResult(parsed=False, additional_details="Failed to parse the model's response.")
+            else:
+                verification = VerificationResult.from_report(verification_report)
+
+        return self._build_result(verification, context)
 
+    def _build_result(self, verification: VerificationResult, context: str) -> Dict:
+        """Package the typed result with its formatted report."""
         # Format the verification report into a paragraph
-        verification_report_formatted = self.format_verification_report(verification_report)
-        print(f"Verification report:\n{verification_report_formatted}")
-        print(f"Context used: {context}")
+        verification_report_formatted = self.format_verification_report(verification.to_report())
+        logger.debug(
+            "Verification: supported={supported} relevant={relevant}",
+            supported=verification.supported, relevant=verification.relevant
+        )
+        debug_sampled(
+            "Verification report: {report} | Context used: {context}",
+            report=truncate(verification_report_formatted), context=truncate(context)
+        )
 
         return {
             "verification_report": verification_report_formatted,
+            "verification": verification,
             "context_used": context
         }
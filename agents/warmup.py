@@ -0,0 +1,97 @@
+from config.settings import settings
+from .model_pool import get_model_pool
+from utils import metrics
+from datetime import datetime
+from typing import Dict
+import threading
+import ollama
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ModelWarmup:
+    """
+    Preloads the chat and embedding models so the first question does not pay load time.
+
+    Each pass asks Ollama to load both models with OLLAMA_KEEP_ALIVE, runs a one-token
+    probe generation and a probe embedding, and records the latencies. Passes repeat
+    every WARMUP_INTERVAL_SECONDS so the models stay resident between questions.
+    Readiness is gated on the first successful pass only: a later failed pass is
+    logged and counted, but does not block questions (Ollama reloads on demand).
+    """
+
+    def __init__(self):
+        self.client = ollama.Client(host=settings.OLLAMA_BASE_URL, **get_model_pool().client_kwargs())
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_report: Dict = {}
+
+    def warm(self) -> Dict:
+        """Run one warm-up pass and return the latency report."""
+        report = {"started_at": datetime.now().isoformat(), "ok": False}
+        try:
+            start = time.perf_counter()
+            response = self.client.generate(
+                model=settings.OLLAMA_MODEL,
+                prompt="ping",
+                options={"num_predict": 1},
+                keep_alive=settings.OLLAMA_KEEP_ALIVE,
+            )
+            report["chat_seconds"] = round(time.perf_counter() - start, 3)
+            report["chat_load_seconds"] = round((response.get("load_duration") or 0) / 1e9, 3)
+
+            start = time.perf_counter()
+            response = self.client.embed(
+                model=settings.OLLAMA_EMBEDDING_MODEL,
+                input="warm-up",
+                keep_alive=settings.OLLAMA_KEEP_ALIVE,
+            )
+            report["embedding_seconds"] = round(time.perf_counter() - start, 3)
+            report["embedding_load_seconds"] = round((response.get("load_duration") or 0) / 1e9, 3)
+            report["ok"] = True
+            self._ready.set()
+            self.last_report = report
+            metrics.WARMUP_PASSES.labels(result="ok").inc()
+            logger.info(f"Model warm-up finished: {report}")
+        except Exception as e:
+            report["error"] = str(e)
+            metrics.WARMUP_PASSES.labels(result="error").inc()
+            logger.warning(f"Model warm-up failed: {e}")
+            if not self.is_ready():
+                # Once ready, the status keeps showing the last successful pass
+                self.last_report = report
+        return report
+
+    def start(self):
+        """Warm up now and then on a schedule, in a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.warm()
+            # Retry quickly until the models are loaded, then settle into the regular interval
+            interval = settings.WARMUP_INTERVAL_SECONDS if self.is_ready() else settings.WARMUP_RETRY_SECONDS
+            self._stop.wait(interval)
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def status_markdown(self) -> str:
+        """One-line readiness summary for the UI."""
+        if self.is_ready():
+            return (
+                f"🟢 **Models ready** - chat warm-up {self.last_report.get('chat_seconds', 0):.1f}s "
+                f"(load {self.last_report.get('chat_load_seconds', 0):.1f}s), "
+                f"embeddings {self.last_report.get('embedding_seconds', 0):.1f}s"
+            )
+        if "error" in self.last_report:
+            return f"🔴 **Models unavailable** - {self.last_report['error']} (retrying)"
+        return "⏳ **Warming up models** - questions will be accepted shortly"
@@ -1,37 +1,65 @@
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, List, Dict
+from typing import TypedDict, List, Dict, Optional
 from .research_agent import ResearchAgent
-from .verification_agent import VerificationAgent
+from .verification_agent import VerificationAgent, VerificationResult
 from .relevance_checker import RelevanceChecker
+from .answer_cache import AnswerCache
+from .cassette import recording
 from langchain.schema import Document
 from langchain.retrievers import EnsembleRetriever
-import logging
+from retriever.reranker import Reranker
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import settings
+from utils import progress, tracing, metrics
+from utils.logging import logger, truncate
 
-logger = logging.getLogger(__name__)
+# Position of each graph node on the common path, for progress reporting
+NODE_ORDER = {"check_relevance": 0, "research": 1, "verify": 2}
 
 class AgentState(TypedDict):
     question: str
     documents: List[Document]
     draft_answer: str
     verification_report: str
+    verification: VerificationResult
+    research_iterations: int
     is_relevant: bool
+    relevance_path: str
     retriever: EnsembleRetriever
 
 class AgentWorkflow:
-    def __init__(self):
+    def __init__(self, speculative: Optional[bool] = None):
         self.researcher = ResearchAgent()
         self.verifier = VerificationAgent()
         self.relevance_checker = RelevanceChecker()
-        self.compiled_workflow = self.build_workflow()  # Compile once during initialization
+        # A cached answer would skip the Ollama calls a cassette is recording
+        self.answer_cache = AnswerCache() if settings.ANSWER_CACHE_ENABLED and not recording() else None
+        self.reranker = Reranker() if settings.RERANKER_ENABLED else None
+        self.speculative = settings.SPECULATIVE_RELEVANCE if speculative is None else speculative
+        # Draft research runs here while the relevance check is in flight
+        self._speculation_pool = (
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-research") if self.speculative else None
+        )
+        self.compiled_workflow = self.build_workflow(speculative=self.speculative)  # Compile once during initialization
         
-    def build_workflow(self):
-        """Create and compile the multi-agent workflow."""
+    def build_workflow(self, speculative: bool = False):
+        """
+        Create and compile the multi-agent workflow.
+
+        With speculative=True the draft research starts concurrently with the
+        relevance check, so the common (relevant) path goes straight to verification.
+        """
+        if speculative and self._speculation_pool is None:
+            raise ValueError("Speculative workflow requires an AgentWorkflow created with speculation enabled")
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("check_relevance", self._check_relevance_step)
-        workflow.add_node("research", self._research_step)
-        workflow.add_node("verify", self._verification_step)
+        if speculative:
+            workflow.add_node("check_relevance", self._node("check_relevance", self._speculative_relevance_step))
+        else:
+            workflow.add_node("check_relevance", self._node("check_relevance", self._check_relevance_step))
+        workflow.add_node("research", self._node("research", self._research_step))
+        workflow.add_node("verify", self._node("verify", self._verification_step))
         
         # Define edges
         workflow.set_entry_point("check_relevance")
@@ -39,7 +67,8 @@ class AgentWorkflow:
             "check_relevance",
             self._decide_after_relevance_check,
             {
-                "relevant": "research",
+                # The speculative step already produced a draft answer
+                "relevant": "verify" if speculative else "research",
                 "irrelevant": END
             }
         )
@@ -56,77 +85,152 @@ class AgentWorkflow:
     
     def _check_relevance_step(self, state: AgentState) -> Dict:
         retriever = state["retriever"]
-        classification = self.relevance_checker.check(
+        relevance = self.relevance_checker.classify(
             question=state["question"], 
             retriever=retriever, 
             k=20
         )
+        classification = relevance["classification"]
+        logger.info(f"Relevance classified as {classification} via the {relevance['path']} path")
 
         if classification == "CAN_ANSWER":
             # We have enough info to proceed
-            return {"is_relevant": True}
+            return {"is_relevant": True, "relevance_path": relevance["path"]}
 
         elif classification == "PARTIAL":
             # There's partial coverage, but we can still proceed
             return {
-                "is_relevant": True
+                "is_relevant": True,
+                "relevance_path": relevance["path"]
             }
 
         else:  # classification == "NO_MATCH"
             return {
                 "is_relevant": False,
+                "relevance_path": relevance["path"],
                 "draft_answer": "This question isn't related (or there's no data) for your query. Please ask another question relevant to the uploaded document(s)."
             }
 
 
+    def _node(self, name: str, step):
+        """Wrap a graph step so it is traced and entering and leaving it is reported as progress."""
+        position, total = NODE_ORDER[name], len(NODE_ORDER)
+
+        def run(state: AgentState) -> Dict:
+            progress.emit("node", position, total, f"Entered {name}")
+            with tracing.span(f"node.{name}", {"node.research_iterations": state.get("research_iterations", 0)}):
+                result = step(state)
+            progress.emit("node", position + 1, total, f"Finished {name}")
+            return result
+        return run
+
+    def _speculative_relevance_step(self, state: AgentState) -> Dict:
+        """Check relevance while a draft answer is researched in the background."""
+        draft_future = self._speculation_pool.submit(progress.bind(self._research_step), state)
+        relevance = self._check_relevance_step(state)
+
+        if not relevance["is_relevant"]:
+            # Drop the draft: cancel it if it has not started, otherwise let it finish unobserved
+            if draft_future.cancel():
+                logger.info("Relevance check returned NO_MATCH; speculative research cancelled.")
+            else:
+                logger.info("Relevance check returned NO_MATCH; discarding speculative draft.")
+            return relevance
+
+        relevance.update(draft_future.result())
+        return relevance
+
     def _decide_after_relevance_check(self, state: AgentState) -> str:
         decision = "relevant" if state["is_relevant"] else "irrelevant"
-        print(f"[DEBUG] _decide_after_relevance_check -> {decision}")
+        logger.debug("Relevance decision: {decision}", decision=decision)
         return decision
     
-    def full_pipeline(self, question: str, retriever: EnsembleRetriever):
+    def _rerank(self, question: str, documents: List[Document]) -> List[Document]:
+        """Rerank retrieved chunks; if the reranker fails, keep the retriever's order."""
+        with tracing.span("rerank", {"rerank.candidates": len(documents)}) as current:
+            try:
+                return self.reranker.rerank(question, documents)
+            except Exception:
+                logger.exception("Reranking failed, using the retriever's order")
+                current.set_attribute("rerank.failed", True)
+                return documents[:self.reranker.top_n]
+
+    def full_pipeline(self, question: str, retriever: EnsembleRetriever, file_hashes=None):
         try:
-            print(f"[DEBUG] Starting full_pipeline with question='{question}'")
+            logger.debug("Starting full_pipeline for question: {question}", question=truncate(question))
+
+            # Answers are cached per file set; without hashes the cache is skipped
+            corpus_key, question_embedding = None, None
+            if self.answer_cache is not None and file_hashes:
+                with tracing.span("answer_cache.lookup") as current:
+                    corpus_key = self.answer_cache.corpus_key(file_hashes)
+                    question_embedding = self.answer_cache.embed(question)
+                    cached = self.answer_cache.lookup(corpus_key, question, question_embedding)
+                    current.set_attribute("cache.hit", cached is not None)
+                    metrics.ANSWER_CACHE.labels(result="miss" if cached is None else "hit").inc()
+                if cached is not None:
+                    return cached
+
             documents = retriever.invoke(question)
             logger.info(f"Retrieved {len(documents)} relevant documents (from .invoke)")
+            if self.reranker is not None:
+                documents = self._rerank(question, documents)
 
             initial_state = AgentState(
                 question=question,
                 documents=documents,
                 draft_answer="",
                 verification_report="",
+                verification=None,
+                research_iterations=0,
                 is_relevant=False,
+                relevance_path="",
                 retriever=retriever
             )
             
             final_state = self.compiled_workflow.invoke(initial_state)
+            if final_state.get("research_iterations"):
+                metrics.RESEARCH_ITERATIONS.observe(final_state["research_iterations"])
             
-            return {
+            verification = final_state.get("verification")
+            result = {
                 "draft_answer": final_state["draft_answer"],
-                "verification_report": final_state["verification_report"]
+                "verification_report": final_state["verification_report"],
+                "relevance_path": final_state.get("relevance_path", ""),
+                "research_iterations": final_state.get("research_iterations", 0),
+                "verified": verification is not None and verification.supported and verification.relevant
             }
+            # Unverified answers (NO_MATCH included) are not worth replaying
+            if corpus_key is not None and result["verified"]:
+                self.answer_cache.store(corpus_key, question, result, question_embedding)
+            return result
         except Exception as e:
             logger.error(f"Workflow execution failed: {e}")
             raise
     
     def _research_step(self, state: AgentState) -> Dict:
-        print(f"[DEBUG] Entered _research_step with question='{state['question']}'")
         result = self.researcher.generate(state["question"], state["documents"])
-        print("[DEBUG] Researcher returned draft answer.")
-        return {"draft_answer": result["draft_answer"]}
+        return {
+            "draft_answer": result["draft_answer"],
+            "research_iterations": state.get("research_iterations", 0) + 1
+        }
     
     def _verification_step(self, state: AgentState) -> Dict:
-        print("[DEBUG] Entered _verification_step. Verifying the draft answer...")
-        result = self.verifier.check(state["draft_answer"], state["documents"])
-        print("[DEBUG] VerificationAgent returned a verification report.")
-        return {"verification_report": result["verification_report"]}
+        result = self.verifier.check(state["draft_answer"], state["documents"], retriever=state["retriever"])
+        return {
+            "verification_report": result["verification_report"],
+            "verification": result["verification"]
+        }
     
     def _decide_next_step(self, state: AgentState) -> str:
-        verification_report = state["verification_report"]
-        print(f"[DEBUG] _decide_next_step with verification_report='{verification_report}'")
-        if "Supported: NO" in verification_report or "Relevant: NO" in verification_report:
-            logger.info("[DEBUG] Verification indicates re-research needed.")
+        verification = state["verification"]
+        logger.debug("Deciding next step", needs_re_research=verification is not None and verification.needs_re_research)
+        if verification is not None and verification.needs_re_research:
+            if state.get("research_iterations", 0) >= settings.MAX_RESEARCH_ITERATIONS:
+                logger.info("Verification failed but research iteration limit reached, ending workflow.")
+                return "end"
+            logger.info("Verification indicates re-research needed.")
             return "re_research"
         else:
-            logger.info("[DEBUG] Verification successful, ending workflow.")
+            logger.info("Verification successful, ending workflow.")
             return "end"
@@ -0,0 +1,168 @@
+"""
+Batch question answering over a single indexed corpus.
+
+Usage:
+    python -m api.batch --questions checklist.txt --files report.pdf appendix.pdf --output results.jsonl
+    python -m api.batch --questions checklist.txt --corpus annual-report-2024
+    python -m api.batch --questions checklist.txt --corpus annual-report-2024 --profile
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List
+
+from document_processor.file_handler import DocumentProcessor, LocalFile
+from retriever.builder import RetrieverBuilder
+from retriever.corpus_store import CorpusStore
+from agents.workflow import AgentWorkflow
+from agents.model_pool import get_model_pool
+from config.settings import settings
+from utils.logging import logger, setup_logging
+from utils import metrics, profiling, tracing
+
+class BatchRunner:
+    """
+    Runs many questions against one file set.
+
+    The corpus is indexed once, all questions are embedded in a single batched
+    request, and the workflow runs for up to `concurrency` questions at a time.
+    Results are yielded as they complete.
+    """
+
+    def __init__(self, processor: DocumentProcessor = None, retriever_builder: RetrieverBuilder = None,
+                 workflow: AgentWorkflow = None, corpus_store: CorpusStore = None):
+        self.processor = processor or DocumentProcessor()
+        self.retriever_builder = retriever_builder or RetrieverBuilder()
+        self.workflow = workflow or AgentWorkflow()
+        self.corpus_store = corpus_store or CorpusStore(self.retriever_builder)
+
+    def index(self, file_paths: List[str] = None, corpus_name: str = None) -> Dict:
+        """
+        Resolve the corpus once: open a stored corpus by name, or reuse/build the
+        stored corpus for a file set. Returns the retriever, file hashes and timing.
+        """
+        start = time.perf_counter()
+        if file_paths:
+            files = [LocalFile(path) for path in file_paths]
+            corpus_name, retriever, file_hashes = self.corpus_store.get_or_build(files, self.processor, corpus_name)
+        elif corpus_name:
+            retriever = self.corpus_store.load(corpus_name)
+            file_hashes = frozenset(self.corpus_store.manifest(corpus_name)["file_hashes"])
+        else:
+            raise ValueError("Either file paths or a corpus name is required")
+        return {
+            "name": corpus_name,
+            "retriever": retriever,
+            "file_hashes": file_hashes,
+            "index_seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def run(self, questions: List[str], file_paths: List[str] = None, concurrency: int = None,
+            corpus_name: str = None, profile: bool = None) -> Iterator[Dict]:
+        """
+        Answer every question; yields one result dict per question in completion order.
+        With `profile` (default: PROFILING_ENABLED) each question is profiled under its request ID.
+        """
+        concurrency = concurrency or settings.BATCH_CONCURRENCY
+        corpus = self.index(file_paths, corpus_name)
+        logger.info(f"Batch corpus '{corpus['name']}' ready in {corpus['index_seconds']}s")
+
+        start = time.perf_counter()
+        get_model_pool().get_embeddings().prime_queries(questions)
+        logger.info(f"Embedded {len(questions)} questions in {time.perf_counter() - start:.2f}s")
+
+        submitted = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-question") as executor:
+            futures = [
+                executor.submit(self._answer, i, question, corpus, submitted, profile)
+                for i, question in enumerate(questions)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run_to_jsonl(self, questions: List[str], file_paths: List[str], output_path: str,
+                     concurrency: int = None, corpus_name: str = None, profile: bool = None) -> Dict:
+        """Stream results to a JSONL file as they complete; returns a summary."""
+        start = time.perf_counter()
+        answered = failed = 0
+        with open(output_path, "w", encoding="utf-8") as f:
+            for result in self.run(questions, file_paths, concurrency, corpus_name, profile):
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                f.flush()
+                if result["error"]:
+                    failed += 1
+                else:
+                    answered += 1
+        elapsed = time.perf_counter() - start
+        return {
+            "questions": len(questions),
+            "answered": answered,
+            "failed": failed,
+            "total_seconds": round(elapsed, 3),
+            "questions_per_second": round(len(questions) / elapsed, 3) if elapsed else 0.0,
+        }
+
+    def _answer(self, index: int, question: str, corpus: Dict, submitted: float, profile: bool = None) -> Dict:
+        started = time.perf_counter()
+        request_id = tracing.new_request_id()
+        result = {"index": index, "question": question, "request_id": request_id, "error": None}
+        try:
+            with tracing.request_span("batch.question", request_id, {"batch.index": index}), \
+                    metrics.track_question("batch"), \
+                    profiling.profile_request(request_id, enabled=profile) as profiled:
+                answer = self.workflow.full_pipeline(
+                    question=question,
+                    retriever=corpus["retriever"],
+                    file_hashes=corpus["file_hashes"]
+                )
+            if profiled.path:
+                result["profile"] = profiled.path
+            result.update({
+                "draft_answer": answer["draft_answer"],
+                "verification_report": answer["verification_report"],
+                "relevance_path": answer.get("relevance_path", ""),
+                "cache_hit": answer.get("cache_hit"),
+            })
+        except Exception as e:
+            logger.error(f"Batch question {index} failed: {e}")
+            result["error"] = str(e)
+        finished = time.perf_counter()
+        result["timings"] = {
+            "queued_seconds": round(started - submitted, 3),
+            "answer_seconds": round(finished - started, 3),
+        }
+        return result
+
+def load_questions(path: str) -> List[str]:
+    """Read questions from a .txt file (one per line) or .jsonl file (objects with a "question" key)."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if path.endswith(".jsonl"):
+        return [json.loads(line)["question"] for line in lines]
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a list of questions against one document set.")
+    parser.add_argument("--questions", required=True, help="Questions file (.txt, one per line, or .jsonl)")
+    parser.add_argument("--files", nargs="+", help="Documents to index (reuses a stored corpus for the same files)")
+    parser.add_argument("--corpus", help="Stored corpus name to open, or to save the indexed files under")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL output path")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY)
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help=f"Profile each question into {settings.PROFILING_DIR}/ (default: PROFILING_ENABLED)")
+    args = parser.parse_args()
+
+    if not args.files and not args.corpus:
+        parser.error("either --files or --corpus is required")
+
+    setup_logging()
+    tracing.setup_tracing()
+    questions = load_questions(args.questions)
+    summary = BatchRunner().run_to_jsonl(questions, args.files, args.output, args.concurrency, args.corpus, args.profile)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+from config.settings import settings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue is at capacity."""
+
+class Job:
+    """A unit of queued work with a status and an append-only event log."""
+
+    def __init__(self, kind: str, params: Dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.events: List[Dict] = []
+        self._finished_monotonic = None
+        self._on_cancel = None
+        self._changed = threading.Condition()
+        self.emit("status", {"status": "queued"})
+
+    def emit(self, event: str, data: Dict):
+        """Append an event and wake any listeners."""
+        with self._changed:
+            self.events.append({"event": event, "data": data, "time": datetime.now().isoformat()})
+            self._changed.notify_all()
+
+    def wait_for_events(self, cursor: int, timeout: float) -> List[Dict]:
+        """Events after `cursor`, waiting up to `timeout` seconds for new ones."""
+        with self._changed:
+            if len(self.events) <= cursor and self.status not in TERMINAL_STATUSES:
+                self._changed.wait(timeout)
+            return self.events[cursor:]
+
+    def set_status(self, status: str, **fields):
+        with self._changed:
+            self.status = status
+            if status == "running":
+                self.started_at = datetime.now().isoformat()
+            if status in TERMINAL_STATUSES:
+                self.finished_at = datetime.now().isoformat()
+                self._finished_monotonic = time.monotonic()
+        self.emit("status", {"status": status, **fields})
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class JobQueue:
+    """
+    Bounded job queue served by a fixed pool of worker threads.
+
+    At most JOB_QUEUE_MAX_SIZE jobs may be queued or running; further submissions
+    raise QueueFullError so callers can back off instead of waiting indefinitely.
+    Finished jobs are kept for JOB_RETENTION_SECONDS for polling.
+    """
+
+    def __init__(self, workers: int = None, max_size: int = None):
+        self.workers = workers or settings.JOB_WORKERS
+        self.max_size = max_size or settings.JOB_QUEUE_MAX_SIZE
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="api-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: Dict, fn: Callable[[Job], Dict], on_cancel: Callable[[], None] = None) -> Job:
+        """Queue fn(job); its return value becomes the job result. on_cancel runs if it is cancelled before starting."""
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if job.status not in TERMINAL_STATUSES)
+            if active >= self.max_size:
+                raise QueueFullError(f"Job queue is full ({active}/{self.max_size}). Retry later.")
+            job = Job(kind, params)
+            job._on_cancel = on_cancel
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self) -> Dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {"queued": statuses.count("queued"), "running": statuses.count("running")}
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        job = self.get(job_id)
+        if job is None or not self._transition(job, "queued", "cancelled"):
+            return False
+        if job._on_cancel is not None:
+            try:
+                job._on_cancel()
+            except Exception as e:
+                logger.warning(f"Cleanup of cancelled job {job.id} failed: {e}")
+        return True
+
+    def _transition(self, job: Job, expected: str, status: str) -> bool:
+        """Move job from `expected` to `status` atomically; False if another thread moved it first."""
+        with self._lock:
+            if job.status != expected:
+                return False
+            job.set_status(status)
+            return True
+
+    def _run(self, job: Job, fn: Callable[[Job], Dict]):
+        # Loses to a cancel that got in first
+        if not self._transition(job, "queued", "running"):
+            return
+        try:
+            job.result = fn(job)
+            job.set_status("succeeded")
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.set_status("failed", error=str(e))
+
+    def _prune(self):
+        cutoff = time.monotonic() - settings.JOB_RETENTION_SECONDS
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job._finished_monotonic is not None and job._finished_monotonic < cutoff
+        ]:
+            del self._jobs[job_id]
@@ -0,0 +1,195 @@
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from pathlib import Path
+import asyncio
+import shutil
+import uuid
+import json
+
+from document_processor.file_handler import DocumentProcessor, LocalFile
+from retriever.corpus_store import CorpusStore
+from agents.workflow import AgentWorkflow
+from config.settings import settings
+from utils.logging import logger
+from utils.progress import ProgressTracker
+from utils import metrics, profiling, tracing
+from .jobs import Job, JobQueue, QueueFullError, TERMINAL_STATUSES
+
+class QuestionRequest(BaseModel):
+    question: str
+    corpus: str
+    profile: Optional[bool] = None  # Profile this request; defaults to PROFILING_ENABLED
+
+def create_api_router(processor: DocumentProcessor, corpus_store: CorpusStore, workflow: AgentWorkflow,
+                      job_queue: JobQueue = None) -> APIRouter:
+    """
+    JSON API for driving DocChat from other services.
+
+    Indexing and question answering run as jobs on a bounded queue; clients poll
+    GET /api/jobs/{id} or stream GET /api/jobs/{id}/events (server-sent events).
+    """
+    job_queue = job_queue or JobQueue()
+    for status in ("queued", "running"):
+        metrics.JOB_QUEUE_DEPTH.labels(status=status).set_function(lambda status=status: job_queue.depth()[status])
+    router = APIRouter(prefix="/api")
+    upload_root = Path(settings.UPLOAD_DIR)
+
+    def tracker_for(job: Job) -> ProgressTracker:
+        """Progress tracker that republishes pipeline events on the job's event stream."""
+        return ProgressTracker(request_id=job.id, listeners=[lambda event: job.emit("progress", event)])
+
+    def upload_size(upload: UploadFile) -> int:
+        """Size of an uploaded file, from the spooled upload rather than the client's headers."""
+        upload.file.seek(0, 2)
+        size = upload.file.tell()
+        upload.file.seek(0)
+        return size
+
+    def submit(kind: str, params: dict, fn, on_cancel=None) -> dict:
+        try:
+            job = job_queue.submit(kind, params, fn, on_cancel=on_cancel)
+        except QueueFullError as e:
+            if on_cancel is not None:
+                on_cancel()
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        return {"job_id": job.id, "status": job.status}
+
+    @router.get("/corpora")
+    def list_corpora():
+        return {"corpora": corpus_store.list_corpora()}
+
+    @router.post("/corpora", status_code=202)
+    def upload_corpus(files: List[UploadFile] = File(...), name: Optional[str] = Form(None)):
+        if name:
+            # Reject bad names before accepting the upload
+            try:
+                corpus_store.validate_name(name)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        allowed = {ext.lower() for ext in settings.ALLOWED_TYPES}
+        seen = set()
+        total_size = 0
+        for upload in files:
+            if Path(upload.filename or "").suffix.lower() not in allowed:
+                raise HTTPException(status_code=400, detail=f"Unsupported file type: {upload.filename}")
+            # Files are stored by name, so a repeated name would silently replace the earlier file
+            file_name = Path(upload.filename).name
+            if file_name in seen:
+                raise HTTPException(status_code=400, detail=f"Duplicate file name: {file_name}")
+            seen.add(file_name)
+            size = upload_size(upload)
+            if size > settings.MAX_FILE_SIZE:
+                raise HTTPException(status_code=413, detail=(
+                    f"{file_name} exceeds the {settings.MAX_FILE_SIZE // 1024 // 1024}MB per-file limit"
+                ))
+            total_size += size
+        if total_size > settings.MAX_TOTAL_SIZE:
+            raise HTTPException(status_code=413, detail=(
+                f"Total upload size exceeds the {settings.MAX_TOTAL_SIZE // 1024 // 1024}MB limit"
+            ))
+
+        upload_dir = upload_root / uuid.uuid4().hex
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for upload in files:
+            path = upload_dir / Path(upload.filename).name
+            with open(path, "wb") as f:
+                shutil.copyfileobj(upload.file, f)
+            paths.append(path)
+
+        def index(job: Job) -> dict:
+            try:
+                with tracing.request_span("api.index", job.id):
+                    corpus_name, _, _ = tracker_for(job).run(
+                        corpus_store.get_or_build, [LocalFile(p) for p in paths], processor, name
+                    )
+                return {"corpus": corpus_name, "manifest": corpus_store.manifest(corpus_name)}
+            finally:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+
+        return submit("index", {"files": [p.name for p in paths], "name": name}, index,
+                      on_cancel=lambda: shutil.rmtree(upload_dir, ignore_errors=True))
+
+    @router.post("/questions", status_code=202)
+    def ask_question(request: QuestionRequest):
+        if not request.question.strip():
+            raise HTTPException(status_code=400, detail="Question cannot be empty")
+        try:
+            exists = corpus_store.exists(request.corpus)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not exists:
+            raise HTTPException(status_code=404, detail=f"Unknown corpus: {request.corpus}")
+
+        def answer(job: Job) -> dict:
+            with tracing.request_span("api.answer", job.id, {"corpus.name": request.corpus}), \
+                    metrics.track_question("api"), \
+                    profiling.profile_request(job.id, enabled=request.profile), \
+                    corpus_store.using(request.corpus) as retriever:
+                file_hashes = corpus_store.manifest(request.corpus)["file_hashes"]
+                return tracker_for(job).run(
+                    workflow.full_pipeline,
+                    question=request.question,
+                    retriever=retriever,
+                    file_hashes=file_hashes
+                )
+
+        return submit("question", {"question": request.question, "corpus": request.corpus}, answer)
+
+    @router.get("/jobs/{job_id}")
+    def get_job(job_id: str):
+        job = job_queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        return job.to_dict()
+
+    @router.delete("/jobs/{job_id}")
+    def cancel_job(job_id: str):
+        if not job_queue.cancel(job_id):
+            raise HTTPException(status_code=409, detail="Job is not queued (already running, finished or unknown)")
+        return {"job_id": job_id, "status": "cancelled"}
+
+    @router.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str):
+        job = job_queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+
+        async def stream():
+            cursor = 0
+            while True:
+                events = await asyncio.to_thread(job.wait_for_events, cursor, 15.0)
+                if not events:
+                    # Comment line keeps idle connections open through proxies
+                    yield ": keep-alive\n\n"
+                for event in events:
+                    yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+                cursor += len(events)
+                if job.status in TERMINAL_STATUSES and cursor >= len(job.events):
+                    yield f"event: result\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                    return
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @router.get("/health")
+    def health():
+        return {"status": "ok", "queue": job_queue.depth()}
+
+    return router
+
+def create_api_app(processor: DocumentProcessor, corpus_store: CorpusStore, workflow: AgentWorkflow) -> FastAPI:
+    """FastAPI app carrying the JSON API and/or /metrics; the Gradio UI is mounted onto it in app.py."""
+    app = FastAPI(title="DocChat API", docs_url="/docs", redoc_url="/redoc")
+    if settings.API_ENABLED:
+        app.include_router(create_api_router(processor, corpus_store, workflow))
+        logger.info("DocChat REST API enabled at /api")
+    if settings.METRICS_ENABLED:
+        app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+        logger.info("Prometheus metrics enabled at /metrics")
+    return app
+
+def metrics_endpoint() -> Response:
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,4 +1,5 @@
 import gradio as gr
+import uvicorn
 import hashlib
 from typing import List, Dict
 import os
@@ -7,9 +8,18 @@ from datetime import datetime
 
 from document_processor.file_handler import DocumentProcessor
 from retriever.builder import RetrieverBuilder
+from retriever.corpus_store import CorpusStore
 from agents.workflow import AgentWorkflow
-from config import constants, settings
-from utils.logging import logger
+from agents.model_pool import ModelBusyError
+from agents.warmup import ModelWarmup
+from api.server import create_api_app
+from config import constants
+from config.settings import settings
+from utils.logging import logger, setup_logging
+from utils.progress import ProgressTracker
+from utils.memory import SessionRegistry
+from utils import metrics, profiling, tracing
+from concurrent.futures import ThreadPoolExecutor
 
 # 1) Define example data with detailed descriptions
 EXAMPLES = {
@@ -28,10 +38,29 @@ EXAMPLES = {
 }
 
 def main():
+    setup_logging()
+    tracing.setup_tracing()
     processor = DocumentProcessor()
     retriever_builder = RetrieverBuilder()
+    corpus_store = CorpusStore(retriever_builder)
+    corpus_store.start_sweeper()
+    sessions = SessionRegistry()
     workflow = AgentWorkflow()
 
+    # Load the models in the background so the first question doesn't pay for it
+    warmup = ModelWarmup()
+    if settings.WARMUP_ENABLED:
+        warmup.start()
+
+    # Pipeline work runs here while the UI handlers stream its progress
+    progress_pool = ThreadPoolExecutor(
+        max_workers=settings.INDEXING_CONCURRENCY_LIMIT + settings.QA_CONCURRENCY_LIMIT,
+        thread_name_prefix="ui-request"
+    )
+
+    def models_ready() -> bool:
+        return warmup.is_ready() or not settings.WARMUP_ENABLED
+
     # Define custom CSS for modern dark theme
     css = """
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
@@ -493,6 +522,21 @@ def main():
                         load_example_btn = gr.Button("📥 Load Example", elem_classes="btn-primary")
                         clear_btn = gr.Button("🗑️ Clear All", variant="secondary")
 
+                gr.Markdown("### 📚 Corpus Library", elem_classes="section-header")
+
+                # Previously indexed document sets, reopened without re-processing
+                with gr.Group():
+                    corpus_dropdown = gr.Dropdown(
+                        label="🗂️ Open an Indexed Corpus",
+                        choices=[m["name"] for m in corpus_store.list_corpora()],
+                        value=None,
+                        info="Document sets are saved here automatically after indexing"
+                    )
+
+                    with gr.Row():
+                        open_corpus_btn = gr.Button("📂 Open Corpus", elem_classes="btn-primary")
+                        refresh_corpora_btn = gr.Button("🔄 Refresh List", variant="secondary")
+
                 gr.Markdown("### 📄 Document Upload", elem_classes="section-header")
                 
                 # Enhanced File Upload Section
@@ -519,11 +563,21 @@ def main():
                     placeholder="Ask detailed questions about the content, request summaries, comparisons, or specific data extraction...",
                     info="Be specific for better results. Example: 'What are the key performance metrics mentioned in Q3 2023?'"
                 )
+                profile_question = gr.Checkbox(
+                    label="🔬 Profile this question",
+                    value=False,
+                    info=f"Writes a profile named after the request ID to '{settings.PROFILING_DIR}/'"
+                )
                 
                 # Progress and Status Section
                 gr.Markdown("### 📊 Processing Status", elem_classes="section-header")
                 
                 with gr.Group():
+                    model_status = gr.Markdown(
+                        warmup.status_markdown() if settings.WARMUP_ENABLED else "🟢 **Models ready**",
+                        elem_classes="status-indicator"
+                    )
+
                     status_display = gr.Markdown(
                         "🟢 **Ready** - Upload documents and ask your question",
                         elem_classes="status-indicator"
@@ -536,7 +590,7 @@ def main():
                 
                 # Submit Section
                 with gr.Row():
-                    submit_btn = gr.Button("🚀 Analyze Documents", elem_classes="btn-primary", variant="primary", scale=2)
+                    submit_btn = gr.Button("🚀 Analyze Documents", elem_classes="btn-primary", variant="primary", scale=2, interactive=models_ready())
                     reset_btn = gr.Button("🔄 Reset", variant="secondary", scale=1)
             
             # Right Column - Output Section  
@@ -587,13 +641,18 @@ def main():
                             clear_history_btn = gr.Button("🗑️ Clear History", size="sm")
                             export_history_btn = gr.Button("💾 Export History", size="sm")
 
-        # Session state management
-        session_state = gr.State({
-            "file_hashes": frozenset(),
-            "retriever": None,
-            "history": [],
-            "current_files": []
-        })
+        # Session state management: the session refers to its corpus by name, so the
+        # retriever itself stays in the corpus store where it can be evicted and reloaded
+        def release_session(state: Dict):
+            """Called by Gradio when a session closes or its state expires."""
+            sessions.release(state)
+            corpus_store.sweep()
+
+        session_state = gr.State(
+            _new_session_state(),
+            time_to_live=settings.SESSION_TTL_SECONDS,
+            delete_callback=release_session
+        )
 
         # Enhanced helper functions
         def update_example_info(example_key: str):
@@ -660,8 +719,9 @@ def main():
             else:
                 return f"✅ **Uploaded:** {file_count} files ({size_mb:.1f}MB)"
         
-        def reset_interface():
+        def reset_interface(state: Dict):
             """Reset the entire interface to initial state."""
+            sessions.release(state)
             return (
                 None,  # example_dropdown
                 [],    # files
@@ -672,7 +732,8 @@ def main():
                 "",    # answer_output
                 "",    # verification_output
                 "Your session history will be displayed here...",  # session_history
-                {"file_hashes": frozenset(), "retriever": None, "history": [], "current_files": []}  # session_state
+                _new_session_state(),  # session_state
+                gr.update(visible=False)  # progress_bar
             )
 
         load_example_btn.click(
@@ -682,30 +743,107 @@ def main():
         )
 
         # Enhanced processing function with progress tracking and history
-        def process_question(question_text: str, uploaded_files: List, state: Dict):
-            """Handle questions with enhanced progress tracking and history management."""
+        def _error_outputs(error: Exception, state: Dict):
+            """Answer/verification/status/history/state outputs describing a failure."""
+            history_display = _format_history(state.get("history", []))
+            hide_progress = gr.update(visible=False)
+            request_note = _request_note(state)
+            if isinstance(error, ValueError):
+                logger.warning(f"Validation error: {str(error)}")
+                error_status = "⚠️ **Validation Error** - Please check your inputs" + request_note
+                return str(error), "", error_status, history_display, state, hide_progress
+
+            if isinstance(error, ModelBusyError):
+                logger.warning(f"Model busy: {str(error)}")
+                busy_msg = f"⏳ **Server Busy:** {str(error)}"
+                busy_status = "🟠 **Busy** - Too many questions in flight, please retry shortly" + request_note
+                return busy_msg, "", busy_status, history_display, state, hide_progress
+
+            logger.error(f"Processing error: {str(error)}")
+            error_msg = (
+                f"❌ **Processing Failed:** {str(error)}\n\n"
+                "🔧 **Troubleshooting Steps:**\n"
+                "• Check if Ollama is running: `ollama serve`\n"
+                "• Try with simpler text/markdown files\n"
+                "• Use the provided example documents\n"
+                "• Verify files are not corrupted or encrypted\n"
+                "• Restart the application if issues persist"
+            )
+            error_status = "❌ **Critical Error** - Processing failed" + request_note
+            return error_msg, "", error_status, history_display, state, hide_progress
+
+        def _stream_progress(span_name: str, state: Dict, fn, *args, profile: bool = None):
+            """
+            Run fn on a worker thread under the request's root span, yielding a UI
+            update per progress event; returns fn's result.
+            """
+            tracker = ProgressTracker(request_id=state["request_id"])
+
+            def traced():
+                # Profiled on the worker thread, where the request actually runs
+                with tracing.request_span(span_name, tracker.request_id), \
+                        profiling.profile_request(tracker.request_id, enabled=profile):
+                    return tracker.run(fn, *args)
+
+            future = progress_pool.submit(traced)
+            try:
+                while True:
+                    event = tracker.next_event(timeout=0.25)
+                    if event is not None:
+                        yield gr.update(), gr.update(), _progress_status(event), gr.update(), state, _progress_bar(event["percent"])
+                    elif future.done():
+                        return future.result()
+            finally:
+                # Gradio closes the generator on reset, disconnect or a new submission:
+                # drop queued work and stop running work at its next progress point
+                if not future.done():
+                    future.cancel()
+                    tracker.cancel()
+
+        # Indexing stage of a submission (runs on the "indexing" queue)
+        def prepare_documents(question_text: str, uploaded_files: List, state: Dict):
+            """Validate the submission and make sure the session has an index for its documents."""
+            state["ready_to_answer"] = False
+            # One ID for both stages of the submission; it tags their traces and is shown in the status
+            state["request_id"] = tracing.new_request_id()
             try:
                 # Initial validation
                 if not question_text.strip():
                     raise ValueError("❌ Question cannot be empty")
-                if not uploaded_files:
-                    raise ValueError("❌ No documents uploaded")
+                if not uploaded_files and state["corpus"] is None:
+                    raise ValueError("❌ No documents uploaded or corpus selected")
+                if not models_ready():
+                    raise ValueError("⏳ Models are still warming up, please try again in a moment")
 
-                # Update processing status
-                processing_status = "🔄 **Processing** - Analyzing documents..."
-                
-                current_hashes = _get_file_hashes(uploaded_files)
-                file_names = [f.name.split('/')[-1] if hasattr(f, 'name') else str(f) for f in uploaded_files]
+                if uploaded_files:
+                    current_hashes = _get_file_hashes(uploaded_files)
+                    file_names = [f.name.split('/')[-1] if hasattr(f, 'name') else str(f) for f in uploaded_files]
+                else:
+                    # Questions against a corpus opened from the library
+                    current_hashes = state["file_hashes"]
+                    file_names = state["current_files"]
                 
+                # The session's corpus may have been pruned or deleted since it was built
+                corpus_missing = state["corpus"] is not None and not corpus_store.exists(state["corpus"])
+                if corpus_missing and not uploaded_files:
+                    state["corpus"] = None
+                    raise ValueError("❌ The selected corpus no longer exists, please upload the documents again")
+
                 # Process documents if needed
-                if state["retriever"] is None or current_hashes != state["file_hashes"]:
+                if state["corpus"] is None or corpus_missing or current_hashes != state["file_hashes"]:
                     logger.info("Processing new/changed documents...")
-                    processing_status = "⚙️ **Processing Documents** - Extracting and indexing content..."
-                    
-                    # Process documents with better error handling
-                    chunks = processor.process(uploaded_files)
+                    yield (
+                        gr.update(), gr.update(),
+                        "⚙️ **Processing Documents** - Extracting and indexing content...",
+                        gr.update(), state, _progress_bar(0)
+                    )
                     
-                    if not chunks:
+                    # Reuse a stored corpus for the same files; otherwise index and save one
+                    try:
+                        corpus_name, _, current_hashes = yield from _stream_progress(
+                            "ui.index", state, corpus_store.get_or_build, uploaded_files, processor
+                        )
+                    except ValueError:
                         error_msg = (
                             "⚠️ Unable to extract text from the uploaded documents.\n\n"
                             "🔍 **Possible causes:**\n"
@@ -717,81 +855,120 @@ def main():
                             "• Try the provided example documents\n"
                             "• Ensure files are not password-protected"
                         )
-                        error_status = "❌ **Error** - Document processing failed"
-                        return error_msg, "", error_status, state
-                    
-                    processing_status = "🔍 **Building Index** - Creating search index..."
-                    
-                    # Build retriever with validation
-                    retriever = retriever_builder.build_hybrid_retriever(chunks)
+                        error_status = "❌ **Error** - Document processing failed" + _request_note(state)
+                        yield error_msg, "", error_status, _format_history(state["history"]), state, gr.update(visible=False)
+                        return
                     
                     state.update({
                         "file_hashes": current_hashes,
-                        "retriever": retriever,
+                        "corpus": corpus_name,
                         "current_files": file_names
                     })
+                    sessions.touch(state)
                     
-                    logger.info(f"Successfully processed {len(chunks)} document chunks")
-                
-                processing_status = "🤖 **Generating Answer** - AI is analyzing your question..."
+                    logger.info(f"Using corpus '{corpus_name}' for {len(file_names)} files")
+
+                state["ready_to_answer"] = True
+                yield (
+                    gr.update(), gr.update(),
+                    "🔍 **Documents Ready** - Waiting for an answer slot...",
+                    gr.update(), state, _progress_bar(0)
+                )
+
+            except Exception as e:
+                yield _error_outputs(e, state)
+
+        def _answer(question_text: str, corpus_name: str, file_hashes):
+            # Pinned on the worker for exactly as long as the pipeline runs: reloaded from disk
+            # if it was evicted, and released even when the UI stops listening
+            with corpus_store.using(corpus_name) as retriever:
+                return workflow.full_pipeline(question_text, retriever, file_hashes)
+
+        # Answering stage of a submission (runs on the "qa" queue)
+        def process_question(question_text: str, state: Dict, profile: bool = False):
+            """Run the agent workflow for a prepared submission and update the history."""
+            if not state.get("ready_to_answer"):
+                # The indexing stage already reported why it stopped
+                yield gr.update(), gr.update(), gr.update(), gr.update(), state, gr.update()
+                return
+            state["ready_to_answer"] = False
+
+            try:
+                yield (
+                    gr.update(), gr.update(),
+                    "🤖 **Generating Answer** - AI is analyzing your question...",
+                    gr.update(), state, _progress_bar(0)
+                )
                 
                 # Run the workflow
-                result = workflow.full_pipeline(
-                    question=question_text,
-                    retriever=state["retriever"]
-                )
+                with metrics.track_question("ui"):
+                    result = yield from _stream_progress(
+                        "ui.answer", state, _answer,
+                        question_text, state["corpus"], state["file_hashes"],
+                        profile=profile or None
+                    )
                 
                 # Update session history
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 history_entry = {
                     "timestamp": timestamp,
                     "question": question_text,
-                    "files": file_names,
+                    "files": state["current_files"],
                     "answer_preview": result["draft_answer"][:200] + "..." if len(result["draft_answer"]) > 200 else result["draft_answer"]
                 }
                 
                 state["history"].append(history_entry)
+                del state["history"][:-settings.SESSION_HISTORY_MAX_ENTRIES]
+                sessions.touch(state)
                 
                 # Format history display
-                history_display = "\n\n".join([
-                    f"**{entry['timestamp']}**\n"
-                    f"**Q:** {entry['question']}\n"
-                    f"**Files:** {', '.join(entry['files'])}\n"
-                    f"**Answer:** {entry['answer_preview']}"
-                    for entry in state["history"][-5:]  # Show last 5 entries
-                ])
-                
-                if not history_display:
-                    history_display = "Your session history will be displayed here..."
+                history_display = _format_history(state["history"])
                 
-                success_status = f"✅ **Complete** - Analysis finished successfully ({timestamp})"
+                success_status = f"✅ **Complete** - Analysis finished successfully ({timestamp})" + _request_note(state)
                 
-                return (
+                yield (
                     result["draft_answer"], 
                     result["verification_report"], 
                     success_status,
                     history_display,
-                    state
+                    state,
+                    gr.update(visible=False)
                 )
                     
-            except ValueError as ve:
-                logger.warning(f"Validation error: {str(ve)}")
-                error_status = "⚠️ **Validation Error** - Please check your inputs"
-                return str(ve), "", error_status, state.get("history", "Your session history will be displayed here..."), state
-                
             except Exception as e:
-                logger.error(f"Processing error: {str(e)}")
-                error_msg = (
-                    f"❌ **Processing Failed:** {str(e)}\n\n"
-                    "🔧 **Troubleshooting Steps:**\n"
-                    "• Check if Ollama is running: `ollama serve`\n"
-                    "• Try with simpler text/markdown files\n"
-                    "• Use the provided example documents\n"
-                    "• Verify files are not corrupted or encrypted\n"
-                    "• Restart the application if issues persist"
-                )
-                error_status = "❌ **Critical Error** - Processing failed"
-                return error_msg, "", error_status, state.get("history", "Your session history will be displayed here..."), state
+                yield _error_outputs(e, state)
+
+        def open_corpus(corpus_name: str, state: Dict):
+            """Load a stored corpus into the session without re-processing its files."""
+            if not corpus_name:
+                return "⚠️ **No corpus selected**", state
+            try:
+                corpus_store.load(corpus_name)
+                manifest = corpus_store.manifest(corpus_name)
+            except Exception as e:
+                logger.error(f"Failed to open corpus {corpus_name}: {e}")
+                return f"❌ **Error:** Could not open corpus '{corpus_name}'", state
+
+            state.update({
+                "file_hashes": frozenset(manifest["file_hashes"]),
+                "corpus": corpus_name,
+                "current_files": manifest["file_names"]
+            })
+            sessions.touch(state)
+            return (
+                f"✅ **Corpus opened:** {corpus_name} ({len(manifest['file_names'])} files, "
+                f"{manifest['chunk_count']} chunks) - ask your question"
+            ), state
+
+        def refresh_corpora():
+            """Reload the corpus list from disk."""
+            return gr.update(choices=[m["name"] for m in corpus_store.list_corpora()])
+
+        def refresh_model_status():
+            """Report model readiness and only enable submission once the models are hot."""
+            if not settings.WARMUP_ENABLED:
+                return "🟢 **Models ready**", gr.update(interactive=True)
+            return warmup.status_markdown(), gr.update(interactive=models_ready())
 
         # Export and utility functions
         def export_answer(answer_text):
@@ -839,11 +1016,40 @@ def main():
             
             return filename
         
-        def clear_history():
+        def clear_history(state: Dict):
             """Clear the session history."""
-            return "Your session history will be displayed here..."
+            state["history"] = []
+            sessions.touch(state)
+            return "Your session history will be displayed here...", state
         
         # Event handlers
+
+        # Corpus library
+        open_corpus_btn.click(
+            fn=open_corpus,
+            inputs=[corpus_dropdown, session_state],
+            outputs=[status_display, session_state]
+        )
+
+        refresh_corpora_btn.click(
+            fn=refresh_corpora,
+            inputs=[],
+            outputs=[corpus_dropdown]
+        )
+
+        # Poll model warm-up readiness; off the queue, so polls never wait behind (or hold up) real work
+        model_status_timer = gr.Timer(settings.WARMUP_STATUS_POLL_SECONDS)
+        model_status_timer.tick(
+            fn=refresh_model_status,
+            inputs=[],
+            outputs=[model_status, submit_btn],
+            queue=False
+        )
+        demo.load(
+            fn=refresh_model_status,
+            inputs=[],
+            outputs=[model_status, submit_btn]
+        )
         
         # Example dropdown change
         example_dropdown.change(
@@ -876,21 +1082,37 @@ def main():
         # Reset button
         reset_btn.click(
             fn=reset_interface,
-            inputs=[],
+            inputs=[session_state],
             outputs=[
                 example_dropdown, files, question, example_info, 
                 file_status, status_display, answer_output, 
-                verification_output, session_history, session_state
+                verification_output, session_history, session_state, progress_bar
             ]
         )
         
-        # Main submit button
-        submit_btn.click(
-            fn=process_question,
+        # Main submit button: indexing and answering run on separate queues so a
+        # long ingestion does not hold up questions against already-indexed documents
+        index_event = submit_btn.click(
+            fn=prepare_documents,
             inputs=[question, files, session_state],
-            outputs=[answer_output, verification_output, status_display, session_history, session_state]
+            outputs=[answer_output, verification_output, status_display, session_history, session_state, progress_bar],
+            concurrency_limit=settings.INDEXING_CONCURRENCY_LIMIT,
+            concurrency_id="indexing",
+            show_progress="full",
+            trigger_mode="once"
+        )
+        answer_event = index_event.then(
+            fn=process_question,
+            inputs=[question, session_state, profile_question],
+            outputs=[answer_output, verification_output, status_display, session_history, session_state, progress_bar],
+            concurrency_limit=settings.QA_CONCURRENCY_LIMIT,
+            concurrency_id="qa",
+            show_progress="full"
         )
         
+        # Reset also cancels a submission that is still queued or running
+        reset_btn.click(fn=None, inputs=[], outputs=[], cancels=[index_event, answer_event])
+
         # Export buttons
         export_answer_btn.click(
             fn=export_answer,
@@ -913,14 +1135,27 @@ def main():
         # Clear history button
         clear_history_btn.click(
             fn=clear_history,
-            inputs=[],
-            outputs=[session_history]
+            inputs=[session_state],
+            outputs=[session_history, session_state]
         )
 
+    # Bounded queue; per-event limits are set on the submit events above
+    demo.queue(
+        default_concurrency_limit=settings.GRADIO_DEFAULT_CONCURRENCY_LIMIT,
+        max_size=settings.GRADIO_QUEUE_MAX_SIZE
+    )
+
+    if settings.API_ENABLED or settings.METRICS_ENABLED:
+        # Serve the REST API and/or /metrics and the UI from one FastAPI app
+        server = create_api_app(processor, corpus_store, workflow)
+        server = gr.mount_gradio_app(server, demo, path="/")
+        uvicorn.run(server, host=settings.SERVER_HOST, port=settings.SERVER_PORT)
+        return
+
     # Launch with enhanced configuration
     demo.launch(
-        server_name="127.0.0.1", 
-        server_port=5000, 
+        server_name=settings.SERVER_HOST, 
+        server_port=settings.SERVER_PORT, 
         share=True,
         show_api=True,
         show_error=True,
@@ -932,6 +1167,50 @@ def main():
         }
     )
 
+def _request_note(state: Dict) -> str:
+    """Request ID suffix for status lines, so a report can be matched to its trace."""
+    request_id = state.get("request_id")
+    return f" · Request `{request_id}`" if request_id else ""
+
+def _progress_status(event: Dict) -> str:
+    """Status line for a progress event: stage, detail, percentage and ETA."""
+    status = f"⚙️ **{event['label']}** - {event['message']}"
+    if event["percent"] is not None:
+        status += f" ({event['percent']:.0f}%"
+        if event["eta_seconds"] is not None:
+            status += f", ~{event['eta_seconds']:.0f}s left"
+        status += ")"
+    return status
+
+def _progress_bar(percent) -> Dict:
+    """Visible progress bar at the given percentage (unchanged width when unknown)."""
+    if percent is None:
+        return gr.update(visible=True)
+    return gr.update(
+        value=f'<div class="progress-bar"><div class="progress-bar-fill" style="width: {percent:.0f}%"></div></div>',
+        visible=True
+    )
+
+def _new_session_state() -> Dict:
+    return {
+        "file_hashes": frozenset(),
+        "corpus": None,
+        "ready_to_answer": False,
+        "history": [],
+        "current_files": []
+    }
+
+def _format_history(history: List[Dict]) -> str:
+    """Render the last five history entries for the history tab."""
+    history_display = "\n\n".join([
+        f"**{entry['timestamp']}**\n"
+        f"**Q:** {entry['question']}\n"
+        f"**Files:** {', '.join(entry['files'])}\n"
+        f"**Answer:** {entry['answer_preview']}"
+        for entry in history[-5:]  # Show last 5 entries
+    ])
+    return history_display or "Your session history will be displayed here..."
+
 def _get_file_hashes(uploaded_files: List) -> frozenset:
     """Generate SHA-256 hashes for uploaded files."""
     hashes = set()
@@ -0,0 +1,211 @@
+"""
+Answer-quality regression benchmark for AgentWorkflow.full_pipeline.
+
+Answers a fixed synthetic question set (benchmarks.corpus, where every
+question has a known answer) under several configurations and reports, per
+configuration: end-to-end latency, LLM calls and prompt/completion tokens per
+question, re-research iterations, verification pass rate, and the share of
+answers that contain the expected value. Runs offline against the mock Ollama
+server, so a change to prompts, context packing, speculation or caching can be
+checked for both speed and behaviour without a live model.
+
+Each configuration is a preset of settings overrides on top of the benchmark
+defaults (all caches off). With --passes 2 the question set is asked twice,
+which shows what the caches save on repeated questions.
+
+--record saves every Ollama exchange to a cassette (agents.cassette), from the
+mock server or, with --live, from the configured Ollama; --replay answers from
+a cassette with no server at all, so a prompt or context-packing change can be
+compared on exactly the same recorded model outputs. Token and call counts come
+from the mock server and are omitted in replay and live runs. Recording turns
+the LLM, answer and embedding caches off for every configuration (a cached
+call would be missing from the cassette), so the cache presets only differ
+from baseline in replay or unrecorded runs.
+
+Usage:
+    python -m benchmarks.answer_quality --configs baseline speculative llm_cache --passes 2
+    python -m benchmarks.answer_quality --output /tmp/answer_quality-new.json --baseline /tmp/answer_quality.json
+    python -m benchmarks.answer_quality --live --record cassettes/gemma2.jsonl.gz --configs baseline
+    python -m benchmarks.answer_quality --replay cassettes/gemma2.jsonl.gz --configs baseline
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.common import compare, default_output, isolate_settings, latency_summary, write_results
+from benchmarks.corpus import write_corpus
+from benchmarks.mock_ollama import MockOllamaServer
+
+logger = logging.getLogger(__name__)
+
+# Settings overrides per configuration
+CONFIGS = {
+    "baseline": {},
+    "speculative": {"SPECULATIVE_RELEVANCE": True},
+    "llm_cache": {"LLM_CACHE_ENABLED": True},
+    "answer_cache": {"ANSWER_CACHE_ENABLED": True},
+    "rerank_lexical": {"RERANKER_ENABLED": True, "RERANKER_BACKEND": "lexical"},
+}
+
+def fresh_clients():
+    """Drop the process-wide model pool and LLM cache so the next workflow reads the current settings."""
+    from agents import llm_cache, model_pool
+    if model_pool._model_pool is not None and model_pool._model_pool._cassette is not None:
+        # Closes a cassette being recorded; the next pool's recorder continues the file
+        model_pool._model_pool._cassette.finish()
+    model_pool._model_pool = None
+    llm_cache._llm_cache = None
+
+def run_pass(workflow, retriever, questions: List[Dict], file_hashes, server: MockOllamaServer = None) -> Dict:
+    if server:
+        server.reset_stats()
+    latencies, iterations = [], []
+    verified = correct = cache_hits = errors = 0
+    for item in questions:
+        start = time.perf_counter()
+        try:
+            result = workflow.full_pipeline(item["question"], retriever, file_hashes=file_hashes)
+        except Exception:
+            # Counted in the run's results; the traceback goes to the benchmark log
+            logger.exception(f"full_pipeline failed on question: {item['question']}")
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        iterations.append(result.get("research_iterations", 0))
+        verified += bool(result.get("verified"))
+        cache_hits += "cache_hit" in result
+        correct += item["answer"].lower() in result["draft_answer"].lower()
+    calls = server.stats() if server else {}
+    n = len(questions) or 1
+
+    def per_question(key: str, digits: int):
+        return round(calls[key] / n, digits) if key in calls else None
+
+    return {
+        "questions": len(questions),
+        "errors": errors,
+        "latency": latency_summary(latencies),
+        "llm_calls_per_question": per_question("chat_calls", 2),
+        "embed_requests_per_question": per_question("embed_calls", 2),
+        "prompt_tokens_per_question": per_question("prompt_tokens", 1),
+        "completion_tokens_per_question": per_question("completion_tokens", 1),
+        "research_iterations": {
+            "mean": round(sum(iterations) / len(iterations), 3) if iterations else None,
+            "max": max(iterations, default=None),
+            "re_research_rate": round(sum(i > 1 for i in iterations) / n, 3),
+        },
+        "verification_pass_rate": round(verified / n, 3),
+        "answer_cache_hit_rate": round(cache_hits / n, 3),
+        "answer_contains_expected": round(correct / n, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Score full_pipeline answers per configuration, offline.")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=sorted(CONFIGS))
+    parser.add_argument("--documents", type=int, default=20, help="Synthetic corpus size")
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--passes", type=int, default=1, help="Times the question set is asked per configuration")
+    parser.add_argument("--chat-latency", type=float, default=0.02, help="Mock seconds per chat request")
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="Mock seconds per embedding request")
+    parser.add_argument("--tokens-per-second", type=float, help="Mock generation speed")
+    parser.add_argument("--supported-rate", type=float, default=0.8,
+                        help="Share of mock verifications that pass (the rest trigger re-research)")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record all Ollama traffic to this cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Answer from this cassette instead of a server")
+    parser.add_argument("--replay-latency-scale", type=float, default=0.0,
+                        help="Replay delay as a multiple of the recorded duration")
+    parser.add_argument("--live", action="store_true", help="Use the configured Ollama instead of the mock server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", default=default_output("answer_quality"),
+                        help="Results file (default: a docchat-benchmarks directory under the temp dir)")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    args = parser.parse_args()
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    if args.record:
+        cached = [name for name in args.configs if any("CACHE" in key for key in CONFIGS[name])]
+        if cached:
+            print(f"Note: caches are off while recording, so {', '.join(cached)} will run like baseline")
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="docchat-answer-bench-"))
+    server = None
+    if not (args.live or args.replay):
+        server = MockOllamaServer(chat_latency=args.chat_latency, embed_latency=args.embed_latency,
+                                  tokens_per_second=args.tokens_per_second, supported_rate=args.supported_rate).start()
+    base_url = server.url if server else None
+    cassette = {}
+    if args.record or args.replay:
+        cassette = {
+            "OLLAMA_CASSETTE_MODE": "record" if args.record else "replay",
+            "OLLAMA_CASSETTE_PATH": args.record or args.replay,
+            "OLLAMA_CASSETTE_LATENCY_SCALE": args.replay_latency_scale,
+        }
+    results = []
+    try:
+        isolate_settings(str(workdir), base_url=base_url, **cassette)
+        from document_processor.file_handler import DocumentProcessor, LocalFile
+        from retriever.builder import RetrieverBuilder
+        from retriever.corpus_store import CorpusStore
+
+        # One corpus and index shared by every configuration
+        paths, qa = write_corpus(str(workdir / "corpus"), args.documents, seed=args.seed)
+        chunks = DocumentProcessor().process([LocalFile(p) for p in paths])
+        retriever = RetrieverBuilder().build_hybrid_retriever(
+            chunks, persist_directory=str(workdir / "chroma"), collection_name="answer_quality"
+        )
+        file_hashes = frozenset(CorpusStore.file_hash(p) for p in paths)
+        questions = random.Random(args.seed).sample(qa, min(args.questions, len(qa)))
+
+        from agents.workflow import AgentWorkflow
+        for name in args.configs:
+            # Separate cache directories per configuration, so one cannot warm another
+            isolate_settings(str(workdir / name), base_url=base_url, SPECULATIVE_RELEVANCE=False,
+                             **cassette, **CONFIGS[name])
+            fresh_clients()
+            workflow = AgentWorkflow()
+            for number in range(1, args.passes + 1):
+                result = {"run": f"{name}#{number}", "config": name, "pass": number, "overrides": CONFIGS[name],
+                          **run_pass(workflow, retriever, questions, file_hashes, server)}
+                print(
+                    f"{result['run']:<18} p50 {result['latency']['p50']}s p95 {result['latency']['p95']}s"
+                    f" | {result['llm_calls_per_question'] or '-'} LLM calls/q"
+                    f" | tokens {result['prompt_tokens_per_question'] or '-'} in"
+                    f" / {result['completion_tokens_per_question'] or '-'} out"
+                    f" | iterations {result['research_iterations']['mean']}"
+                    f" | verified {result['verification_pass_rate']:.0%}"
+                    f" | expected answer {result['answer_contains_expected']:.0%}"
+                    f" | errors {result['errors']}/{result['questions']}"
+                )
+                results.append(result)
+    finally:
+        if server:
+            server.stop()
+
+    parameters = {k: v for k, v in vars(args).items() if k not in {"output", "baseline", "workdir"}}
+    write_results(args.output, "answer_quality", parameters, results)
+    print(f"Results written to {args.output}")
+    errors = {}
+    for result in results:
+        errors[result["config"]] = errors.get(result["config"], 0) + result["errors"]
+    for name, count in errors.items():
+        if count:
+            print(f"{name}: {count} questions failed; tracebacks are in {workdir / name / 'benchmark.log'}")
+    if args.baseline:
+        for line in compare(results, args.baseline, "run", {
+            "answer p50": "latency.p50",
+            "answer p95": "latency.p95",
+            "LLM calls/q": "llm_calls_per_question",
+            "prompt tokens/q": "prompt_tokens_per_question",
+            "verification pass rate": "verification_pass_rate",
+            "expected answer rate": "answer_contains_expected",
+            "errors": "errors",
+        }):
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Helpers shared by the benchmark scripts: isolated settings, statistics and result files."""
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from config.settings import settings
+from utils.logging import setup_logging
+
+def isolate_settings(workdir: str, base_url: str = None, **overrides):
+    """
+    Point every cache, index and log path at `workdir` and turn off the caches
+    that would hide the work being measured, then set up logging to a log file
+    there. Must run before any agent, retriever or model pool is created, since
+    those read settings on init.
+    """
+    root = Path(workdir)
+    root.mkdir(parents=True, exist_ok=True)
+    values = {
+        "CACHE_DIR": str(root / "document_cache"),
+        "CHROMA_DB_PATH": str(root / "chroma_db"),
+        "CORPUS_DIR": str(root / "corpora"),
+        "EMBEDDING_CACHE_PATH": str(root / "embeddings.sqlite"),
+        "LLM_CACHE_DIR": str(root / "llm_cache"),
+        "ANSWER_CACHE_DIR": str(root / "answer_cache"),
+        "RELEVANCE_LOG_PATH": str(root / "relevance_log" / "outcomes.jsonl"),
+        "RELEVANCE_CALIBRATION_PATH": str(root / "relevance_log" / "calibration.json"),
+        "ANSWER_CACHE_ENABLED": False,
+        "LLM_CACHE_ENABLED": False,
+        "EMBEDDING_CACHE_ENABLED": False,
+        "WARMUP_ENABLED": False,
+        "LOG_FILE": str(root / "benchmark.log"),
+    }
+    if base_url:
+        values["OLLAMA_BASE_URL"] = base_url
+    values.update(overrides)
+    for key, value in values.items():
+        setattr(settings, key, value)
+    setup_logging()
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Linear-interpolated percentile (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def latency_summary(seconds: List[float]) -> Dict:
+    return {
+        "count": len(seconds),
+        "mean": round(statistics.fmean(seconds), 4) if seconds else 0.0,
+        "p50": round(percentile(seconds, 50), 4),
+        "p95": round(percentile(seconds, 95), 4),
+        "max": round(max(seconds), 4) if seconds else 0.0,
+    }
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def environment() -> Dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def default_output(benchmark: str) -> str:
+    """Results file used when --output is not given; outside the source tree."""
+    return str(Path(tempfile.gettempdir()) / "docchat-benchmarks" / f"{benchmark}.json")
+
+def write_results(path: str, benchmark: str, parameters: Dict, results: List[Dict]) -> Dict:
+    payload = {"benchmark": benchmark, "environment": environment(), "parameters": parameters, "results": results}
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return payload
+
+def compare(results: List[Dict], baseline_path: str, key: str, metrics: Dict[str, str]) -> List[str]:
+    """
+    Lines describing the change of each metric against a previous results file.
+    `metrics` maps a label to a dotted path into a result, e.g. {"p95": "query.latency.p95"}.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r[key]: r for r in json.load(f)["results"]}
+    lines = []
+    for result in results:
+        previous = baseline.get(result[key])
+        if previous is None:
+            continue
+        for label, dotted in metrics.items():
+            new, old = _lookup(result, dotted), _lookup(previous, dotted)
+            if isinstance(new, (int, float)) and isinstance(old, (int, float)) and old:
+                lines.append(f"{key}={result[key]} {label}: {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+    return lines
+
+def _lookup(result: Dict, dotted: str):
+    for part in dotted.split("."):
+        if not isinstance(result, dict):
+            return None
+        result = result.get(part)
+    return result
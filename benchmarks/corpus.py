@@ -0,0 +1,74 @@
+"""
+Deterministic synthetic corpora for benchmarks.
+
+Each document describes a handful of made-up entities with one fact per
+attribute, so generated questions ("What is the <attribute> of <entity>?")
+have a known answering chunk. The same seed always yields the same files.
+"""
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ATTRIBUTES = ["capacity", "origin", "founder", "budget", "location", "status", "material", "purpose"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ven", "tor", "sil", "ba", "nek", "da", "qu", "zel", "fo", "rin", "pa", "shu"]
+
+def _word(rng: random.Random, syllables: int = 3) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllables))
+
+def synthetic_documents(count: int, entities_per_doc: int = 4, filler_sentences: int = 6,
+                        seed: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Returns (documents, questions). Documents are {"title", "sections": [(heading, text)]};
+    questions are {"question", "answer", "document", "section"}.
+    """
+    rng = random.Random(seed)
+    documents, questions = [], []
+    for d in range(count):
+        title = f"{_word(rng).title()} Report {d + 1}"
+        sections = []
+        for _ in range(entities_per_doc):
+            entity = f"{_word(rng).title()} {_word(rng, 2).title()}"
+            sentences = []
+            for attribute in rng.sample(ATTRIBUTES, 3):
+                value = f"{_word(rng)} {rng.randint(10, 9999)}"
+                sentences.append(f"The {attribute} of {entity} is {value}.")
+                questions.append({
+                    "question": f"What is the {attribute} of {entity}?",
+                    "answer": value,
+                    "document": d,
+                    "section": entity,
+                })
+            for _ in range(filler_sentences):
+                words = " ".join(_word(rng, rng.randint(1, 3)) for _ in range(rng.randint(8, 16)))
+                sentences.append(words.capitalize() + ".")
+            rng.shuffle(sentences)
+            sections.append((entity, " ".join(sentences)))
+        documents.append({"title": title, "sections": sections})
+    return documents, questions
+
+def render_markdown(document: Dict) -> str:
+    parts = [f"# {document['title']}"]
+    for heading, text in document["sections"]:
+        parts.append(f"## {heading}\n\n{text}")
+    return "\n\n".join(parts) + "\n"
+
+def render_text(document: Dict) -> str:
+    parts = [document["title"]]
+    for heading, text in document["sections"]:
+        parts.append(f"{heading}\n{text}")
+    return "\n\n".join(parts) + "\n"
+
+def write_corpus(directory: str, count: int, fmt: str = "md", seed: int = 0, **options) -> Tuple[List[str], List[Dict]]:
+    """Write `count` documents as .md or .txt files; returns (paths, questions)."""
+    renderers = {"md": render_markdown, "txt": render_text}
+    if fmt not in renderers:
+        raise ValueError(f"Unsupported corpus format: {fmt}")
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    documents, questions = synthetic_documents(count, seed=seed, **options)
+    paths = []
+    for i, document in enumerate(documents):
+        path = root / f"doc_{i:05d}.{fmt}"
+        path.write_text(renderers[fmt](document), encoding="utf-8")
+        paths.append(str(path))
+    return paths, questions
@@ -0,0 +1,175 @@
+"""
+Synthetic PDF, DOCX, Markdown and TXT files for ingestion benchmarks.
+
+Sizes are expressed in pages. Each page holds a block of synthetic prose
+(from benchmarks.corpus), optionally followed by tables; a `scanned_ratio`
+share of pages is rendered as an image only, like a scan without a text
+layer, which pypdfium2 cannot extract from. PDFs are written directly (no
+PDF library needed); DOCX files use python-docx and images use Pillow.
+"""
+import io
+import random
+import textwrap
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.corpus import synthetic_documents
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, in points
+LINES_PER_PAGE = 46
+LINE_CHARS = 95
+
+def page_contents(pages: int, tables_per_page: int = 0, scanned_ratio: float = 0.0, seed: int = 0) -> List[Dict]:
+    """Per-page content: {"heading", "lines", "tables": [rows], "scanned"}."""
+    rng = random.Random(seed)
+    documents, _ = synthetic_documents(max(1, pages), entities_per_doc=3, filler_sentences=10, seed=seed)
+    scanned = set(rng.sample(range(pages), round(pages * scanned_ratio)))
+    contents = []
+    for number in range(pages):
+        heading, text = documents[number]["sections"][0]
+        body = " ".join(t for _, t in documents[number]["sections"])
+        lines = textwrap.wrap(body, LINE_CHARS)[:LINES_PER_PAGE - 8 * tables_per_page]
+        tables = [
+            [["Item", "Quantity", "Cost"]] + [
+                [f"{heading.split()[0]} {r + 1}", str(rng.randint(1, 500)), f"{rng.uniform(1, 1000):.2f}"]
+                for r in range(5)
+            ]
+            for _ in range(tables_per_page)
+        ]
+        contents.append({"heading": heading, "lines": lines, "tables": tables, "scanned": number in scanned})
+    return contents
+
+def write_pdf(path: str, pages: int, tables_per_page: int = 0, scanned_ratio: float = 0.0, seed: int = 0) -> str:
+    contents = page_contents(pages, tables_per_page, scanned_ratio, seed)
+    objects: List[bytes] = []
+
+    def add(data: bytes) -> int:
+        objects.append(data)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    page_tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for content in contents:
+        resources = f"/Font << /F1 {font} 0 R >>"
+        if content["scanned"]:
+            image, width, height = _render_scan(content)
+            image_id = add(
+                f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace /DeviceGray "
+                f"/BitsPerComponent 8 /Filter /DCTDecode /Length {len(image)} >>\nstream\n".encode()
+                + image + b"\nendstream"
+            )
+            resources += f" /XObject << /Im1 {image_id} 0 R >>"
+            stream = f"q {PAGE_WIDTH} 0 0 {PAGE_HEIGHT} 0 0 cm /Im1 Do Q".encode()
+        else:
+            stream = _text_stream(content)
+        stream_id = add(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << {resources} >> /Contents {stream_id} 0 R >>".encode()
+        ))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {page_tree} 0 R >>".encode()
+    kids = " ".join(f"{p} 0 R" for p in page_ids)
+    objects[page_tree - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, data in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + data + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    Path(path).write_bytes(bytes(out))
+    return path
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _text_stream(content: Dict) -> bytes:
+    ops = ["BT", "/F1 14 Tf", f"50 {PAGE_HEIGHT - 60} Td", "14 TL", f"({_pdf_escape(content['heading'])}) Tj", "T*",
+           "/F1 10 Tf", "12 TL"]
+    for line in content["lines"]:
+        ops += [f"({_pdf_escape(line)}) Tj", "T*"]
+    ops.append("ET")
+    # Tables go below the prose as a ruled grid of text cells
+    y = PAGE_HEIGHT - 90 - 12 * len(content["lines"])
+    for table in content["tables"]:
+        for row in table:
+            y -= 14
+            ops.append(f"50 {y - 3} 480 14 re S")
+            for column, cell in enumerate(row):
+                ops.append(f"BT /F1 9 Tf {55 + column * 160} {y + 1} Td ({_pdf_escape(cell)}) Tj ET")
+        y -= 16
+    return "\n".join(ops).encode("latin-1", errors="replace")
+
+def _render_scan(content: Dict, scale: int = 2):
+    """Grey JPEG of the page's text, as a scanner would produce."""
+    from PIL import Image, ImageDraw
+    width, height = PAGE_WIDTH * scale, PAGE_HEIGHT * scale
+    image = Image.new("L", (width, height), 245)
+    draw = ImageDraw.Draw(image)
+    y = 60 * scale
+    for line in [content["heading"]] + content["lines"]:
+        draw.text((50 * scale, y), line, fill=20)
+        y += 12 * scale
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=70)
+    return buffer.getvalue(), width, height
+
+def write_docx(path: str, pages: int, tables_per_page: int = 0, scanned_ratio: float = 0.0, seed: int = 0) -> str:
+    from docx import Document as DocxDocument
+    from docx.shared import Inches
+
+    document = DocxDocument()
+    for number, content in enumerate(page_contents(pages, tables_per_page, scanned_ratio, seed)):
+        if number:
+            document.add_page_break()
+        if content["scanned"]:
+            image, _, _ = _render_scan(content, scale=1)
+            document.add_picture(io.BytesIO(image), width=Inches(6))
+            continue
+        document.add_heading(content["heading"], level=2)
+        document.add_paragraph(" ".join(content["lines"]))
+        for rows in content["tables"]:
+            table = document.add_table(rows=len(rows), cols=len(rows[0]))
+            for r, row in enumerate(rows):
+                for c, cell in enumerate(row):
+                    table.cell(r, c).text = cell
+    document.save(path)
+    return path
+
+def write_markdown(path: str, pages: int, tables_per_page: int = 0, seed: int = 0, **_) -> str:
+    parts = []
+    for content in page_contents(pages, tables_per_page, 0.0, seed):
+        parts.append(f"## {content['heading']}\n\n" + " ".join(content["lines"]))
+        for rows in content["tables"]:
+            header, *body = rows
+            table = [f"| {' | '.join(header)} |", "|" + "---|" * len(header)]
+            table += [f"| {' | '.join(row)} |" for row in body]
+            parts.append("\n".join(table))
+    Path(path).write_text("\n\n".join(parts) + "\n", encoding="utf-8")
+    return path
+
+def write_text(path: str, pages: int, tables_per_page: int = 0, seed: int = 0, **_) -> str:
+    parts = []
+    for content in page_contents(pages, tables_per_page, 0.0, seed):
+        parts.append(content["heading"] + "\n" + "\n".join(content["lines"]))
+        for rows in content["tables"]:
+            parts.append("\n".join("\t".join(row) for row in rows))
+    Path(path).write_text("\n\n".join(parts) + "\n", encoding="utf-8")
+    return path
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx, "md": write_markdown, "txt": write_text}
+
+def write_document(directory: str, fmt: str, pages: int, tables_per_page: int = 0,
+                   scanned_ratio: float = 0.0, seed: int = 0) -> str:
+    """Write one synthetic document; the file name records its shape."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported document format: {fmt}")
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    name = f"{fmt}_{pages}p_{tables_per_page}t_{int(scanned_ratio * 100)}s_{seed}.{fmt}"
+    return WRITERS[fmt](str(Path(directory) / name), pages, tables_per_page=tables_per_page,
+                        scanned_ratio=scanned_ratio, seed=seed)
@@ -0,0 +1,153 @@
+"""
+Ingestion micro-benchmarks, per extraction strategy.
+
+Generates synthetic documents (benchmarks.documents) and times each
+DocumentProcessor path on its own: pypdfium2 and simplified docling for PDFs,
+docling for DOCX, the text/markdown splitter, plus file hashing, cache load
+and cross-file deduplication. Reports pages/s and MB/s per strategy, and
+optionally sweeps CHUNK_SIZE for the text splitter, to inform the PDF
+fallback order and chunking defaults.
+
+Usage:
+    python -m benchmarks.ingestion --pages 5 50 --scanned-ratio 0 0.3 --chunk-sizes 500 1000 2000
+    python -m benchmarks.ingestion --formats pdf txt --skip-docling
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.common import default_output, isolate_settings, write_results
+from benchmarks.documents import write_document
+from config.settings import settings
+from document_processor.file_handler import DocumentProcessor, LocalFile
+
+# Extraction strategies per format: (name, DocumentProcessor method, needs docling)
+STRATEGIES = {
+    "pdf": [("pypdfium", "_extract_with_pypdfium", False), ("docling_simple", "_extract_with_simple_docling", True)],
+    "docx": [("docling", "_process_with_docling", True)],
+    "md": [("text", "_process_text_file", False)],
+    "txt": [("text", "_process_text_file", False)],
+}
+
+def timed(fn: Callable, repeat: int):
+    """Median wall time of `repeat` calls, the last result and any error."""
+    durations, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            return None, None, f"{type(e).__name__}: {e}"
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), result, None
+
+def rates(seconds: float, pages: int, size_mb: float) -> Dict:
+    if not seconds:
+        return {"pages_per_second": None, "mb_per_second": None}
+    return {"pages_per_second": round(pages / seconds, 2), "mb_per_second": round(size_mb / seconds, 3)}
+
+def bench_document(processor, path: str, fmt: str, pages: int, repeat: int, skip_docling: bool) -> List[Dict]:
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    file = LocalFile(path)
+    rows, chunks = [], None
+
+    def row(strategy: str, seconds: float, error: str = None, **extra) -> Dict:
+        return {"strategy": strategy, "seconds": round(seconds, 5) if seconds is not None else None,
+                **rates(seconds, pages, size_mb), "error": error, **extra}
+
+    data = Path(path).read_bytes()
+    seconds, _, error = timed(lambda: processor._generate_hash(data), repeat)
+    rows.append(row("hash", seconds, error))
+
+    for name, method, needs_docling in STRATEGIES[fmt]:
+        if needs_docling and skip_docling:
+            continue
+        seconds, result, error = timed(lambda: getattr(processor, method)(file), repeat)
+        extra = {}
+        if result is not None:
+            extra = {"chunks": len(result), "chars": sum(len(c.page_content) for c in result)}
+            if chunks is None and result:
+                chunks = result
+        rows.append(row(name, seconds, error, **extra))
+
+    if chunks:
+        cache_path = processor.cache_path(processor._generate_hash(data))
+        processor._save_to_cache(chunks, cache_path)
+        seconds, _, error = timed(lambda: processor._load_from_cache(cache_path), repeat)
+        rows.append(row("cache_load", seconds, error))
+        # Every chunk twice: half are duplicates, as when overlapping files are uploaded together
+        seconds, _, error = timed(lambda: processor._deduplicate(chunks + chunks, set()), repeat)
+        rows.append(row("dedup", seconds, error, chunks=len(chunks) * 2))
+    return rows
+
+def chunk_size_sweep(processor, path: str, chunk_sizes: List[int], overlap_ratio: float, repeat: int) -> List[Dict]:
+    """Time the plain-text splitter at several CHUNK_SIZE values."""
+    original = settings.CHUNK_SIZE, settings.CHUNK_OVERLAP
+    rows = []
+    try:
+        for size in chunk_sizes:
+            settings.CHUNK_SIZE, settings.CHUNK_OVERLAP = size, int(size * overlap_ratio)
+            seconds, result, error = timed(lambda: processor._process_text_file(LocalFile(path)), repeat)
+            rows.append({
+                "chunk_size": size,
+                "chunk_overlap": settings.CHUNK_OVERLAP,
+                "seconds": round(seconds, 5) if seconds is not None else None,
+                "chunks": len(result) if result else 0,
+                "mean_chunk_chars": round(statistics.fmean(len(c.page_content) for c in result), 1) if result else 0,
+                "error": error,
+            })
+    finally:
+        settings.CHUNK_SIZE, settings.CHUNK_OVERLAP = original
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document extraction strategies.")
+    parser.add_argument("--formats", nargs="+", default=["pdf", "docx", "md", "txt"], choices=sorted(STRATEGIES))
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 50], help="Document sizes in pages")
+    parser.add_argument("--tables", type=int, default=1, help="Tables per page")
+    parser.add_argument("--scanned-ratio", type=float, nargs="+", default=[0.0, 0.3],
+                        help="Share of image-only pages (PDF and DOCX)")
+    parser.add_argument("--chunk-sizes", type=int, nargs="*", default=[500, 1000, 2000],
+                        help="CHUNK_SIZE values to sweep on the largest text document")
+    parser.add_argument("--overlap-ratio", type=float, default=0.2, help="CHUNK_OVERLAP as a share of CHUNK_SIZE")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (median is reported)")
+    parser.add_argument("--skip-docling", action="store_true", help="Skip the (slow) docling strategies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", default=default_output("ingestion"),
+                        help="Results file (default: a docchat-benchmarks directory under the temp dir)")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="docchat-ingest-bench-"))
+    isolate_settings(str(workdir))
+    processor = DocumentProcessor()
+
+    results = []
+    for fmt in args.formats:
+        for pages in args.pages:
+            for scanned_ratio in (args.scanned_ratio if fmt in {"pdf", "docx"} else [0.0]):
+                path = write_document(str(workdir / "documents"), fmt, pages, args.tables, scanned_ratio, args.seed)
+                shape = {"format": fmt, "pages": pages, "tables_per_page": args.tables,
+                         "scanned_ratio": scanned_ratio, "mb": round(os.path.getsize(path) / (1024 * 1024), 3)}
+                for row in bench_document(processor, path, fmt, pages, args.repeat, args.skip_docling):
+                    results.append({**shape, **row})
+                    rate = f"{row['pages_per_second']} pages/s, {row['mb_per_second']} MB/s" if row["seconds"] else row["error"]
+                    print(f"{fmt:>4} {pages:>4}p scanned={scanned_ratio:<4} {row['strategy']:<15} {rate}")
+
+    sweep = []
+    if args.chunk_sizes:
+        path = write_document(str(workdir / "documents"), "txt", max(args.pages), args.tables, 0.0, args.seed)
+        sweep = chunk_size_sweep(processor, path, args.chunk_sizes, args.overlap_ratio, args.repeat)
+        for row in sweep:
+            print(f"chunk_size={row['chunk_size']:<5} {row['chunks']} chunks in {row['seconds']}s")
+
+    parameters = {k: v for k, v in vars(args).items() if k not in {"output", "workdir"}}
+    write_results(args.output, "ingestion", parameters, results + [{"strategy": "chunk_sweep", **row} for row in sweep])
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Stand-in for the Ollama HTTP API, for offline benchmarks.
+
+Serves /api/chat, /api/generate, /api/embed and /api/embeddings (plus the
+/api/tags, /api/show and /api/version probes) with deterministic outputs and
+configurable latency, so the real clients in agents.model_pool can be pointed
+at it unchanged via OLLAMA_BASE_URL.
+
+Chat replies are chosen from the prompt: relevance prompts get a label,
+verification prompts a verdict (JSON or the text format), claim prompts one
+verdict per claim, and anything else an extractive answer built from the
+context sentences that share the most words with the question. Embeddings are
+hashed bag-of-words vectors, so lexically similar texts are close.
+
+Usage:
+    python -m benchmarks.mock_ollama --port 11435 --chat-latency 0.5
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+WORD = re.compile(r"[a-z0-9]+")
+
+class MockOllamaServer:
+    """
+    Threaded mock server. Latency is `chat_latency` (or `embed_latency`) seconds
+    per request plus the completion length over `tokens_per_second`, if set.
+    `supported_rate` is the share of verification calls that pass, chosen
+    deterministically from the prompt so runs are reproducible.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, chat_latency: float = 0.0,
+                 embed_latency: float = 0.0, tokens_per_second: float = None,
+                 embedding_dim: int = 256, supported_rate: float = 1.0):
+        self.chat_latency = chat_latency
+        self.embed_latency = embed_latency
+        self.tokens_per_second = tokens_per_second
+        self.embedding_dim = embedding_dim
+        self.supported_rate = supported_rate
+        self._stats = {"chat_calls": 0, "embed_calls": 0, "embedded_texts": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    # Responses
+
+    def embed(self, text: str) -> List[float]:
+        """Hashed bag-of-words vector, L2-normalised."""
+        vector = [0.0] * self.embedding_dim
+        for word in WORD.findall(text.lower()):
+            digest = hashlib.md5(word.encode()).digest()
+            index = int.from_bytes(digest[:4], "little") % self.embedding_dim
+            vector[index] += 1.0 if digest[4] % 2 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def reply(self, prompt: str, json_mode: bool) -> str:
+        if "CAN_ANSWER, PARTIAL, NO_MATCH" in prompt:
+            return "CAN_ANSWER"
+        if '"verdicts"' in prompt:
+            claims = re.findall(r"^\s*Claim (\d+):", prompt, re.M)
+            verdict = "SUPPORTED" if self._passes(prompt) else "UNSUPPORTED"
+            return json.dumps({"verdicts": [{"claim": int(n), "verdict": verdict, "note": "mock"} for n in claims]})
+        if "verify the accuracy and relevance" in prompt:
+            supported = self._passes(prompt)
+            unsupported = [] if supported else ["The answer includes details not found in the context."]
+            if json_mode:
+                return json.dumps({
+                    "supported": supported, "unsupported_claims": unsupported, "contradictions": [],
+                    "relevant": True, "additional_details": "mock verification",
+                })
+            return (
+                f"Supported: {'YES' if supported else 'NO'}\n"
+                f"Unsupported Claims: [{', '.join(unsupported)}]\n"
+                "Contradictions: []\nRelevant: YES\nAdditional Details: mock verification"
+            )
+        return self._extractive_answer(prompt)
+
+    def _passes(self, prompt: str) -> bool:
+        bucket = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return bucket < self.supported_rate
+
+    @staticmethod
+    def _extractive_answer(prompt: str, sentences: int = 3) -> str:
+        question = re.search(r"\*\*Question:\*\*(.*)", prompt)
+        context = prompt.split("**Context:**", 1)[-1].split("**Provide your answer", 1)[0]
+        question_words = set(WORD.findall(question.group(1).lower())) if question else set()
+        candidates = [s.strip() for s in re.split(r"(?<=[.!?])\s+", context) if len(s.split()) >= 4]
+        if not candidates:
+            return "I cannot answer this question based on the provided documents."
+        ranked = sorted(candidates, key=lambda s: -len(question_words & set(WORD.findall(s.lower()))))
+        return " ".join(ranked[:sentences])
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send({"models": []})
+                elif self.path == "/api/version":
+                    self._send({"version": "0.0.0-mock"})
+                else:
+                    self._send({"status": "ok"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/chat":
+                    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+                    self._generate(body, prompt, chat=True)
+                elif self.path == "/api/generate":
+                    self._generate(body, body.get("prompt", ""), chat=False)
+                elif self.path == "/api/embed":
+                    texts = body.get("input", [])
+                    texts = [texts] if isinstance(texts, str) else texts
+                    server._count(embed_calls=1, embedded_texts=len(texts))
+                    time.sleep(server.embed_latency)
+                    self._send({"model": body.get("model"), "embeddings": [server.embed(t) for t in texts]})
+                elif self.path == "/api/embeddings":
+                    server._count(embed_calls=1, embedded_texts=1)
+                    time.sleep(server.embed_latency)
+                    self._send({"embedding": server.embed(body.get("prompt", ""))})
+                elif self.path == "/api/show":
+                    self._send({"details": {"family": "mock"}, "model_info": {}, "capabilities": ["completion"]})
+                else:
+                    self._send({"error": f"unsupported endpoint {self.path}"}, status=404)
+
+            def _generate(self, body: Dict, prompt: str, chat: bool):
+                content = server.reply(prompt, json_mode=bool(body.get("format")))
+                prompt_tokens, completion_tokens = len(prompt.split()), len(content.split())
+                server._count(chat_calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                delay = server.chat_latency
+                if server.tokens_per_second:
+                    delay += completion_tokens / server.tokens_per_second
+                time.sleep(delay)
+
+                created = datetime.now(timezone.utc).isoformat()
+                final = {
+                    "model": body.get("model"), "created_at": created, "done": True, "done_reason": "stop",
+                    "total_duration": int(delay * 1e9), "prompt_eval_count": prompt_tokens, "eval_count": completion_tokens,
+                }
+                message = {"role": "assistant", "content": content}
+                if not body.get("stream", True):
+                    self._send({**final, **({"message": message} if chat else {"response": content})})
+                    return
+                # Streamed as NDJSON: one chunk with the content, then the closing stats
+                chunk = {"model": body.get("model"), "created_at": created, "done": False}
+                chunk.update({"message": message} if chat else {"response": content})
+                final.update({"message": {"role": "assistant", "content": ""}} if chat else {"response": ""})
+                self._send_lines([chunk, final])
+
+            def _send(self, payload: Dict, status: int = 200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_lines(self, payloads: List[Dict]):
+                data = "".join(json.dumps(p) + "\n" for p in payloads).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--chat-latency", type=float, default=0.0, help="Seconds per chat request")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embedding request")
+    parser.add_argument("--tokens-per-second", type=float, help="Simulated generation speed")
+    parser.add_argument("--supported-rate", type=float, default=1.0, help="Share of verifications that pass")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, args.chat_latency, args.embed_latency,
+                              args.tokens_per_second, supported_rate=args.supported_rate)
+    print(f"Mock Ollama listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+End-to-end pipeline benchmark against the mock Ollama server.
+
+For each synthetic corpus size it times DocumentProcessor.process,
+RetrieverBuilder.build_hybrid_retriever and AgentWorkflow.full_pipeline, and
+writes throughput, latency percentiles and peak RSS to a JSON results file.
+
+Usage:
+    python -m benchmarks.pipeline --sizes 10 50 200 --questions 20 --chat-latency 0.05
+    python -m benchmarks.pipeline --output /tmp/pipeline-new.json --baseline /tmp/pipeline.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.common import compare, default_output, isolate_settings, latency_summary, peak_rss_mb, write_results
+from benchmarks.corpus import write_corpus
+from benchmarks.mock_ollama import MockOllamaServer
+from config.settings import settings
+
+def run_size(size: int, workdir: Path, server: MockOllamaServer, questions: int, concurrency: int,
+             workflow, seed: int) -> Dict:
+    # Imported late: these read the isolated settings when constructed
+    from document_processor.file_handler import DocumentProcessor, LocalFile
+    from retriever.builder import RetrieverBuilder
+
+    corpus_dir = workdir / f"corpus_{size}"
+    paths, qa = write_corpus(str(corpus_dir), size, seed=seed)
+    files = [LocalFile(p) for p in paths]
+    corpus_mb = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+
+    # Fresh document cache per size so extraction is always measured cold
+    settings.CACHE_DIR = str(workdir / f"document_cache_{size}")
+    processor = DocumentProcessor()
+    start = time.perf_counter()
+    chunks = processor.process(files)
+    process_seconds = time.perf_counter() - start
+    rss_after_process = peak_rss_mb()
+
+    server.reset_stats()
+    start = time.perf_counter()
+    retriever = RetrieverBuilder().build_hybrid_retriever(
+        chunks, persist_directory=str(workdir / f"chroma_{size}"), collection_name=f"bench_{size}"
+    )
+    build_seconds = time.perf_counter() - start
+    build_calls = server.stats()
+    rss_after_build = peak_rss_mb()
+
+    asked = random.Random(seed).sample(qa, min(questions, len(qa)))
+    server.reset_stats()
+
+    def answer(item: Dict) -> float:
+        started = time.perf_counter()
+        workflow.full_pipeline(item["question"], retriever)
+        return time.perf_counter() - started
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies: List[float] = list(executor.map(answer, asked))
+    query_seconds = time.perf_counter() - start
+    query_calls = server.stats()
+
+    return {
+        "documents": size,
+        "corpus_mb": round(corpus_mb, 3),
+        "chunks": len(chunks),
+        "process": {
+            "seconds": round(process_seconds, 3),
+            "documents_per_second": round(size / process_seconds, 2) if process_seconds else None,
+            "mb_per_second": round(corpus_mb / process_seconds, 3) if process_seconds else None,
+        },
+        "build": {
+            "seconds": round(build_seconds, 3),
+            "chunks_per_second": round(len(chunks) / build_seconds, 2) if build_seconds else None,
+            "embed_requests": build_calls["embed_calls"],
+        },
+        "query": {
+            "questions": len(asked),
+            "concurrency": concurrency,
+            "questions_per_second": round(len(asked) / query_seconds, 3) if query_seconds else None,
+            "latency": latency_summary(latencies),
+            "llm_calls_per_question": round(query_calls["chat_calls"] / len(asked), 2) if asked else None,
+            "embed_requests_per_question": round(query_calls["embed_calls"] / len(asked), 2) if asked else None,
+        },
+        "peak_rss_mb": {
+            "after_process": rss_after_process,
+            "after_build": rss_after_build,
+            "after_query": peak_rss_mb(),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, indexing and answering offline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="Corpus sizes in documents")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per corpus size")
+    parser.add_argument("--concurrency", type=int, default=1, help="Questions answered in parallel")
+    parser.add_argument("--chat-latency", type=float, default=0.05, help="Mock seconds per chat request")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="Mock seconds per embedding request")
+    parser.add_argument("--tokens-per-second", type=float, help="Mock generation speed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", default=default_output("pipeline"),
+                        help="Results file (default: a docchat-benchmarks directory under the temp dir)")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="docchat-bench-"))
+    server = MockOllamaServer(chat_latency=args.chat_latency, embed_latency=args.embed_latency,
+                              tokens_per_second=args.tokens_per_second).start()
+    try:
+        isolate_settings(str(workdir), base_url=server.url)
+        from agents.workflow import AgentWorkflow
+        workflow = AgentWorkflow()
+
+        results = []
+        for size in args.sizes:
+            result = run_size(size, workdir, server, args.questions, args.concurrency, workflow, args.seed)
+            latency = result["query"]["latency"]
+            print(
+                f"{size:>6} docs | {result['chunks']:>6} chunks | process {result['process']['seconds']}s"
+                f" | build {result['build']['seconds']}s | answer p50 {latency['p50']}s p95 {latency['p95']}s"
+                f" | peak RSS {result['peak_rss_mb']['after_query']} MB"
+            )
+            results.append(result)
+    finally:
+        server.stop()
+
+    parameters = {k: v for k, v in vars(args).items() if k not in {"output", "baseline", "workdir"}}
+    write_results(args.output, "pipeline", parameters, results)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        for line in compare(results, args.baseline, "documents", {
+            "process s": "process.seconds",
+            "build s": "build.seconds",
+            "answer p50": "query.latency.p50",
+            "answer p95": "query.latency.p95",
+            "peak RSS MB": "peak_rss_mb.after_query",
+        }):
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Retrieval quality-vs-latency evaluation.
+
+Labels are question -> evidence pairs: a question is answered by whichever
+chunk contains its evidence sentence, so the same labels score every chunk
+size. Questions should be hand-written, in words other than the evidence's.
+`--build-labels` derives pseudo-queries from the example PDFs (a sentence with
+some of its words dropped); these copy the evidence wording, which flatters
+BM25 and exact-match fusion, so they are marked "generated" and only used with
+--allow-generated-labels, for smoke tests of the harness rather than for
+choosing a configuration.
+
+Each retriever configuration (hybrid weights, vector k, BM25 k, fusion method,
+chunk size, reranker on/off) is scored by recall@k and MRR next to its p50/p95
+query latency. Fusion is either "rrf" (the EnsembleRetriever used in
+production, with constant c) or "convex" (weighted sum of the BM25 and vector
+scores, each min-max normalised over its own candidates). Chunk size 0 means the production chunking;
+other values re-split the extracted text with that CHUNK_SIZE.
+
+Usage:
+    python -m benchmarks.retrieval_eval --labels benchmarks/data/retrieval_labels.json --k 5 10
+    python -m benchmarks.retrieval_eval --build-labels --allow-generated-labels --labels /tmp/labels.json
+    python -m benchmarks.retrieval_eval --weights 0.4,0.6 0.5,0.5 0.7,0.3 --k 5 10 20 --chunk-sizes 0 500 --rerank off on
+    python -m benchmarks.retrieval_eval --mock --labels /tmp/labels.json --allow-generated-labels   # offline
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.common import default_output, isolate_settings, latency_summary, write_results
+from benchmarks.mock_ollama import MockOllamaServer
+from config.settings import settings
+
+WORD = re.compile(r"[A-Za-z][A-Za-z0-9-]+")
+STOPWORDS = set("""a an the and or but of to in on for with by from as at is are was were be been being this that
+these those it its we our they their which who whom what when where how than then also such can may will would
+into over under between about each both more most other some any all not no only same so very""".split())
+CUTOFFS = (1, 3, 5, 10)
+
+# Labels
+
+def build_labels(paths: List[str], count: int, seed: int = 0, drop_ratio: float = 0.4) -> Dict:
+    """Pseudo-queries from sentences of the documents' production chunks."""
+    from document_processor.file_handler import DocumentProcessor, LocalFile
+
+    chunks = DocumentProcessor().process([LocalFile(p) for p in paths])
+    rng = random.Random(seed)
+    sentences = []
+    for chunk in chunks:
+        for sentence in re.split(r"(?<=[.!?])\s+", " ".join(chunk.page_content.split())):
+            words = [w for w in WORD.findall(sentence) if w.lower() not in STOPWORDS]
+            if 12 <= len(sentence.split()) <= 40 and len(words) >= 6:
+                sentences.append((sentence, words))
+    questions = []
+    for sentence, words in rng.sample(sentences, min(count, len(sentences))):
+        kept = [w for w in words if rng.random() >= drop_ratio] or words[:4]
+        questions.append({"question": " ".join(kept[:10]), "evidence": sentence, "generated": True})
+    return {"source_files": [Path(p).name for p in paths], "questions": questions}
+
+def is_relevant(chunk_text: str, evidence: str, min_overlap: float = 0.6) -> bool:
+    """The chunk holds the evidence sentence, or most of it when a chunk boundary splits it."""
+    chunk_norm = " ".join(chunk_text.split()).lower()
+    evidence_norm = " ".join(evidence.split()).lower()
+    if evidence_norm in chunk_norm:
+        return True
+    evidence_words = set(WORD.findall(evidence_norm)) - STOPWORDS
+    if not evidence_words:
+        return False
+    return len(evidence_words & set(WORD.findall(chunk_norm))) / len(evidence_words) >= min_overlap
+
+def score(ranked: List[List[str]], labels: List[Dict]) -> Dict:
+    """recall@k (share of questions with evidence in the top k) and MRR."""
+    hits = {k: 0 for k in CUTOFFS}
+    reciprocal = 0.0
+    for texts, label in zip(ranked, labels):
+        rank = next((i + 1 for i, text in enumerate(texts) if is_relevant(text, label["evidence"])), None)
+        if rank is None:
+            continue
+        reciprocal += 1.0 / rank
+        for k in CUTOFFS:
+            hits[k] += rank <= k
+    n = len(labels) or 1
+    return {**{f"recall@{k}": round(hits[k] / n, 4) for k in CUTOFFS}, "mrr": round(reciprocal / n, 4)}
+
+# Retrieval
+
+class IndexedCorpus:
+    """BM25 and vector indexes for one chunking of the corpus, shared by all configurations."""
+
+    def __init__(self, chunks, persist_directory: str, collection_name: str):
+        from retriever.builder import RetrieverBuilder
+        self.builder = RetrieverBuilder()
+        self.bm25, self.vector_store = self.builder.build_indexes(chunks, persist_directory, collection_name)
+
+    def search(self, question: str, config: Dict) -> List[str]:
+        self.bm25.k = config["bm25_k"]
+        if config["fusion"] == "convex":
+            return self._convex(question, config)
+        from langchain.retrievers import EnsembleRetriever
+        retriever = EnsembleRetriever(
+            retrievers=[self.bm25, self.vector_store.as_retriever(search_kwargs={"k": config["k"]})],
+            weights=list(config["weights"]),
+            c=config["rrf_c"],
+        )
+        return [doc.page_content for doc in retriever.invoke(question)]
+
+    def _convex(self, question: str, config: Dict) -> List[str]:
+        bm25_scores = self.bm25.vectorizer.get_scores(self.bm25.preprocess_func(question))
+        top_bm25 = sorted(range(len(bm25_scores)), key=lambda i: -bm25_scores[i])[:config["bm25_k"]]
+        vector_hits = self.vector_store.similarity_search_with_relevance_scores(question, k=config["k"])
+        combined: Dict[str, float] = {}
+        for weight, candidates in (
+            (config["weights"][0], [(self.bm25.docs[i].page_content, bm25_scores[i]) for i in top_bm25]),
+            (config["weights"][1], [(doc.page_content, relevance) for doc, relevance in vector_hits]),
+        ):
+            for text, normalised in self._min_max(candidates):
+                combined[text] = combined.get(text, 0.0) + weight * normalised
+        return sorted(combined, key=lambda text: -combined[text])
+
+    @staticmethod
+    def _min_max(candidates: List) -> List:
+        """(text, score) pairs with scores rescaled to 0..1 over the candidates (all 1.0 when they tie)."""
+        if not candidates:
+            return []
+        scores = [score for _, score in candidates]
+        low, high = min(scores), max(scores)
+        return [(text, (score - low) / (high - low) if high > low else 1.0) for text, score in candidates]
+
+def rechunk(chunks, chunk_size: int, overlap_ratio: float):
+    """Re-split the production chunks at a fixed size (0 keeps them as they are)."""
+    if not chunk_size:
+        return chunks
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=int(chunk_size * overlap_ratio))
+    return splitter.split_documents(chunks)
+
+def evaluate(corpus: IndexedCorpus, labels: List[Dict], config: Dict, reranker=None) -> Dict:
+    ranked, latencies = [], []
+    for label in labels:
+        start = time.perf_counter()
+        texts = corpus.search(label["question"], config)
+        if reranker is not None and texts:
+            from langchain.schema import Document
+            docs = reranker.rerank(label["question"], [Document(page_content=t) for t in texts], top_n=len(texts))
+            texts = [doc.page_content for doc in docs]
+        latencies.append(time.perf_counter() - start)
+        ranked.append(texts)
+    return {**score(ranked, labels), "latency": latency_summary(latencies)}
+
+def production_config() -> Dict:
+    return {
+        "weights": tuple(settings.HYBRID_RETRIEVER_WEIGHTS), "k": settings.VECTOR_SEARCH_K, "bm25_k": 4,
+        "fusion": "rrf", "rrf_c": 60, "chunk_size": 0, "rerank": settings.RERANKER_ENABLED,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep retriever configurations and report recall@k, MRR and latency.")
+    parser.add_argument("--files", nargs="+", help="Documents to evaluate on (default: examples/*.pdf)")
+    parser.add_argument("--labels", default="benchmarks/data/retrieval_labels.json")
+    parser.add_argument("--build-labels", action="store_true", help="(Re)generate pseudo-query labels from --files")
+    parser.add_argument("--label-count", type=int, default=100)
+    parser.add_argument("--allow-generated-labels", action="store_true",
+                        help="Evaluate with --build-labels pseudo-queries (harness smoke test only)")
+    parser.add_argument("--weights", nargs="+", default=["0.4,0.6", "0.5,0.5", "0.7,0.3"], help="BM25,vector weight pairs")
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10, 20], help="Vector search k")
+    parser.add_argument("--bm25-k", type=int, nargs="+", default=[4, 10], help="BM25 k")
+    parser.add_argument("--fusion", nargs="+", default=["rrf", "convex"], choices=["rrf", "convex"])
+    parser.add_argument("--rrf-c", type=int, nargs="+", default=[60], help="RRF constant(s)")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[0, 500, 1000], help="0 = production chunking")
+    parser.add_argument("--overlap-ratio", type=float, default=0.2)
+    parser.add_argument("--rerank", nargs="+", default=["off"], choices=["off", "on"])
+    parser.add_argument("--mock", action="store_true", help="Use the mock Ollama server's bag-of-words embeddings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", default=default_output("retrieval"),
+                        help="Results file (default: a docchat-benchmarks directory under the temp dir)")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="docchat-retrieval-eval-"))
+    server = MockOllamaServer().start() if args.mock else None
+    isolate_settings(str(workdir), base_url=server.url if server else None)
+    files = args.files or sorted(str(p) for p in Path("examples").glob("*.pdf"))
+
+    try:
+        if not args.build_labels and not Path(args.labels).exists():
+            parser.error(f"No labels at {args.labels}: write hand-written question/evidence pairs there "
+                         "(or generate pseudo-queries with --build-labels for a smoke test)")
+        if args.build_labels:
+            labelled = build_labels(files, args.label_count, args.seed)
+            Path(args.labels).parent.mkdir(parents=True, exist_ok=True)
+            with open(args.labels, "w", encoding="utf-8") as f:
+                json.dump(labelled, f, indent=2)
+            print(f"Wrote {len(labelled['questions'])} labels to {args.labels}")
+        with open(args.labels, "r", encoding="utf-8") as f:
+            labels = json.load(f)["questions"]
+        generated = sum(1 for label in labels if label.get("generated"))
+        if generated and not args.allow_generated_labels:
+            parser.error(f"{generated} of {len(labels)} labels are generated pseudo-queries that copy the evidence "
+                         "wording; replace them with hand-written questions or pass --allow-generated-labels")
+        if generated:
+            print(f"Warning: {generated} of {len(labels)} labels are generated; results favour lexical matching")
+
+        from document_processor.file_handler import DocumentProcessor, LocalFile
+        from retriever.reranker import Reranker
+        base_chunks = DocumentProcessor().process([LocalFile(p) for p in files])
+        reranker = Reranker() if "on" in args.rerank else None
+        production = production_config()
+
+        results = []
+        for chunk_size in args.chunk_sizes:
+            chunks = rechunk(base_chunks, chunk_size, args.overlap_ratio)
+            corpus = IndexedCorpus(chunks, str(workdir / f"chroma_{chunk_size}"), f"eval_{chunk_size}")
+            for weights, k, bm25_k, fusion, rrf_c, rerank in itertools.product(
+                [tuple(float(w) for w in pair.split(",")) for pair in args.weights],
+                args.k, args.bm25_k, args.fusion, args.rrf_c, args.rerank,
+            ):
+                if fusion == "convex" and rrf_c != args.rrf_c[0]:
+                    continue  # c only affects RRF
+                config = {"weights": weights, "k": k, "bm25_k": bm25_k, "fusion": fusion, "rrf_c": rrf_c,
+                          "chunk_size": chunk_size, "rerank": rerank == "on"}
+                outcome = evaluate(corpus, labels, config, reranker if rerank == "on" else None)
+                results.append({
+                    "config": {**config, "weights": list(weights)},
+                    "chunks": len(chunks),
+                    "production": config == production,
+                    **outcome,
+                })
+    finally:
+        if server:
+            server.stop()
+
+    results.sort(key=lambda r: (-r["mrr"], r["latency"]["p50"]))
+    print(f"{'weights':<10}{'k':>4}{'bm25':>6}{'fusion':>8}{'c':>5}{'chunk':>7}{'rerank':>8}"
+          f"{'R@1':>7}{'R@5':>7}{'R@10':>7}{'MRR':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    for r in results:
+        c = r["config"]
+        print(f"{','.join(str(w) for w in c['weights']):<10}{c['k']:>4}{c['bm25_k']:>6}{c['fusion']:>8}{c['rrf_c']:>5}"
+              f"{c['chunk_size']:>7}{'on' if c['rerank'] else 'off':>8}{r['recall@1']:>7}{r['recall@5']:>7}"
+              f"{r['recall@10']:>7}{r['mrr']:>7}{r['latency']['p50'] * 1000:>9.1f}{r['latency']['p95'] * 1000:>9.1f}"
+              f"{'  <- current' if r['production'] else ''}")
+
+    parameters = {k: v for k, v in vars(args).items() if k not in {"output", "workdir"}}
+    parameters["labels_count"] = len(labels)
+    parameters["generated_labels"] = generated
+    write_results(args.output, "retrieval", parameters, results)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
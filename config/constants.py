@@ -5,4 +5,7 @@ MAX_FILE_SIZE: int = 50 * 1024 * 1024
 MAX_TOTAL_SIZE: int = 200 * 1024 * 1024
 
 # Allowed file types for upload
-ALLOWED_TYPES: list = [".txt", ".pdf", ".docx", ".md"]
\ No newline at end of file
+ALLOWED_TYPES: list = [".txt", ".pdf", ".docx", ".md"]
+
+# Version of the agent prompts; bump when prompts change to invalidate cached answers
+PROMPT_VERSION: str = "2"
\ No newline at end of file
@@ -8,6 +8,28 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str = "gemma2:9b"
     OLLAMA_EMBEDDING_MODEL: str = "nomic-embed-text:latest"
 
+    # Ollama client pool settings
+    OLLAMA_MAX_CONNECTIONS: int = 8
+    OLLAMA_KEEPALIVE_EXPIRY: float = 60.0
+    OLLAMA_REQUEST_TIMEOUT: float = 300.0
+    OLLAMA_MAX_CONCURRENT_GENERATIONS: int = 4
+    OLLAMA_MAX_CONCURRENT_PER_MODEL: int = 2
+    OLLAMA_MAX_QUEUE_PER_MODEL: int = 16
+    OLLAMA_QUEUE_TIMEOUT: float = 120.0
+
+    # Record/replay of Ollama traffic ("record", "replay" or empty for live calls)
+    OLLAMA_CASSETTE_MODE: str = ""
+    OLLAMA_CASSETTE_PATH: str = "cassettes/ollama.jsonl.gz"
+    OLLAMA_CASSETTE_LATENCY_SCALE: float = 0.0  # Replay delay as a multiple of the recorded duration
+    OLLAMA_CASSETTE_LATENCY: float = 0.0  # Fixed extra replay delay in seconds
+
+    # Model warm-up settings
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    WARMUP_ENABLED: bool = True
+    WARMUP_INTERVAL_SECONDS: int = 600
+    WARMUP_RETRY_SECONDS: int = 15
+    WARMUP_STATUS_POLL_SECONDS: float = 5.0
+
     # Optional settings with defaults
     MAX_FILE_SIZE: int = MAX_FILE_SIZE
     MAX_TOTAL_SIZE: int = MAX_TOTAL_SIZE
@@ -17,12 +39,128 @@ class Settings(BaseSettings):
     CHROMA_DB_PATH: str = "./chroma_db"
     CHROMA_COLLECTION_NAME: str = "documents"
 
+    # Corpus library settings
+    CORPUS_DIR: str = "corpora"
+    CORPUS_COLLECTION_NAME: str = "corpus"
+    CORPUS_CACHE_SIZE: int = 4
+    CORPUS_AUTO_MAX_COUNT: int = 50  # Corpora named from their files (UI uploads) beyond this are pruned, oldest first
+    CORPUS_AUTO_RETENTION_DAYS: int = 30
+
+    # Memory limits: loaded corpora beyond the budget (estimated) or idle for too long are evicted back to disk
+    MEMORY_BUDGET_MB: int = 2048
+    CORPUS_IDLE_SECONDS: int = 1800
+    SESSION_TTL_SECONDS: int = 14400  # Browser session state is dropped this long after its last update
+    SESSION_HISTORY_MAX_ENTRIES: int = 50
+
+    # Chunking settings (plain text, and PDFs without markdown headers)
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 200
+
     # Retrieval settings
     VECTOR_SEARCH_K: int = 10
     HYBRID_RETRIEVER_WEIGHTS: list = [0.4, 0.6]
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2000
+    EMBED_BATCH_SIZE: int = 64
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "embedding_cache/embeddings.sqlite3"
+
+    # Reranker settings (optional stage between retrieval and research)
+    RERANKER_ENABLED: bool = False
+    RERANKER_BACKEND: str = "cross-encoder"
+    RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANKER_ONNX_PATH: str = ""
+    RERANKER_TOP_N: int = 6
+    RERANKER_BATCH_SIZE: int = 16
+    RERANKER_MAX_LENGTH: int = 512
+    RERANKER_CACHE_SIZE: int = 10000
+
+    # Workflow settings
+    SPECULATIVE_RELEVANCE: bool = False
+    MAX_RESEARCH_ITERATIONS: int = 2
+
+    # Verification output format: "text", "json" or "schema"
+    VERIFICATION_OUTPUT_FORMAT: str = "json"
+
+    # Verification strategy: "full" (whole answer vs. whole context) or "claims" (per-claim evidence)
+    VERIFICATION_STRATEGY: str = "full"
+    CLAIM_MIN_WORDS: int = 4
+    CLAIM_MAX_CLAIMS: int = 30
+    CLAIM_EVIDENCE_K: int = 3
+    CLAIM_BATCH_SIZE: int = 4
+    CLAIM_CACHE_SIZE: int = 2000
+
+    # Relevance fast tier (embedding similarity before the LLM classifier)
+    RELEVANCE_FAST_TIER: bool = True
+    RELEVANCE_FAST_TIER_K: int = 5
+    RELEVANCE_CAN_ANSWER_THRESHOLD: float = 0.80
+    RELEVANCE_NO_MATCH_THRESHOLD: float = 0.45
+    RELEVANCE_MIN_COVERAGE: float = 0.5
+    RELEVANCE_VECTOR_CACHE_SIZE: int = 5000
+    RELEVANCE_LOG_PATH: str = "relevance_log/outcomes.jsonl"
+    RELEVANCE_LOG_MAX_BYTES: int = 10 * 1024 * 1024  # Rotated to <path>.1 beyond this (one old file kept)
+    RELEVANCE_CALIBRATION_PATH: str = "relevance_log/calibration.json"
+
+    # Answer cache settings
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_DIR: str = "answer_cache"
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+    ANSWER_CACHE_MAX_ENTRIES: int = 500
+    ANSWER_CACHE_TTL_DAYS: int = 7
+
+    # LLM response cache settings (temperature 0 calls only)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_DIR: str = "llm_cache"
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+
+    # Batch question answering settings
+    BATCH_CONCURRENCY: int = 4
+
+    # Bulk ingestion settings
+    INGEST_WORKERS: int = 4
+    INGEST_EMBED_BATCH_SIZE: int = 64
+    INGEST_STATE_PATH: str = "ingest_state.json"
+    INGEST_CHECKPOINT_FILES: int = 50  # Write the checkpoint after this many finished files...
+    INGEST_CHECKPOINT_SECONDS: float = 30.0  # ...or this long since the last write, whichever comes first
+
+    # Gradio queue settings
+    GRADIO_DEFAULT_CONCURRENCY_LIMIT: int = 2
+    GRADIO_QUEUE_MAX_SIZE: int = 32
+    INDEXING_CONCURRENCY_LIMIT: int = 1
+    QA_CONCURRENCY_LIMIT: int = 4
+
+    # Server and REST API settings
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 5000
+    API_ENABLED: bool = False
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_MAX_SIZE: int = 64
+    JOB_RETENTION_SECONDS: int = 3600
+    UPLOAD_DIR: str = "uploads"
 
     # Logging settings
     LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "app.log"
+    LOG_JSON: bool = False  # Serialize file records (message plus structured fields) as JSON lines
+    LOG_MAX_PAYLOAD_CHARS: int = 500  # Cap on prompts, contexts and responses included in log records
+    LOG_DEBUG_SAMPLE_RATE: float = 0.1  # Share of verbose per-call debug events that are emitted
+
+    # Tracing settings (OpenTelemetry); exporter is "file", "otlp" or "console"
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "file"
+    TRACING_FILE_PATH: str = "traces/spans.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4317"
+    TRACING_SERVICE_NAME: str = "docchat"
+
+    # Metrics settings; when enabled the UI is served by uvicorn next to /metrics (no Gradio share link)
+    METRICS_ENABLED: bool = False
+
+    # Profiling settings; mode is "sampling" (folded stacks) or "cprofile", per-request flags override ENABLED
+    PROFILING_ENABLED: bool = False
+    PROFILING_MODE: str = "sampling"
+    PROFILING_DIR: str = "profiles"
+    PROFILING_SAMPLE_INTERVAL: float = 0.005
+    PROFILING_MAX_FILES: int = 200
+    PROFILING_RETENTION_HOURS: int = 72
 
     # New cache settings with type annotations
     CACHE_DIR: str = "document_cache"
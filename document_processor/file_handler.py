@@ -3,7 +3,7 @@ import hashlib
 import pickle
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 import pypdfium2 as pdfium
 from docling.document_converter import DocumentConverter
 from docling.datamodel.base_models import InputFormat
@@ -14,8 +14,15 @@ from langchain.schema import Document
 from config import constants
 from config.settings import settings
 from utils.logging import logger
+from utils import progress, tracing, metrics
 import time
 
+class LocalFile:
+    """Minimal stand-in for an uploaded file, for callers outside the UI: only .name is used."""
+
+    def __init__(self, path):
+        self.name = str(path)
+
 class DocumentProcessor:
     def __init__(self):
         self.headers = [("#", "Header 1"), ("##", "Header 2")]
@@ -34,32 +41,38 @@ class DocumentProcessor:
         all_chunks = []
         seen_hashes = set()
         
-        for file in files:
+        for file_number, file in enumerate(files, start=1):
             try:
-                # Generate content-based hash for caching
-                with open(file.name, "rb") as f:
-                    file_hash = self._generate_hash(f.read())
-                
-                cache_path = self.cache_dir / f"{file_hash}.pkl"
-                
-                if self._is_cache_valid(cache_path):
-                    logger.info(f"Loading from cache: {file.name}")
-                    chunks = self._load_from_cache(cache_path)
-                else:
-                    logger.info(f"Processing and caching: {file.name}")
-                    chunks = self._process_file(file)
-                    self._save_to_cache(chunks, cache_path)
+                with tracing.span("process_file", {"file.name": Path(file.name).name}) as current:
+                    # Generate content-based hash for caching
+                    with open(file.name, "rb") as f:
+                        file_hash = self._generate_hash(f.read())
+                    
+                    cache_path = self.cache_path(file_hash)
+                    
+                    cache_hit = self._is_cache_valid(cache_path)
+                    current.set_attribute("cache.hit", cache_hit)
+                    metrics.DOCUMENT_CACHE.labels(result="hit" if cache_hit else "miss").inc()
+                    if cache_hit:
+                        logger.info(f"Loading from cache: {file.name}")
+                        chunks = self._load_from_cache(cache_path)
+                    else:
+                        logger.info(f"Processing and caching: {file.name}")
+                        file_type = Path(file.name).suffix.lower().lstrip(".") or "unknown"
+                        with metrics.DOCUMENT_SECONDS.labels(type=file_type).time():
+                            chunks = self._process_file(file)
+                        self._save_to_cache(chunks, cache_path)
+                    current.set_attribute("file.chunks", len(chunks))
+                    metrics.CHUNKS.inc(len(chunks))
                 
                 # Deduplicate chunks across files
-                for chunk in chunks:
-                    chunk_hash = self._generate_hash(chunk.page_content.encode())
-                    if chunk_hash not in seen_hashes:
-                        all_chunks.append(chunk)
-                        seen_hashes.add(chunk_hash)
+                all_chunks.extend(self._deduplicate(chunks, seen_hashes))
                         
             except Exception as e:
                 logger.error(f"Failed to process {file.name}: {str(e)}")
                 continue
+            finally:
+                progress.emit("files", file_number, len(files), f"Processed {Path(file.name).name}")
                 
         logger.info(f"Total unique chunks: {len(all_chunks)}")
         return all_chunks
@@ -87,23 +100,25 @@ class DocumentProcessor:
     def _process_text_file(self, file) -> List:
         """Process text/markdown files directly"""
         try:
-            with open(file.name, 'r', encoding='utf-8') as f:
-                content = f.read()
+            with tracing.span("extract", {"extract.method": "text"}):
+                with open(file.name, 'r', encoding='utf-8') as f:
+                    content = f.read()
             
             # Create a document object
             doc = Document(page_content=content)
             
-            # Split using markdown splitter for structured content
-            if file.name.endswith('.md'):
-                splitter = MarkdownHeaderTextSplitter(self.headers)
-                return splitter.split_text(content)
-            else:
-                # Use recursive character splitter for plain text
-                splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=1000,
-                    chunk_overlap=200
-                )
-                return splitter.split_documents([doc])
+            with tracing.span("chunk"):
+                # Split using markdown splitter for structured content
+                if file.name.endswith('.md'):
+                    splitter = MarkdownHeaderTextSplitter(self.headers)
+                    return splitter.split_text(content)
+                else:
+                    # Use recursive character splitter for plain text
+                    splitter = RecursiveCharacterTextSplitter(
+                        chunk_size=settings.CHUNK_SIZE,
+                        chunk_overlap=settings.CHUNK_OVERLAP
+                    )
+                    return splitter.split_documents([doc])
                 
         except Exception as e:
             logger.error(f"Failed to process text file {file.name}: {str(e)}")
@@ -136,31 +151,36 @@ class DocumentProcessor:
     
     def _extract_with_pypdfium(self, file) -> List:
         """Extract text using pypdfium2 (simple and fast)"""
-        pdf = pdfium.PdfDocument(file.name)
-        
-        all_text = []
-        for page_num in range(len(pdf)):
-            page = pdf.get_page(page_num)
-            textpage = page.get_textpage()
-            text = textpage.get_text_range()
-            if text.strip():  # Only add non-empty pages
-                all_text.append(f"## Page {page_num + 1}\n\n{text}")
+        with tracing.span("extract", {"extract.method": "pypdfium"}) as current:
+            pdf = pdfium.PdfDocument(file.name)
+            
+            all_text = []
+            page_count = len(pdf)
+            current.set_attribute("extract.pages", page_count)
+            for page_num in range(page_count):
+                page = pdf.get_page(page_num)
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                if text.strip():  # Only add non-empty pages
+                    all_text.append(f"## Page {page_num + 1}\n\n{text}")
+                progress.emit("parse", page_num + 1, page_count, f"Parsed page {page_num + 1} of {page_count} in {Path(file.name).name}")
         
         # Combine all pages
         full_content = "\n\n".join(all_text)
         
-        # Split using markdown splitter
-        splitter = MarkdownHeaderTextSplitter(self.headers)
-        chunks = splitter.split_text(full_content)
-        
-        # If no chunks from markdown splitter, use recursive splitter
-        if not chunks:
-            doc = Document(page_content=full_content)
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            chunks = splitter.split_documents([doc])
+        with tracing.span("chunk"):
+            # Split using markdown splitter
+            splitter = MarkdownHeaderTextSplitter(self.headers)
+            chunks = splitter.split_text(full_content)
+            
+            # If no chunks from markdown splitter, use recursive splitter
+            if not chunks:
+                doc = Document(page_content=full_content)
+                splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=settings.CHUNK_SIZE,
+                    chunk_overlap=settings.CHUNK_OVERLAP
+                )
+                chunks = splitter.split_documents([doc])
         
         return chunks
     
@@ -176,12 +196,14 @@ class DocumentProcessor:
             InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
         }
         
-        converter = DocumentConverter(format_options=format_options)
-        result = converter.convert(file.name)
-        markdown = result.document.export_to_markdown()
+        with tracing.span("extract", {"extract.method": "docling_simple"}):
+            converter = DocumentConverter(format_options=format_options)
+            result = converter.convert(file.name)
+            markdown = result.document.export_to_markdown()
         
-        splitter = MarkdownHeaderTextSplitter(self.headers)
-        return splitter.split_text(markdown)
+        with tracing.span("chunk"):
+            splitter = MarkdownHeaderTextSplitter(self.headers)
+            return splitter.split_text(markdown)
     
     def _extract_with_timeout_docling(self, file) -> List:
         """Extract using full docling with timeout"""
@@ -195,28 +217,57 @@ class DocumentProcessor:
         signal.alarm(60)
         
         try:
-            converter = DocumentConverter()
-            result = converter.convert(file.name)
-            markdown = result.document.export_to_markdown()
+            with tracing.span("extract", {"extract.method": "docling"}):
+                converter = DocumentConverter()
+                result = converter.convert(file.name)
+                markdown = result.document.export_to_markdown()
             
-            splitter = MarkdownHeaderTextSplitter(self.headers)
-            return splitter.split_text(markdown)
+            with tracing.span("chunk"):
+                splitter = MarkdownHeaderTextSplitter(self.headers)
+                return splitter.split_text(markdown)
         finally:
             signal.alarm(0)  # Cancel the alarm
     
     def _process_with_docling(self, file) -> List:
         """Process other file types with docling"""
         try:
-            converter = DocumentConverter()
-            result = converter.convert(file.name)
-            markdown = result.document.export_to_markdown()
+            with tracing.span("extract", {"extract.method": "docling"}):
+                converter = DocumentConverter()
+                result = converter.convert(file.name)
+                markdown = result.document.export_to_markdown()
             
-            splitter = MarkdownHeaderTextSplitter(self.headers)
-            return splitter.split_text(markdown)
+            with tracing.span("chunk"):
+                splitter = MarkdownHeaderTextSplitter(self.headers)
+                return splitter.split_text(markdown)
         except Exception as e:
             logger.error(f"Docling processing failed for {file.name}: {str(e)}")
             return []
 
+    def cache_path(self, file_hash: str) -> Path:
+        """Processed-chunk cache file for a file; keyed on the chunking settings too."""
+        return self.cache_dir / f"{file_hash}_{settings.CHUNK_SIZE}-{settings.CHUNK_OVERLAP}.pkl"
+
+    def load_cached(self, file_hash: str) -> Optional[List]:
+        """Cached chunks for a file, or None when they are missing, expired or unreadable."""
+        cache_path = self.cache_path(file_hash)
+        if not self._is_cache_valid(cache_path):
+            return None
+        try:
+            return self._load_from_cache(cache_path)
+        except Exception as e:
+            logger.warning(f"Unreadable document cache {cache_path.name}: {e}")
+            return None
+
+    def _deduplicate(self, chunks: List, seen_hashes: set) -> List:
+        """Chunks whose content has not been seen yet; records their hashes in seen_hashes."""
+        unique = []
+        for chunk in chunks:
+            chunk_hash = self._generate_hash(chunk.page_content.encode())
+            if chunk_hash not in seen_hashes:
+                unique.append(chunk)
+                seen_hashes.add(chunk_hash)
+        return unique
+
     def _generate_hash(self, content: bytes) -> str:
         return hashlib.sha256(content).hexdigest()
 
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Headless bulk ingestion for DocChat.
+
+Walks a directory tree, extracts and chunks every supported document in parallel
+(populating the document cache), then embeds all chunks into the persistent
+embedding cache. Progress is checkpointed every INGEST_CHECKPOINT_FILES files or
+INGEST_CHECKPOINT_SECONDS seconds, and on exit, so an interrupted run resumes
+close to where it stopped.
+
+With --corpus NAME, the whole library is also saved as a named corpus (BM25 and
+vector index on disk) that the UI and batch API can open without re-indexing.
+
+Usage:
+    python ingest.py /path/to/library --workers 8
+    python ingest.py /path/to/library --corpus research-library
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List
+
+from document_processor.file_handler import DocumentProcessor, LocalFile
+from agents.model_pool import get_model_pool
+from retriever.corpus_store import CorpusStore
+from config.settings import settings
+from utils.logging import logger, setup_logging
+from utils import tracing
+
+_processor = None
+
+def _init_worker():
+    """Create one DocumentProcessor per worker process."""
+    global _processor
+    setup_logging()
+    _processor = DocumentProcessor()
+
+def _process_file(path: str) -> Dict:
+    """Extract and chunk one file in a worker process; chunks land in the document cache."""
+    start = time.perf_counter()
+    file_hash = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    chunks = _processor.process([LocalFile(path)])
+    return {
+        "path": path,
+        "hash": file_hash,
+        "chunks": len(chunks),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def _chunking() -> str:
+    """Chunk settings a file was extracted under; the document cache is keyed on them too."""
+    return f"{settings.CHUNK_SIZE}-{settings.CHUNK_OVERLAP}"
+
+class IngestState:
+    """Checkpoint of processed and embedded files, keyed by path (and valid for one chunk setting)."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, Dict] = {}
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def is_done(self, path: str, stage: str) -> bool:
+        """True when the file and chunk settings are unchanged since it last completed this stage."""
+        entry = self.files.get(path)
+        if not entry or stage not in entry.get("stages", []):
+            return False
+        return self._current(entry, os.stat(path))
+
+    def mark(self, path: str, stage: str, **info):
+        stat = os.stat(path)
+        entry = self.files.get(path, {})
+        if not self._current(entry, stat):
+            entry = {"size": stat.st_size, "mtime": stat.st_mtime, "chunking": _chunking(), "stages": []}
+        if stage not in entry["stages"]:
+            entry["stages"].append(stage)
+        entry.update(info)
+        self.files[path] = entry
+        self._changed()
+
+    def reset(self, path: str):
+        """Forget a file, so the next run extracts it again."""
+        self.files.pop(path, None)
+        self._changed()
+
+    def _changed(self):
+        # Rewriting the whole checkpoint per file is quadratic on large libraries; batch the writes
+        self._unsaved += 1
+        if (self._unsaved >= settings.INGEST_CHECKPOINT_FILES
+                or time.monotonic() - self._saved_at >= settings.INGEST_CHECKPOINT_SECONDS):
+            self.save()
+
+    @staticmethod
+    def _current(entry: Dict, stat) -> bool:
+        return (entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime
+                and entry.get("chunking") == _chunking())
+
+    def save(self):
+        """Write the checkpoint now (the run calls this on exit to flush the last batch)."""
+        if not self._unsaved:
+            return
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, indent=2)
+        tmp_path.replace(self.path)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+def discover(root: str) -> List[str]:
+    """All files under root with an allowed extension."""
+    allowed = {ext.lower() for ext in settings.ALLOWED_TYPES}
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if Path(filename).suffix.lower() in allowed:
+                found.append(str(Path(dirpath) / filename))
+    return sorted(found)
+
+def extract(paths: List[str], state: IngestState, workers: int) -> Dict:
+    """Stage 1: parallel extraction and chunking."""
+    pending = [p for p in paths if not state.is_done(p, "extracted")]
+    stats = {"files": 0, "failed": 0, "chunks": 0, "bytes": 0, "skipped": len(paths) - len(pending)}
+    if not pending:
+        return stats
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(_process_file, path): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Ingestion failed for {path}: {e}")
+                stats["failed"] += 1
+                continue
+            if result["chunks"] == 0:
+                logger.warning(f"No chunks extracted from {path}")
+                stats["failed"] += 1
+                continue
+            state.mark(path, "extracted", hash=result["hash"], chunks=result["chunks"])
+            stats["files"] += 1
+            stats["chunks"] += result["chunks"]
+            stats["bytes"] += os.path.getsize(path)
+            print(f"  extracted {Path(path).name}: {result['chunks']} chunks in {result['seconds']}s")
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+def load_chunks(processor: DocumentProcessor, path: str, state: IngestState):
+    """A file's chunks from the document cache; None (and the file reset for the next run) when they are gone."""
+    chunks = processor.load_cached(state.files[path]["hash"])
+    if chunks is None:
+        logger.warning(f"Cached chunks for {path} are missing or expired; it will be re-extracted on the next run")
+        state.reset(path)
+    return chunks
+
+def embed(paths: List[str], state: IngestState, batch_size: int) -> Dict:
+    """Stage 2: embed cached chunks into the persistent embedding cache."""
+    processor = DocumentProcessor()
+    embeddings = get_model_pool().get_embeddings()
+    pending = [p for p in paths if state.is_done(p, "extracted") and not state.is_done(p, "embedded")]
+    stats = {"files": 0, "chunks": 0, "failed": 0, "skipped": sum(1 for p in paths if state.is_done(p, "embedded"))}
+    if not pending:
+        return stats
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=settings.OLLAMA_MAX_CONNECTIONS) as executor:
+        for path in pending:
+            chunks = load_chunks(processor, path, state)
+            if chunks is None:
+                stats["failed"] += 1
+                continue
+            texts = [c.page_content for c in chunks if c.page_content.strip()]
+            batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+            list(executor.map(embeddings.embed_documents, batches))
+            state.mark(path, "embedded")
+            stats["files"] += 1
+            stats["chunks"] += len(texts)
+            print(f"  embedded {Path(path).name}: {len(texts)} chunks")
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+def build_corpus(name: str, paths: List[str], state: IngestState) -> Dict:
+    """Stage 3: save every extracted file as one named corpus."""
+    processor = DocumentProcessor()
+    store = CorpusStore()
+    done = [p for p in paths if state.is_done(p, "extracted")]
+    if not done:
+        return {"chunks": 0, "seconds": 0.0}
+
+    start = time.perf_counter()
+    chunks, seen = [], set()
+    included = []
+    for path in done:
+        cached = load_chunks(processor, path, state)
+        if cached is None:
+            continue
+        included.append(path)
+        for chunk in cached:
+            if chunk.page_content not in seen:
+                seen.add(chunk.page_content)
+                chunks.append(chunk)
+    if not chunks:
+        return {"chunks": 0, "seconds": 0.0}
+    store.save(name, chunks, [state.files[p]["hash"] for p in included], [Path(p).name for p in included])
+    return {"chunks": len(chunks), "seconds": round(time.perf_counter() - start, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-process and pre-embed a document library; with --corpus, also build its indexes."
+    )
+    parser.add_argument("root", help="Directory to ingest (searched recursively)")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS, help="Extraction processes")
+    parser.add_argument("--batch-size", type=int, default=settings.INGEST_EMBED_BATCH_SIZE, help="Chunks per embedding request")
+    parser.add_argument("--state", default=settings.INGEST_STATE_PATH, help="Checkpoint file for resuming")
+    parser.add_argument("--skip-embeddings", action="store_true", help="Only extract and chunk")
+    parser.add_argument("--corpus", help="Also build the BM25 and Chroma indexes and save them as this named corpus")
+    args = parser.parse_args()
+
+    setup_logging()
+    tracing.setup_tracing()
+    paths = discover(args.root)
+    print(f"Found {len(paths)} supported files under {args.root}")
+    state = IngestState(args.state)
+    try:
+        extract_stats = extract(paths, state, args.workers)
+        seconds = extract_stats.get("seconds", 0)
+        print(
+            f"Extraction: {extract_stats['files']} files, {extract_stats['chunks']} chunks, "
+            f"{extract_stats['failed']} failed, {extract_stats['skipped']} already done"
+        )
+        if seconds:
+            print(
+                f"  {extract_stats['files'] / seconds:.2f} files/s, "
+                f"{extract_stats['bytes'] / 1024 / 1024 / seconds:.2f} MB/s, "
+                f"{extract_stats['chunks'] / seconds:.1f} chunks/s"
+            )
+
+        if not args.skip_embeddings:
+            embed_stats = embed(paths, state, args.batch_size)
+            print(
+                f"Embedding: {embed_stats['files']} files, {embed_stats['chunks']} chunks, "
+                f"{embed_stats.get('failed', 0)} failed, {embed_stats['skipped']} already done"
+            )
+            if embed_stats.get("seconds"):
+                print(f"  {embed_stats['chunks'] / embed_stats['seconds']:.1f} chunks/s")
+
+        if args.corpus:
+            corpus_stats = build_corpus(args.corpus, paths, state)
+            print(f"Corpus '{args.corpus}': {corpus_stats['chunks']} chunks indexed in {corpus_stats['seconds']}s")
+    finally:
+        state.save()
+
+    return 1 if extract_stats["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,7 +12,7 @@ from typing import Annotated, Sequence, TypedDict
 # LangChain and LangGraph imports
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain.tools import tool
-from langchain_ollama import ChatOllama
+from agents.model_pool import get_model_pool
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 from langgraph.graph.message import add_messages
@@ -49,7 +49,7 @@ tools = [search_tool, recommend_clothing]
 tools_by_name = {tool.name: tool for tool in tools}
 
 # Initialize Gemma2 model
-model = ChatOllama(model="gemma2:9b")
+model = get_model_pool().get_chat_model(model="gemma2:9b")
 
 # Create system prompt
 chat_prompt = ChatPromptTemplate.from_messages([
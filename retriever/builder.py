@@ -1,8 +1,11 @@
 from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
 from langchain_community.retrievers import BM25Retriever
 from langchain.retrievers import EnsembleRetriever
 from config.settings import settings
+from agents.model_pool import get_model_pool
+from utils.tracing import retriever_span_handler
+from utils import metrics
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,13 +13,15 @@ logger = logging.getLogger(__name__)
 class RetrieverBuilder:
     def __init__(self):
         """Initialize the retriever builder with Ollama embeddings."""
-        self.embeddings = OllamaEmbeddings(
-            base_url=settings.OLLAMA_BASE_URL,
-            model=settings.OLLAMA_EMBEDDING_MODEL
-        )
+        self.embeddings = get_model_pool().get_embeddings()
         
-    def build_hybrid_retriever(self, docs):
+    def build_hybrid_retriever(self, docs, persist_directory: str = None, collection_name: str = None):
         """Build a hybrid retriever using BM25 and vector-based retrieval."""
+        bm25, vector_store = self.build_indexes(docs, persist_directory, collection_name)
+        return self.assemble(bm25, vector_store)
+
+    def build_indexes(self, docs, persist_directory: str = None, collection_name: str = None):
+        """Build the BM25 retriever and the Chroma vector store for a document set."""
         try:
             # Validate input documents
             if not docs:
@@ -29,30 +34,70 @@ class RetrieverBuilder:
                 raise ValueError("No valid documents with content found")
             
             logger.info(f"Building retriever with {len(valid_docs)} valid documents")
+            metrics.INDEX_CHUNKS.observe(len(valid_docs))
+            started = time.perf_counter()
             
             # Create Chroma vector store
+            chroma_kwargs = {"collection_name": collection_name} if collection_name else {}
             vector_store = Chroma.from_documents(
                 documents=valid_docs,
                 embedding=self.embeddings,
-                persist_directory=settings.CHROMA_DB_PATH
+                persist_directory=persist_directory or settings.CHROMA_DB_PATH,
+                **chroma_kwargs
             )
             logger.info("Vector store created successfully.")
             
             # Create BM25 retriever
             bm25 = BM25Retriever.from_documents(valid_docs)
             logger.info("BM25 retriever created successfully.")
-            
-            # Create vector-based retriever
-            vector_retriever = vector_store.as_retriever(search_kwargs={"k": settings.VECTOR_SEARCH_K})
-            logger.info("Vector retriever created successfully.")
-            
-            # Combine retrievers into a hybrid retriever
-            hybrid_retriever = EnsembleRetriever(
-                retrievers=[bm25, vector_retriever],
-                weights=settings.HYBRID_RETRIEVER_WEIGHTS
-            )
-            logger.info("Hybrid retriever created successfully.")
-            return hybrid_retriever
+            metrics.INDEX_BUILD_SECONDS.observe(time.perf_counter() - started)
+            return bm25, vector_store
         except Exception as e:
             logger.error(f"Failed to build hybrid retriever: {e}")
             raise
+
+    def load_vector_store(self, persist_directory: str, collection_name: str) -> Chroma:
+        """Open a persisted Chroma collection without re-embedding anything."""
+        return Chroma(
+            collection_name=collection_name,
+            embedding_function=self.embeddings,
+            persist_directory=persist_directory
+        )
+
+    @staticmethod
+    def release_vector_store(vector_store: Chroma):
+        """
+        Free the in-memory index behind a persisted Chroma collection.
+
+        Chroma keeps one shared system per persist directory for the life of the
+        process, so dropping the vector store alone frees nothing; stopping the
+        system does, and load_vector_store starts a fresh one on next use.
+        """
+        try:
+            from chromadb.api.shared_system_client import SharedSystemClient
+            identifier = vector_store._client._identifier
+            system = SharedSystemClient._identifier_to_system.pop(identifier, None)
+            if system is not None:
+                system.stop()
+        except Exception as e:
+            logger.warning(f"Could not release Chroma system: {e}")
+
+    def assemble(self, bm25: BM25Retriever, vector_store: Chroma) -> EnsembleRetriever:
+        """Combine a BM25 retriever and a vector store into the hybrid retriever."""
+        # Create vector-based retriever
+        vector_retriever = vector_store.as_retriever(
+            search_kwargs={"k": settings.VECTOR_SEARCH_K},
+            callbacks=[retriever_span_handler]
+        )
+        logger.info("Vector retriever created successfully.")
+        # Callbacks are per retriever (not inherited), so each one reports its own span
+        bm25.callbacks = [retriever_span_handler]
+        
+        # Combine retrievers into a hybrid retriever
+        hybrid_retriever = EnsembleRetriever(
+            retrievers=[bm25, vector_retriever],
+            weights=settings.HYBRID_RETRIEVER_WEIGHTS,
+            callbacks=[retriever_span_handler]
+        )
+        logger.info("Hybrid retriever created successfully.")
+        return hybrid_retriever
@@ -0,0 +1,379 @@
+from langchain.schema import Document
+from langchain.retrievers import EnsembleRetriever
+from config.settings import settings
+from .builder import RetrieverBuilder
+from utils import memory, metrics, progress, tracing
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import threading
+import hashlib
+import time
+import uuid
+import os
+import pickle
+import shutil
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CorpusStore:
+    """
+    On-disk library of named, fully indexed document sets.
+
+    Each corpus directory holds:
+    - manifest.json: name, file hashes/names, chunk count, embedding model, timestamps
+      and the id of the current build
+    - chunks-<build>.pkl: the chunked documents
+    - bm25-<build>.pkl: the fitted BM25 retriever (postings included)
+    - chroma-<build>/: the persisted Chroma collection
+
+    Chroma shares one client system per directory and reopens its database by
+    path, so a build's files are never moved or reused: a rebuild writes a new
+    build next to the old one and switches to it by replacing manifest.json.
+    The old build's files are deleted once no retriever reads them. Builds of a
+    name are serialised by a per-name lock, so concurrent builds of the same
+    files do the work once. Corpora named automatically (from their files) are
+    pruned beyond CORPUS_AUTO_MAX_COUNT or after CORPUS_AUTO_RETENTION_DAYS;
+    explicitly named ones are kept until deleted.
+
+    Loading a corpus unpickles BM25 and opens the Chroma collection; nothing is
+    re-extracted or re-embedded. Loaded retrievers are kept in an LRU bounded by
+    CORPUS_CACHE_SIZE and by MEMORY_BUDGET_MB of estimated footprint; corpora
+    unused for CORPUS_IDLE_SECONDS are evicted too. Eviction only frees memory,
+    the next load reopens the corpus from disk. Corpora held through `using`
+    are never evicted while in use, and a corpus replaced or deleted while in use
+    keeps its Chroma client and files until the last holder is done.
+    """
+
+    def __init__(self, retriever_builder: RetrieverBuilder = None):
+        self.root = Path(settings.CORPUS_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.retriever_builder = retriever_builder or RetrieverBuilder()
+        self._loaded: "OrderedDict[str, EnsembleRetriever]" = OrderedDict()
+        self._footprint: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = defaultdict(int)
+        # Retrievers retired while pinned, with the files of the build they read;
+        # both are released when their name's last pin drops
+        self._pending_release: Dict[str, List[Tuple[EnsembleRetriever, List[Path]]]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._name_locks: Dict[str, threading.RLock] = defaultdict(threading.RLock)
+        self._stop = threading.Event()
+        self._sweeper = None
+        metrics.LOADED_CORPORA.set_function(lambda: len(self._loaded))
+        metrics.RETRIEVER_MEMORY_BYTES.set_function(lambda: sum(list(self._footprint.values())))
+        metrics.MEMORY_BUDGET_BYTES.set_function(lambda: settings.MEMORY_BUDGET_MB * 1024 * 1024)
+
+    def list_corpora(self) -> List[Dict]:
+        """Manifests of all stored corpora, newest first."""
+        manifests = []
+        for manifest_path in self.root.glob("*/manifest.json"):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifests.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable corpus manifest {manifest_path}: {e}")
+        return sorted(manifests, key=lambda m: m.get("created_at", ""), reverse=True)
+
+    def manifest(self, name: str) -> Dict:
+        with open(self._corpus_dir(name) / "manifest.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def exists(self, name: str) -> bool:
+        return (self._corpus_dir(name) / "manifest.json").exists()
+
+    def find_by_hashes(self, file_hashes) -> Optional[str]:
+        """Name of a stored corpus built from exactly this file set and embedding model, if any."""
+        for manifest in self.list_corpora():
+            if self._matches(manifest, file_hashes):
+                return manifest["name"]
+        return None
+
+    @staticmethod
+    def _matches(manifest: Dict, file_hashes) -> bool:
+        return (manifest.get("file_hashes") == sorted(file_hashes)
+                and manifest.get("embedding_model") == settings.OLLAMA_EMBEDDING_MODEL)
+
+    def save(self, name: str, chunks: List[Document], file_hashes, file_names: List[str],
+             auto_named: bool = False) -> EnsembleRetriever:
+        """Index chunks into a named corpus (replacing any previous one) and return its retriever."""
+        corpus_dir = self._corpus_dir(name)
+        build = uuid.uuid4().hex[:8]
+        with self._name_locks[name]:
+            corpus_dir.mkdir(parents=True, exist_ok=True)
+            paths = self._build_paths(corpus_dir, build)
+            vector_store = None
+            try:
+                progress.emit("index", 0, 1, f"Indexing {len(chunks)} chunks")
+                with tracing.span("index.build", {"index.chunks": len(chunks)}):
+                    bm25, vector_store = self.retriever_builder.build_indexes(
+                        chunks, persist_directory=str(paths["chroma"]),
+                        collection_name=settings.CORPUS_COLLECTION_NAME
+                    )
+                with open(paths["chunks"], "wb") as f:
+                    pickle.dump(chunks, f)
+                with open(paths["bm25"], "wb") as f:
+                    pickle.dump(bm25, f)
+                manifest = {
+                    "name": name,
+                    "build": build,
+                    "file_hashes": sorted(file_hashes),
+                    "file_names": list(file_names),
+                    "chunk_count": len(chunks),
+                    "embedding_model": settings.OLLAMA_EMBEDDING_MODEL,
+                    "auto_named": auto_named,
+                    "created_at": datetime.now().isoformat(),
+                }
+                previous = self.manifest(name) if self.exists(name) else None
+                staged = corpus_dir / f"manifest-{build}.json"
+                with open(staged, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+                os.replace(staged, corpus_dir / "manifest.json")
+            except BaseException:
+                if vector_store is not None:
+                    self.retriever_builder.release_vector_store(vector_store)
+                self._remove(list(paths.values()) + [corpus_dir / f"manifest-{build}.json"])
+                raise
+            if previous is not None:
+                self._retire(name, self._build_paths(corpus_dir, previous.get("build")))
+        logger.info(f"Saved corpus '{name}' with {len(chunks)} chunks")
+        progress.emit("index", 1, 1, f"Saved corpus '{name}'")
+
+        retriever = self.retriever_builder.assemble(bm25, vector_store)
+        self._remember(name, retriever)
+        return retriever
+
+    def load(self, name: str, pin: bool = False) -> EnsembleRetriever:
+        """Return the retriever for a stored corpus, opening it from disk on first use (or after eviction)."""
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                self._last_used[name] = time.monotonic()
+                if pin:
+                    self._in_use[name] += 1
+                return self._loaded[name]
+        if not self.exists(name):
+            raise ValueError(f"Unknown corpus: {name}")
+
+        # Under the name lock, so a concurrent rebuild cannot retire the build being opened
+        with self._name_locks[name]:
+            paths = self._build_paths(self._corpus_dir(name), self.manifest(name).get("build"))
+            with open(paths["bm25"], "rb") as f:
+                bm25 = pickle.load(f)
+            vector_store = self.retriever_builder.load_vector_store(
+                str(paths["chroma"]), settings.CORPUS_COLLECTION_NAME
+            )
+            retriever = self.retriever_builder.assemble(bm25, vector_store)
+            logger.info(f"Loaded corpus '{name}' from disk")
+            metrics.CORPUS_LOADS.inc()
+            self._remember(name, retriever, pin=pin)
+        return retriever
+
+    @contextmanager
+    def using(self, name: str):
+        """The corpus's retriever, protected from eviction until the block exits."""
+        retriever = self.load(name, pin=True)
+        try:
+            yield retriever
+        finally:
+            released = []
+            with self._lock:
+                self._in_use[name] -= 1
+                if not self._in_use[name]:
+                    del self._in_use[name]
+                    released = self._pending_release.pop(name, [])
+                self._last_used[name] = time.monotonic()
+            for retriever, paths in released:
+                self._close(retriever, paths)
+
+    def load_chunks(self, name: str) -> List[Document]:
+        paths = self._build_paths(self._corpus_dir(name), self.manifest(name).get("build"))
+        with open(paths["chunks"], "rb") as f:
+            return pickle.load(f)
+
+    def delete(self, name: str):
+        corpus_dir = self._corpus_dir(name)
+        with self._name_locks[name]:
+            if not self.exists(name):
+                return
+            build = self.manifest(name).get("build")
+            (corpus_dir / "manifest.json").unlink()
+            self._retire(name, self._build_paths(corpus_dir, build))
+            try:
+                corpus_dir.rmdir()  # only once empty: a pinned build keeps its files until released
+            except OSError:
+                pass
+
+    def prune(self, keep: str = None):
+        """Delete automatically named corpora beyond CORPUS_AUTO_MAX_COUNT or older than the retention period."""
+        cutoff = (datetime.now() - timedelta(days=settings.CORPUS_AUTO_RETENTION_DAYS)).isoformat()
+        auto = [m for m in self.list_corpora() if m.get("auto_named")]
+        for index, manifest in enumerate(auto):
+            name = manifest["name"]
+            if name == keep or self._in_use.get(name):
+                continue
+            if index >= settings.CORPUS_AUTO_MAX_COUNT or manifest.get("created_at", "") < cutoff:
+                logger.info(f"Pruning automatically named corpus '{name}'")
+                self.delete(name)
+
+    def get_or_build(self, files: List, processor, name: str = None) -> Tuple[str, EnsembleRetriever, frozenset]:
+        """
+        Return (name, retriever, file_hashes) for a file set, reusing a stored corpus
+        with the same files when there is one and indexing (and saving) otherwise.
+        """
+        with tracing.span("hash_files", {"files.count": len(files)}):
+            file_hashes = frozenset(self.file_hash(f.name) for f in files)
+        file_names = [Path(f.name).name for f in files]
+
+        with tracing.span("corpus.lookup") as current:
+            existing = self.find_by_hashes(file_hashes)
+            current.set_attribute("corpus.hit", bool(existing))
+        if existing and (name is None or name == existing):
+            return existing, self.load(existing), file_hashes
+
+        auto_named = name is None
+        name = name or self.default_name(file_names, file_hashes)
+        with self._name_locks[name]:
+            # Another request may have built it while this one waited for the lock
+            if self.exists(name) and self._matches(self.manifest(name), file_hashes):
+                return name, self.load(name), file_hashes
+            chunks = processor.process(files)
+            if not chunks:
+                raise ValueError("No text could be extracted from the provided files")
+            retriever = self.save(name, chunks, file_hashes, file_names, auto_named=auto_named)
+        if auto_named:
+            # Outside the name lock: pruning takes the locks of the corpora it deletes
+            self.prune(keep=name)
+        return name, retriever, file_hashes
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    @staticmethod
+    def default_name(file_names: List[str], file_hashes) -> str:
+        """Readable, stable name: first file stem plus a short hash of the file set."""
+        stem = re.sub(r"[^A-Za-z0-9_.-]+", "-", Path(sorted(file_names)[0]).stem).strip("-")[:40] or "corpus"
+        digest = hashlib.sha256("|".join(sorted(file_hashes)).encode()).hexdigest()[:8]
+        suffix = f"-and-{len(file_names) - 1}-more" if len(file_names) > 1 else ""
+        return f"{stem}{suffix}-{digest}"
+
+    def _remember(self, name: str, retriever: EnsembleRetriever, pin: bool = False):
+        footprint = memory.retriever_bytes(retriever)
+        with self._lock:
+            self._loaded[name] = retriever
+            self._loaded.move_to_end(name)
+            self._footprint[name] = footprint
+            self._last_used[name] = time.monotonic()
+            if pin:
+                self._in_use[name] += 1
+            evicted = self._select_evictions(keep=name)
+        metrics.CORPUS_MEMORY_BYTES.labels(corpus=name).set(footprint)
+        logger.info(f"Corpus '{name}' uses about {footprint / 1024 / 1024:.1f} MB")
+        self._release(evicted)
+
+    def sweep(self):
+        """Evict idle corpora and anything over the count or memory budget."""
+        with self._lock:
+            evicted = self._select_evictions()
+        self._release(evicted)
+
+    def start_sweeper(self):
+        """Run `sweep` periodically in a background thread, so idle corpora are freed without new traffic."""
+        if self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="corpus-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(max(1.0, min(60.0, settings.CORPUS_IDLE_SECONDS / 2))):
+            self.sweep()
+
+    def _select_evictions(self, keep: str = None) -> List[Tuple[str, EnsembleRetriever, str]]:
+        """Pop corpora to evict, least recently used first; call with the lock held."""
+        now = time.monotonic()
+        budget = settings.MEMORY_BUDGET_MB * 1024 * 1024
+        evicted = []
+        for name in list(self._loaded):
+            if name == keep or self._in_use.get(name):
+                continue
+            if now - self._last_used.get(name, now) > settings.CORPUS_IDLE_SECONDS:
+                reason = "idle"
+            elif len(self._loaded) > settings.CORPUS_CACHE_SIZE:
+                reason = "count"
+            elif sum(self._footprint.values()) > budget:
+                reason = "budget"
+            else:
+                continue
+            evicted.append((name, self._pop_loaded(name), reason))
+        return evicted
+
+    def _pop_loaded(self, name: str) -> Optional[EnsembleRetriever]:
+        self._footprint.pop(name, None)
+        self._last_used.pop(name, None)
+        return self._loaded.pop(name, None)
+
+    def _retire(self, name: str, paths: List[Path]):
+        """
+        Drop a corpus build that was replaced or deleted, and its files.
+        A build still in use keeps its files and Chroma system until the last pin drops.
+        """
+        with self._lock:
+            retriever = self._pop_loaded(name)
+            deferred = bool(self._in_use.get(name))
+            if deferred:
+                self._pending_release[name].append((retriever, paths))
+        metrics.CORPUS_MEMORY_BYTES.remove(corpus=name)
+        if not deferred:
+            self._close(retriever, paths)
+
+    def _release(self, evicted: List[Tuple[str, EnsembleRetriever, Optional[str]]]):
+        for name, retriever, reason in evicted:
+            metrics.CORPUS_MEMORY_BYTES.remove(corpus=name)
+            if reason:
+                metrics.CORPUS_EVICTIONS.labels(reason=reason).inc()
+                logger.info(f"Evicted corpus '{name}' from memory ({reason})")
+            self._close(retriever)
+
+    def _close(self, retriever: Optional[EnsembleRetriever], paths: List[Path] = ()):
+        for component in getattr(retriever, "retrievers", []):
+            if getattr(component, "vectorstore", None) is not None:
+                self.retriever_builder.release_vector_store(component.vectorstore)
+        self._remove(paths)
+
+    @staticmethod
+    def _build_paths(corpus_dir: Path, build: Optional[str]) -> Dict[str, Path]:
+        # Corpora saved before builds were versioned have no build id and unsuffixed files
+        suffix = f"-{build}" if build else ""
+        return {
+            "chunks": corpus_dir / f"chunks{suffix}.pkl",
+            "bm25": corpus_dir / f"bm25{suffix}.pkl",
+            "chroma": corpus_dir / f"chroma{suffix}",
+        }
+
+    @staticmethod
+    def _remove(paths):
+        for path in paths:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists():
+                path.unlink()
+
+    @staticmethod
+    def validate_name(name: str):
+        # A leading dot is reserved for the store's own (hidden) directories
+        if not re.fullmatch(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*", name):
+            raise ValueError(f"Invalid corpus name: {name!r} (use letters, digits, '.', '_' or '-', not starting with '.')")
+
+    def _corpus_dir(self, name: str) -> Path:
+        self.validate_name(name)
+        return self.root / name
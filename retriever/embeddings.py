@@ -0,0 +1,127 @@
+from langchain_core.embeddings import Embeddings
+from config.settings import settings
+from utils import progress, tracing, metrics
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import threading
+import hashlib
+import sqlite3
+
+class EmbeddingStore:
+    """SQLite store of document embeddings keyed by (model, text hash)."""
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or settings.EMBEDDING_CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, text_hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(text_hashes), 500):
+                batch = text_hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[text_hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, text_hash, np.asarray(vector, dtype=np.float32).tobytes()) for text_hash, vector in vectors.items()]
+            )
+            self._conn.commit()
+
+    def count(self, model: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", [model]).fetchone()[0]
+
+class CachingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that remembers query vectors and, given a store, document vectors.
+
+    The same question is embedded by the vector retriever, the relevance fast tier
+    and the answer cache; with this wrapper only the first call reaches Ollama.
+    prime_queries() embeds many questions in one batched request up front.
+    Document vectors found in the EmbeddingStore (e.g. pre-computed by ingest.py)
+    are not re-embedded.
+    """
+
+    def __init__(self, base: Embeddings, store: EmbeddingStore = None, max_queries: int = None):
+        self.base = base
+        self.store = store
+        self.max_queries = max_queries or settings.QUERY_EMBEDDING_CACHE_SIZE
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with tracing.span("embed.documents", {"embed.texts": len(texts)}) as current:
+            if self.store is None or not texts:
+                return self._embed_in_batches(texts)
+
+            model = getattr(self.base, "model", "")
+            hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+            vectors = self.store.get_many(model, list(set(hashes)))
+            missing = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+            current.set_attribute("embed.cache_hits", len(texts) - len(missing))
+            if missing:
+                new_vectors = dict(zip(missing.keys(), self._embed_in_batches(list(missing.values()))))
+                self.store.put_many(model, new_vectors)
+                vectors.update(new_vectors)
+            return [vectors[h] for h in hashes]
+
+    def _embed_in_batches(self, texts: List[str]) -> List[List[float]]:
+        """Embed in EMBED_BATCH_SIZE requests, reporting progress after each."""
+        vectors = []
+        batch_size = settings.EMBED_BATCH_SIZE
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            with metrics.EMBEDDING_BATCH_SECONDS.time():
+                vectors.extend(self.base.embed_documents(batch))
+            metrics.EMBEDDED_TEXTS.inc(len(batch))
+            progress.emit("embed", len(vectors), len(texts), f"Embedded {len(vectors)} of {len(texts)} chunks")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        with tracing.span("embed.query") as current:
+            with self._lock:
+                vector = self._queries.get(text)
+                if vector is not None:
+                    self._queries.move_to_end(text)
+                    current.set_attribute("embed.cache_hit", True)
+                    return vector
+            current.set_attribute("embed.cache_hit", False)
+            vector = self.base.embed_query(text)
+            self._remember({text: vector})
+            return vector
+
+    def prime_queries(self, texts: List[str]):
+        """Embed queries in one batch so later embed_query calls are served from memory."""
+        with self._lock:
+            missing = list(dict.fromkeys(t for t in texts if t not in self._queries))
+        if missing:
+            self._remember(dict(zip(missing, self.base.embed_documents(missing))))
+
+    def _remember(self, vectors: dict):
+        with self._lock:
+            self._queries.update(vectors)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+
+    def __getattr__(self, name):
+        return getattr(self.base, name)
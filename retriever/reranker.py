@@ -0,0 +1,135 @@
+from langchain.schema import Document
+from config.settings import settings
+from collections import OrderedDict
+from typing import List
+import numpy as np
+import threading
+import hashlib
+import math
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Reranker:
+    """
+    CPU re-scoring of fused retrieval candidates before they reach the research agent.
+
+    Backends (RERANKER_BACKEND):
+    - "cross-encoder": a small Hugging Face cross-encoder run with torch
+    - "onnx": the same cross-encoder exported to ONNX, run with onnxruntime
+    - "lexical": BM25-style term scoring against the candidates, no model needed
+
+    Model scores are computed in batches and cached per (query, chunk) in an LRU.
+    Lexical scores depend on the whole candidate set (idf, average length), so
+    they are recomputed for every call and never cached.
+    """
+
+    def __init__(self, backend: str = None, top_n: int = None):
+        self.backend = backend or settings.RERANKER_BACKEND
+        self.top_n = top_n or settings.RERANKER_TOP_N
+        self.batch_size = settings.RERANKER_BATCH_SIZE
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tokenizer = None
+        self._model = None
+
+    def rerank(self, query: str, documents: List[Document], top_n: int = None) -> List[Document]:
+        """Return the top_n documents ordered by reranker score."""
+        top_n = top_n or self.top_n
+        if len(documents) <= 1:
+            return documents
+
+        if self.backend == "lexical":
+            scores = self._lexical_scores(query, [doc.page_content for doc in documents])
+            return self._top(documents, scores, top_n, scored=len(documents))
+
+        keys = [self._cache_key(query, doc.page_content) for doc in documents]
+        with self._lock:
+            scores = [self._cache.get(key) for key in keys]
+            for key, score in zip(keys, scores):
+                if score is not None:
+                    self._cache.move_to_end(key)
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing:
+            new_scores = self._score(query, [documents[i].page_content for i in missing])
+            with self._lock:
+                for i, score in zip(missing, new_scores):
+                    scores[i] = float(score)
+                    self._cache[keys[i]] = float(score)
+                    self._cache.move_to_end(keys[i])
+                while len(self._cache) > settings.RERANKER_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        return self._top(documents, scores, top_n, scored=len(missing))
+
+    @staticmethod
+    def _top(documents: List[Document], scores: List[float], top_n: int, scored: int) -> List[Document]:
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_n]
+        logger.info(f"Reranked {len(documents)} candidates ({scored} scored, {len(documents) - scored} cached), kept {len(order)}")
+        return [
+            Document(page_content=documents[i].page_content, metadata={**documents[i].metadata, "rerank_score": scores[i]})
+            for i in order
+        ]
+
+    def _score(self, query: str, texts: List[str]) -> List[float]:
+        self._load_model()
+        scores = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            if self.backend == "onnx":
+                inputs = self._tokenizer([query] * len(batch), batch, padding=True, truncation=True,
+                                         max_length=settings.RERANKER_MAX_LENGTH, return_tensors="np")
+                feed = {i.name: inputs[i.name].astype(np.int64) for i in self._model.get_inputs() if i.name in inputs}
+                logits = self._model.run(None, feed)[0]
+            else:
+                import torch
+                inputs = self._tokenizer([query] * len(batch), batch, padding=True, truncation=True,
+                                         max_length=settings.RERANKER_MAX_LENGTH, return_tensors="pt")
+                with torch.no_grad():
+                    logits = self._model(**inputs).logits.numpy()
+            scores.extend(np.asarray(logits).reshape(len(batch), -1)[:, -1].tolist())
+        return scores
+
+    def _load_model(self):
+        """Load the tokenizer and model on first use."""
+        with self._lock:
+            if self._model is not None:
+                return
+            from transformers import AutoTokenizer
+            logger.info(f"Loading reranker model {settings.RERANKER_MODEL} ({self.backend})")
+            self._tokenizer = AutoTokenizer.from_pretrained(settings.RERANKER_MODEL)
+            if self.backend == "onnx":
+                import onnxruntime
+                self._model = onnxruntime.InferenceSession(
+                    settings.RERANKER_ONNX_PATH, providers=["CPUExecutionProvider"]
+                )
+            else:
+                from transformers import AutoModelForSequenceClassification
+                model = AutoModelForSequenceClassification.from_pretrained(settings.RERANKER_MODEL)
+                model.eval()
+                self._model = model
+
+    @staticmethod
+    def _lexical_scores(query: str, texts: List[str], k1: float = 1.2, b: float = 0.75) -> List[float]:
+        """BM25 of the query terms over the candidate set."""
+        tokenize = lambda text: re.findall(r"[a-z0-9]+", text.lower())
+        docs = [tokenize(text) for text in texts]
+        avg_len = sum(len(d) for d in docs) / len(docs) or 1.0
+        terms = set(tokenize(query))
+        scores = []
+        for doc in docs:
+            score = 0.0
+            for term in terms:
+                tf = doc.count(term)
+                if not tf:
+                    continue
+                df = sum(1 for d in docs if term in d)
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg_len))
+            scores.append(score)
+        return scores
+
+    def _cache_key(self, query: str, text: str) -> str:
+        return hashlib.sha256(f"{self.backend}||{query}||{text}".encode()).hexdigest()
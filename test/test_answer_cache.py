@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_ollama")
+
+from config.settings import settings
+from agents.answer_cache import AnswerCache
+
+class FakeEmbeddings:
+    """Deterministic two-dimensional vectors."""
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+@pytest.fixture
+def answer_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ANSWER_CACHE_MAX_ENTRIES", 2)
+    return AnswerCache(embeddings=FakeEmbeddings())
+
+def answer(text):
+    return {"draft_answer": text, "verification_report": "", "verified": True}
+
+def test_answer_cache_exact_and_semantic_hits(answer_cache):
+    key = answer_cache.corpus_key({"h1"})
+    answer_cache.store(key, "What is X?", answer("x"), [1.0, 0.0])
+    assert answer_cache.lookup(key, "  what is x ")["cache_hit"] == "exact"
+    assert answer_cache.lookup(key, "Define X", [0.99, 0.01])["cache_hit"] == "semantic"
+    assert answer_cache.lookup(key, "Something else", [0.0, 1.0]) is None
+
+def test_answer_cache_key_changes_with_answer_settings(answer_cache, monkeypatch):
+    key = answer_cache.corpus_key({"h1"})
+    monkeypatch.setattr(settings, "CHUNK_SIZE", settings.CHUNK_SIZE + 1)
+    assert answer_cache.corpus_key({"h1"}) != key
+
+def test_answer_cache_evicts_least_recently_hit(answer_cache):
+    key = answer_cache.corpus_key({"h1"})
+    answer_cache.store(key, "first", answer("1"), [1.0, 0.0])
+    answer_cache.store(key, "second", answer("2"), [0.0, 1.0])
+    entries = answer_cache._corpora[key]
+    entries[0]["last_hit"] += 10  # "first" was hit more recently
+    answer_cache.store(key, "third", answer("3"), [1.0, 1.0])
+    assert answer_cache.lookup(key, "first") is not None
+    assert answer_cache.lookup(key, "second") is None
+
+def test_answer_cache_expires_entries(answer_cache):
+    key = answer_cache.corpus_key({"h1"})
+    answer_cache.store(key, "old", answer("1"), [1.0, 0.0])
+    answer_cache._corpora[key][0]["created"] = (datetime.now() - answer_cache.ttl - timedelta(seconds=1)).timestamp()
+    assert answer_cache.lookup(key, "old") is None
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("fastapi")
+pytest.importorskip("langgraph")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from config.settings import settings
+from api.jobs import JobQueue
+from api.server import create_api_router
+from retriever.corpus_store import CorpusStore
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CORPUS_DIR", str(tmp_path / "corpora"))
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 10)
+    monkeypatch.setattr(settings, "MAX_TOTAL_SIZE", 15)
+    # Rejected uploads never reach indexing, so no builder, processor or workflow is needed
+    store = CorpusStore(retriever_builder=object())
+    app = FastAPI()
+    app.include_router(create_api_router(None, store, None, JobQueue(workers=1, max_size=1)))
+    return TestClient(app)
+
+def upload(client, *sizes):
+    files = [("files", (f"doc{i}.txt", b"x" * size, "text/plain")) for i, size in enumerate(sizes)]
+    return client.post("/api/corpora", files=files)
+
+def test_oversized_file_is_rejected_before_writing(client, tmp_path):
+    response = upload(client, 11)
+    assert response.status_code == 413
+    assert "doc0.txt" in response.json()["detail"]
+    assert not any((tmp_path / "uploads").glob("*/*"))
+
+def test_oversized_total_is_rejected(client):
+    assert upload(client, 8, 8).status_code == 413
@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("langchain_ollama")
+
+from config.settings import settings
+from agents import claim_verifier, verification_agent
+from agents.claim_verifier import ClaimVerifier
+from agents.verification_agent import VerificationAgent
+
+CLAIMS = ["The sky is blue.", "Water boils at 100C.", "Paris is in France."]
+
+class FakePool:
+    """Hands out a placeholder model; these tests never call it."""
+
+    def get_chat_model(self, **kwargs):
+        return object()
+
+@pytest.fixture(autouse=True)
+def fake_pool(monkeypatch):
+    monkeypatch.setattr(claim_verifier, "get_model_pool", lambda: FakePool())
+    monkeypatch.setattr(verification_agent, "get_model_pool", lambda: FakePool())
+
+def aggregate(verdicts):
+    return ClaimVerifier()._aggregate(CLAIMS, {i: {"verdict": v, "note": ""} for i, v in verdicts.items()})
+
+def test_all_supported_passes():
+    result = aggregate({0: "SUPPORTED", 1: "SUPPORTED", 2: "SUPPORTED"})
+    assert result.supported and result.relevant
+    assert not result.needs_re_research
+
+def test_unsupported_claim_fails_and_is_listed():
+    result = aggregate({0: "SUPPORTED", 1: "UNSUPPORTED", 2: "SUPPORTED"})
+    assert not result.supported
+    assert result.unsupported_claims == [CLAIMS[1]]
+    assert result.needs_re_research
+
+def test_contradiction_is_listed_and_on_topic():
+    result = aggregate({0: "CONTRADICTED", 1: "UNSUPPORTED", 2: "UNSUPPORTED"})
+    assert not result.supported
+    assert result.contradictions == [CLAIMS[0]]
+    assert result.relevant
+
+def test_nothing_in_the_evidence_is_not_relevant():
+    result = aggregate({0: "UNSUPPORTED", 1: "UNSUPPORTED", 2: "UNSUPPORTED"})
+    assert not result.relevant
+
+def test_claim_without_verdict_is_not_supported():
+    result = aggregate({0: "SUPPORTED", 1: "SUPPORTED", 2: "UNKNOWN"})
+    assert not result.supported
+    assert result.parsed
+    assert result.needs_re_research
+    assert "1 could not be verified" in result.additional_details
+
+def test_no_verdicts_is_unparsed_and_does_not_re_research():
+    result = aggregate({0: "UNKNOWN", 1: "UNKNOWN", 2: "UNKNOWN"})
+    assert not result.parsed
+    assert not result.needs_re_research
+
+def test_claim_verifier_is_created_when_the_strategy_changes(monkeypatch):
+    monkeypatch.setattr(settings, "VERIFICATION_STRATEGY", "full")
+    agent = VerificationAgent()
+    assert agent.claim_verifier is None
+    monkeypatch.setattr(settings, "VERIFICATION_STRATEGY", "claims")
+    verifier = agent.get_claim_verifier()
+    assert isinstance(verifier, ClaimVerifier)
+    assert agent.get_claim_verifier() is verifier
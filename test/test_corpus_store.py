@@ -0,0 +1,115 @@
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from langchain.schema import Document
+from config.settings import settings
+from retriever.corpus_store import CorpusStore
+
+class FakeComponent:
+    def __init__(self, name):
+        self.vectorstore = name
+
+class FakeRetriever:
+    def __init__(self, name):
+        self.retrievers = [FakeComponent(name)]
+
+class FakeBuilder:
+    """Records which vector stores were released."""
+
+    def __init__(self):
+        self.released = []
+
+    def release_vector_store(self, vector_store):
+        self.released.append(vector_store)
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CORPUS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "CORPUS_CACHE_SIZE", 2)
+    monkeypatch.setattr(settings, "CORPUS_IDLE_SECONDS", 3600)
+    monkeypatch.setattr(settings, "MEMORY_BUDGET_MB", 1024)
+    return CorpusStore(FakeBuilder())
+
+def test_least_recently_used_corpus_is_evicted_over_count(store):
+    store._remember("a", FakeRetriever("a"))
+    store._remember("b", FakeRetriever("b"))
+    store.load("a")  # "a" becomes most recent
+    store._remember("c", FakeRetriever("c"))
+    assert list(store._loaded) == ["a", "c"]
+    assert store.retriever_builder.released == ["b"]
+
+def test_pinned_corpus_is_not_evicted(store):
+    store._remember("a", FakeRetriever("a"), pin=True)
+    store._remember("b", FakeRetriever("b"))
+    store._remember("c", FakeRetriever("c"))
+    assert "a" in store._loaded
+    assert store.retriever_builder.released == ["b"]
+
+def test_idle_corpus_is_swept(store, monkeypatch):
+    store._remember("a", FakeRetriever("a"))
+    monkeypatch.setattr(settings, "CORPUS_IDLE_SECONDS", -1)
+    store.sweep()
+    assert not store._loaded
+    assert store.retriever_builder.released == ["a"]
+
+def test_retiring_a_corpus_in_use_defers_its_release(store, tmp_path):
+    old_build = tmp_path / "a" / "chroma-old"
+    old_build.mkdir(parents=True)
+    store._remember("a", FakeRetriever("a"))
+    with store.using("a"):
+        store._retire("a", [old_build])
+        assert store.retriever_builder.released == []
+        assert old_build.exists()
+    assert store.retriever_builder.released == ["a"]
+    assert not old_build.exists()
+
+def test_invalid_names_are_rejected(store):
+    for name in ("", ".", "..", ".staging", "a/b"):
+        with pytest.raises(ValueError):
+            store.validate_name(name)
+    store.validate_name("my-corpus_1.v2")
+
+class WordEmbeddings:
+    """Deterministic bag-of-words vectors, so no embedding model is needed."""
+
+    def _vector(self, text):
+        vector = [0.0] * 16
+        for word in text.lower().split():
+            vector[sum(map(ord, word)) % 16] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+class FakePool:
+    def get_embeddings(self):
+        return WordEmbeddings()
+
+@pytest.fixture
+def chroma_store(tmp_path, monkeypatch):
+    pytest.importorskip("chromadb")
+    pytest.importorskip("rank_bm25")
+    from retriever import builder
+    monkeypatch.setattr(builder, "get_model_pool", lambda: FakePool())
+    monkeypatch.setattr(settings, "CORPUS_DIR", str(tmp_path))
+    return CorpusStore(builder.RetrieverBuilder())
+
+def corpus_docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+def test_replacing_a_pinned_corpus_keeps_both_builds_usable(chroma_store):
+    chroma_store.save("lib", corpus_docs("alpha apples", "beta bananas"), {"h1"}, ["old.txt"])
+    with chroma_store.using("lib") as old:
+        chroma_store.save("lib", corpus_docs("gamma grapes", "delta dates"), {"h2"}, ["new.txt"])
+        assert "alpha apples" in [d.page_content for d in old.invoke("alpha apples")]
+    # Releasing the old build must not stop the new build's Chroma system
+    new = chroma_store.load("lib")
+    assert "gamma grapes" in [d.page_content for d in new.invoke("gamma grapes")]
+    assert chroma_store.manifest("lib")["file_names"] == ["new.txt"]
+    assert sorted(p.name for p in (chroma_store.root / "lib").iterdir() if p.name.startswith("chroma")) == [
+        f"chroma-{chroma_store.manifest('lib')['build']}"
+    ]
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from config.settings import settings
+from api.jobs import JobQueue, QueueFullError
+
+def wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+def blocking_job(started: threading.Event, release: threading.Event):
+    def run(job):
+        started.set()
+        release.wait(5)
+        return {"done": True}
+    return run
+
+def test_job_runs_to_success():
+    queue = JobQueue(workers=1, max_size=4)
+    job = queue.submit("test", {}, lambda job: {"answer": 42})
+    wait_for(lambda: job.status == "succeeded")
+    assert job.result == {"answer": 42}
+    assert [e["data"]["status"] for e in job.events if e["event"] == "status"] == ["queued", "running", "succeeded"]
+
+def test_failed_job_records_error():
+    def fail(job):
+        raise RuntimeError("boom")
+
+    queue = JobQueue(workers=1, max_size=4)
+    job = queue.submit("test", {}, fail)
+    wait_for(lambda: job.status == "failed")
+    assert job.error == "boom"
+
+def test_cancel_queued_job_never_runs_and_cleans_up():
+    started, release = threading.Event(), threading.Event()
+    ran, cleaned = [], []
+    queue = JobQueue(workers=1, max_size=4)
+    first = queue.submit("test", {}, blocking_job(started, release))
+    started.wait(5)
+    second = queue.submit("test", {}, lambda job: ran.append(job.id), on_cancel=lambda: cleaned.append(True))
+
+    assert queue.cancel(second.id)
+    assert not queue.cancel(second.id)
+    release.set()
+    wait_for(lambda: first.status == "succeeded")
+    queue._executor.shutdown(wait=True)
+    assert second.status == "cancelled"
+    assert ran == []
+    assert cleaned == [True]
+
+def test_running_job_cannot_be_cancelled():
+    started, release = threading.Event(), threading.Event()
+    queue = JobQueue(workers=1, max_size=4)
+    job = queue.submit("test", {}, blocking_job(started, release))
+    started.wait(5)
+    assert not queue.cancel(job.id)
+    release.set()
+    wait_for(lambda: job.status == "succeeded")
+
+def test_queue_full_rejects_submissions():
+    started, release = threading.Event(), threading.Event()
+    queue = JobQueue(workers=1, max_size=1)
+    queue.submit("test", {}, blocking_job(started, release))
+    with pytest.raises(QueueFullError):
+        queue.submit("test", {}, lambda job: {})
+    release.set()
+
+def test_finished_jobs_are_pruned_after_retention(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETENTION_SECONDS", 0)
+    queue = JobQueue(workers=1, max_size=4)
+    old = queue.submit("test", {}, lambda job: {})
+    wait_for(lambda: old.status == "succeeded")
+    time.sleep(0.01)
+    queue.submit("test", {}, lambda job: {})
+    assert queue.get(old.id) is None
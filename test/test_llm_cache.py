@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("langchain_ollama")
+
+from config.settings import settings
+from agents import llm_cache
+from agents.llm_cache import LLMResponseCache
+from agents.model_pool import ModelClientPool
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_DIR", str(tmp_path / "llm_cache"))
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "OLLAMA_CASSETTE_MODE", "")
+    monkeypatch.setattr(llm_cache, "_llm_cache", None)
+
+def cache_key(model) -> str:
+    return model.cache.make_key(model.model_name, {"temperature": 0}, "Hello")
+
+def test_key_uses_the_model_name_not_the_client():
+    model = ModelClientPool().get_chat_model(temperature=0)
+    assert model.model_name == settings.OLLAMA_MODEL
+    assert cache_key(model) == model.cache.make_key(settings.OLLAMA_MODEL, {"temperature": 0}, "Hello")
+
+def test_key_is_stable_across_pools_and_client_settings(monkeypatch):
+    first = ModelClientPool().get_chat_model(temperature=0)
+    monkeypatch.setattr(settings, "OLLAMA_KEEP_ALIVE", "1h")
+    monkeypatch.setattr(settings, "OLLAMA_REQUEST_TIMEOUT", settings.OLLAMA_REQUEST_TIMEOUT + 5)
+    second = ModelClientPool().get_chat_model(temperature=0)
+    assert first.model is not second.model
+    assert cache_key(first) == cache_key(second)
+
+def test_put_then_get_round_trips(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path / "entries"), max_entries=1)
+    cache.put("a", "first")
+    assert cache.get("a") == "first"
+    cache.put("b", "second")
+    assert cache.get("a") is None
+    assert cache.get("b") == "second"
+
+def test_recording_bypasses_the_response_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OLLAMA_CASSETTE_MODE", "record")
+    monkeypatch.setattr(settings, "OLLAMA_CASSETTE_PATH", str(tmp_path / "cassette.jsonl"))
+    pool = ModelClientPool()
+    assert not isinstance(pool.get_chat_model(temperature=0), llm_cache.CachedChatModel)
+    assert pool._embedding_store is None
+    pool._cassette.finish()
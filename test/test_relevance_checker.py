@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_ollama")
+
+from config.settings import settings
+from agents import relevance_checker
+from agents.relevance_checker import RelevanceChecker
+
+class FakeEmbeddings:
+    """Deterministic two-dimensional vectors; counts the texts it is asked to embed."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+class FakePool:
+    def get_chat_model(self, **kwargs):
+        return object()
+
+    def get_embeddings(self):
+        return FakeEmbeddings()
+
+@pytest.fixture
+def checker(tmp_path, monkeypatch):
+    monkeypatch.setattr(relevance_checker, "get_model_pool", lambda: FakePool())
+    monkeypatch.setattr(settings, "RELEVANCE_LOG_PATH", str(tmp_path / "outcomes.jsonl"))
+    monkeypatch.setattr(settings, "RELEVANCE_CALIBRATION_PATH", str(tmp_path / "calibration.json"))
+    monkeypatch.setattr(settings, "RELEVANCE_VECTOR_CACHE_SIZE", 2)
+    return RelevanceChecker()
+
+def test_chunk_vectors_survive_overflow(checker):
+    checker._embed_chunks(["a", "bb"])
+    vectors = checker._embed_chunks(["a", "ccc", "dddd"])  # more new vectors than the cache holds
+    assert vectors.shape == (3, 2)
+    assert list(vectors[:, 0]) == [1.0, 3.0, 4.0]
+    assert len(checker._chunk_vectors) == 2
+
+def test_chunk_vectors_evict_least_recently_used(checker):
+    checker._embed_chunks(["a", "bb"])
+    checker._embed_chunks(["a"])
+    checker._embed_chunks(["ccc"])  # evicts "bb", the least recently used
+    checker.embeddings.embedded.clear()
+    checker._embed_chunks(["a", "bb"])
+    assert checker.embeddings.embedded == ["bb"]
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+from config.settings import settings
+from retriever.reranker import Reranker
+
+def docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+def model_reranker(monkeypatch, cache_size: int):
+    monkeypatch.setattr(settings, "RERANKER_CACHE_SIZE", cache_size)
+    reranker = Reranker(backend="cross-encoder", top_n=10)
+    scored = []
+
+    def score(query, texts):
+        scored.extend(texts)
+        return [float(len(text)) for text in texts]
+
+    monkeypatch.setattr(reranker, "_score", score)
+    return reranker, scored
+
+def test_reranker_serves_repeated_pairs_from_cache(monkeypatch):
+    reranker, scored = model_reranker(monkeypatch, cache_size=10)
+    first = reranker.rerank("q", docs("a", "bbb", "cc"))
+    assert [d.page_content for d in first] == ["bbb", "cc", "a"]
+    reranker.rerank("q", docs("a", "bbb", "cc"))
+    assert sorted(scored) == ["a", "bbb", "cc"]
+
+def test_reranker_cache_evicts_least_recently_used(monkeypatch):
+    reranker, scored = model_reranker(monkeypatch, cache_size=2)
+    reranker.rerank("q", docs("a", "bb"))
+    reranker.rerank("q", docs("a", "x"))   # "a" is a hit and becomes most recent; "bb" is evicted
+    scored.clear()
+    reranker.rerank("q", docs("a", "bb"))
+    assert scored == ["bb"]
+
+def test_lexical_reranker_scores_the_whole_candidate_set_uncached():
+    reranker = Reranker(backend="lexical", top_n=10)
+    candidates = docs("apples and pears", "pears only", "nothing relevant")
+    first = reranker.rerank("apples pears", candidates)
+    second = reranker.rerank("apples pears", candidates)
+    assert [d.page_content for d in first] == [d.page_content for d in second]
+    assert first[0].page_content == "apples and pears"
+    assert len(reranker._cache) == 0
@@ -1,8 +1,97 @@
+"""
+Application logging, built on loguru.
+
+Records from the stdlib `logging` module (our agents and retriever modules as well
+as libraries) are routed into loguru, so there is one set of sinks. Sinks are
+enqueued: the calling thread only hands the record to a background writer, so
+request threads never contend on stdout or the log file.
+
+Hot paths should keep verbose output cheap:
+- pass large values as `truncate(value)`; it is only rendered (and capped at
+  LOG_MAX_PAYLOAD_CHARS) if the record is actually emitted,
+- pass expensive values lazily with `logger.opt(lazy=True)`,
+- use `debug_sampled(...)` for per-call debug events, which are emitted for
+  LOG_DEBUG_SAMPLE_RATE of calls and skipped entirely above DEBUG.
+Keyword arguments become structured fields (`record["extra"]`), which LOG_JSON
+writes out as JSON.
+
+Entry points (app, ingest, api.batch, the benchmarks) call `setup_logging()`;
+importing this module configures nothing, so library use and tests keep their
+own handlers.
+"""
+import logging
+import random
+import sys
+
 from loguru import logger
 
-logger.add(
-    "app.log",
-    rotation="10 MB",
-    retention="30 days",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
-)
\ No newline at end of file
+from config.settings import settings
+
+# Set by setup_logging; sampled debug events are skipped until then
+_debug_enabled = False
+
+class InterceptHandler(logging.Handler):
+    """Forwards stdlib logging records to loguru, keeping the original level and caller."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # Skip logging's own frames so the record points at the real caller
+        frame, depth = logging.currentframe(), 2
+        while frame and frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+class _Truncated:
+    """Renders as the wrapped value's text, capped; rendering only happens if the record is emitted."""
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit: int):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... [{len(text) - self.limit} more chars]"
+
+    def __format__(self, spec: str) -> str:
+        return format(str(self), spec)
+
+    __repr__ = __str__
+
+def truncate(value, limit: int = None) -> _Truncated:
+    """Wrap a large log argument (prompt, context, response) so it is capped at LOG_MAX_PAYLOAD_CHARS."""
+    return _Truncated(value, limit or settings.LOG_MAX_PAYLOAD_CHARS)
+
+def debug_sampled(message: str, *args, **kwargs):
+    """Log a verbose DEBUG event for a sample of calls; a no-op unless DEBUG is enabled."""
+    if _debug_enabled and random.random() < settings.LOG_DEBUG_SAMPLE_RATE:
+        logger.opt(depth=1).debug(message, *args, **kwargs)
+
+def setup_logging():
+    """Install the stderr and file sinks at LOG_LEVEL and route stdlib logging into them."""
+    global _debug_enabled
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level=settings.LOG_LEVEL,
+        enqueue=True,
+        format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan> | {message}"
+    )
+    logger.add(
+        settings.LOG_FILE,
+        level=settings.LOG_LEVEL,
+        enqueue=True,
+        serialize=settings.LOG_JSON,
+        rotation="10 MB",
+        retention="30 days",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {name} | {message}"
+    )
+    # Route stdlib logging through the sinks above, dropping filtered levels before a record is built
+    logging.basicConfig(handlers=[InterceptHandler()], level=settings.LOG_LEVEL.upper(), force=True)
+    _debug_enabled = logger.level(settings.LOG_LEVEL.upper()).no <= logger.level("DEBUG").no
@@ -0,0 +1,102 @@
+"""
+Memory accounting for loaded retrievers and browser sessions.
+
+Sizes are estimates: a retriever is sized once when it is loaded, from its
+documents, BM25 postings and the number and width of its vectors, rather than
+by walking every object. They are meant for budgeting and dashboards, not
+exact bookkeeping.
+"""
+import sys
+import threading
+import time
+import uuid
+from typing import Dict
+
+from utils import metrics
+
+# Per-Document object overhead beyond its text and metadata (object, dict and pydantic fields)
+DOCUMENT_OVERHEAD = 400
+# HNSW graph links and bookkeeping per vector held by Chroma, on top of the float32 vector
+HNSW_BYTES_PER_VECTOR = 200
+
+def container_bytes(value) -> int:
+    """Size of plain data (dicts, lists, tuples, sets, strings and scalars), counting nested contents."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(container_bytes(k) + container_bytes(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(container_bytes(item) for item in value)
+    return size
+
+def document_bytes(doc) -> int:
+    return sys.getsizeof(doc.page_content) + container_bytes(doc.metadata) + DOCUMENT_OVERHEAD
+
+def bm25_bytes(bm25) -> int:
+    """Documents plus the rank_bm25 index: one term-frequency dict per document and the corpus idf table."""
+    vectorizer = bm25.vectorizer
+    idf = getattr(vectorizer, "idf", {})
+    return (
+        sum(document_bytes(doc) for doc in bm25.docs)
+        + sum(sys.getsizeof(freqs) for freqs in getattr(vectorizer, "doc_freqs", []))
+        + sys.getsizeof(idf) + sum(sys.getsizeof(term) for term in idf)
+        + sys.getsizeof(getattr(vectorizer, "doc_len", []))
+    )
+
+def vector_store_bytes(vector_store) -> int:
+    """In-memory HNSW index of a Chroma collection: float32 vectors plus graph links."""
+    try:
+        collection = vector_store._collection
+        count = collection.count()
+        if not count:
+            return 0
+        dimension = len(collection.get(limit=1, include=["embeddings"])["embeddings"][0])
+    except Exception:
+        return 0
+    return count * (dimension * 4 + HNSW_BYTES_PER_VECTOR)
+
+def retriever_bytes(retriever) -> int:
+    """Estimated footprint of a hybrid retriever (or a single BM25 or vector retriever)."""
+    total = 0
+    for component in getattr(retriever, "retrievers", [retriever]):
+        if hasattr(component, "vectorizer"):
+            total += bm25_bytes(component)
+        vector_store = getattr(component, "vectorstore", None)
+        if vector_store is not None:
+            total += vector_store_bytes(vector_store)
+    return total
+
+class SessionRegistry:
+    """
+    Live browser sessions and the estimated size of their state.
+
+    Sessions hold only a corpus name (the retriever lives in the CorpusStore), so
+    their own footprint is mostly the question history. `touch` is called when a
+    session's state changes and `release` when Gradio deletes it.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        metrics.SESSIONS.set_function(lambda: len(self._sessions))
+        metrics.SESSION_MEMORY_BYTES.set_function(self.total_bytes)
+        metrics.SESSION_MEMORY_MAX_BYTES.set_function(
+            lambda: max((s["bytes"] for s in list(self._sessions.values())), default=0)
+        )
+
+    def touch(self, state: Dict) -> str:
+        """Record the session's current size and corpus; assigns a session ID on first use."""
+        session_id = state.setdefault("session_id", uuid.uuid4().hex[:12])
+        size = container_bytes({k: v for k, v in state.items() if k != "session_id"})
+        with self._lock:
+            self._sessions[session_id] = {"corpus": state.get("corpus"), "bytes": size, "last_seen": time.time()}
+        return session_id
+
+    def release(self, state: Dict):
+        session_id = (state or {}).get("session_id")
+        if session_id:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(s["bytes"] for s in self._sessions.values())
@@ -0,0 +1,281 @@
+"""
+Prometheus-style metrics for DocChat.
+
+A small in-process registry of counters, gauges and histograms, rendered in the
+Prometheus text exposition format by `render()` and served at /metrics. Rates
+(questions/s, embeddings/s) and latency percentiles are left to the scraper:
+`rate(docchat_questions_total[1m])`, `histogram_quantile(0.95, ...)`.
+"""
+import bisect
+import math
+from abc import ABC, abstractmethod
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits through multi-minute local generations
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+class Registry:
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Unlabelled metrics are exported (as zero) before their first update
+            self._children[()] = self._new_child()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, **labels):
+        """The child series for a label set, created on first use."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            if key not in self._children:
+                self._children[key] = self._new_child()
+            return self._children[key]
+
+    def remove(self, **labels):
+        """Drop a child series, e.g. for a corpus that is no longer loaded."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._children.pop(key, None)
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from self._child_samples(dict(zip(self.labelnames, key)), child)
+
+    def _unlabelled(self):
+        return self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh value holder for one label set."""
+
+    @abstractmethod
+    def _child_samples(self, labels: Dict, child):
+        """(sample name, labels, value) tuples for one child."""
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from `function` at scrape time instead."""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            return float(self.function())
+        with self._lock:
+            return self.value
+
+class Counter(_Metric):
+    """Monotonically increasing total; the exposed name gets a `_total` suffix if missing."""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = None):
+        super().__init__(name if name.endswith("_total") else f"{name}_total", documentation, labelnames, registry)
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def _new_child(self):
+        return _Value()
+
+    def _child_samples(self, labels, child):
+        yield self.name, labels, child.get()
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._unlabelled().dec(amount)
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._unlabelled().set_function(function)
+
+    def _new_child(self):
+        return _Value()
+
+    def _child_samples(self, labels, child):
+        yield self.name, labels, child.get()
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Registry = None):
+        self.buckets = tuple(sorted(b for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def _child_samples(self, labels, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{self.name}_sum", labels, total
+        yield f"{self.name}_count", labels, cumulative
+
+@contextmanager
+def track_question(source: str):
+    """Count one question and time it end to end; the outcome is "error" if the block raises."""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    except GeneratorExit:
+        # A streaming UI handler closed by a cancel or disconnect
+        status = "cancelled"
+        raise
+    finally:
+        QUESTIONS.labels(source=source, status=status).inc()
+        QUESTION_SECONDS.labels(source=source).observe(time.perf_counter() - start)
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format."""
+    return REGISTRY.render()
+
+def _format_labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+# Questions
+QUESTIONS = Counter("docchat_questions", "Questions answered, by entry point and outcome", ["source", "status"])
+QUESTION_SECONDS = Histogram("docchat_question_seconds", "End-to-end question latency", ["source"])
+RESEARCH_ITERATIONS = Histogram(
+    "docchat_research_iterations", "Research passes per answered question", buckets=(1, 2, 3, 4, 5)
+)
+ANSWER_CACHE = Counter("docchat_answer_cache", "Answer cache lookups by result", ["result"])
+
+# Agents and models
+AGENT_LLM_SECONDS = Histogram("docchat_agent_llm_seconds", "LLM call latency per agent", ["agent"])
+LLM_REQUEST_SECONDS = Histogram("docchat_llm_request_seconds", "Ollama generation latency, excluding queueing", ["model"])
+LLM_TOKENS = Counter("docchat_llm_tokens", "Tokens processed by Ollama", ["model", "kind"])
+MODEL_IN_FLIGHT = Gauge("docchat_model_in_flight", "Generations currently running", ["model"])
+MODEL_WAITING = Gauge("docchat_model_waiting", "Generations queued for a slot", ["model"])
+MODEL_REJECTED = Counter("docchat_model_rejected", "Generations rejected as busy", ["model"])
+WARMUP_PASSES = Counter("docchat_warmup_passes", "Model warm-up passes by result", ["result"])
+
+# Documents, embeddings and indexes
+DOCUMENT_CACHE = Counter("docchat_document_cache", "Processed-document cache lookups by result", ["result"])
+DOCUMENT_SECONDS = Histogram("docchat_document_processing_seconds", "Extraction and chunking time per file", ["type"])
+CHUNKS = Counter("docchat_chunks", "Chunks produced by document processing")
+EMBEDDED_TEXTS = Counter("docchat_embedded_texts", "Texts sent to the embedding model")
+EMBEDDING_BATCH_SECONDS = Histogram("docchat_embedding_batch_seconds", "Latency per embedding request")
+INDEX_BUILD_SECONDS = Histogram("docchat_index_build_seconds", "Time to build the BM25 and vector indexes")
+INDEX_CHUNKS = Histogram(
+    "docchat_index_chunks", "Chunks per built index", buckets=(10, 50, 100, 500, 1000, 5000, 10000, 50000)
+)
+
+# Queues
+JOB_QUEUE_DEPTH = Gauge("docchat_job_queue_depth", "API jobs by status", ["status"])
+
+# Memory
+CORPUS_MEMORY_BYTES = Gauge("docchat_corpus_memory_bytes", "Estimated memory of each loaded corpus retriever", ["corpus"])
+RETRIEVER_MEMORY_BYTES = Gauge("docchat_retriever_memory_bytes", "Estimated memory of all loaded corpus retrievers")
+MEMORY_BUDGET_BYTES = Gauge("docchat_memory_budget_bytes", "Budget for loaded corpus retrievers")
+LOADED_CORPORA = Gauge("docchat_loaded_corpora", "Corpora held in memory")
+CORPUS_LOADS = Counter("docchat_corpus_loads", "Corpora opened from disk, including reloads after eviction")
+CORPUS_EVICTIONS = Counter("docchat_corpus_evictions", "Corpora evicted from memory", ["reason"])
+SESSIONS = Gauge("docchat_sessions", "Live browser sessions")
+SESSION_MEMORY_BYTES = Gauge("docchat_session_memory_bytes", "Estimated memory of all browser session state")
+SESSION_MEMORY_MAX_BYTES = Gauge("docchat_session_memory_max_bytes", "Estimated memory of the largest browser session")
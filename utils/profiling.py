@@ -0,0 +1,171 @@
+"""
+Opt-in per-request profiling.
+
+`profile_request(request_id)` wraps one request in a profiler and writes a file
+named after the request ID to PROFILING_DIR, so a slow answer can be matched to
+its trace, log lines and profile:
+
+- "sampling" (default): a background thread records the Python stack of the
+  request's thread each PROFILING_SAMPLE_INTERVAL seconds and writes folded
+  stacks (`<request_id>.folded`), the input of flamegraph.pl, inferno and
+  speedscope. Overhead does not grow with the number of calls, and requests
+  running at the same time do not show up in each other's profiles; work handed
+  to other threads shows as the request thread waiting on it.
+- "cprofile": deterministic cProfile of the calling thread only, written as
+  `<request_id>.prof` for pstats or snakeviz. Exact call counts, higher overhead.
+  Only one cProfile can be active per process, so a request that starts while
+  another is being profiled runs unprofiled (with a warning).
+
+Profiling is enabled for every request by PROFILING_ENABLED, or per request by
+the caller's flag. Old profiles are pruned to PROFILING_MAX_FILES and
+PROFILING_RETENTION_HOURS after each write.
+"""
+import cProfile
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from config.settings import settings
+from utils.logging import logger
+
+PROFILE_SUFFIXES = (".folded", ".prof")
+
+# Held while a cProfile is enabled; Python allows one active profiler per process
+_cprofile_lock = threading.Lock()
+
+# Innermost frames of threads that are parked rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+class SamplingProfiler:
+    """Periodically samples one thread's stack (all threads when none is given) into folded-stack counts."""
+
+    def __init__(self, interval: float = None, thread_ident: int = None):
+        self.interval = interval or settings.PROFILING_SAMPLE_INTERVAL
+        self.thread_ident = thread_ident
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ident is not None and ident != self.thread_ident):
+                    continue
+                stack = self._fold(frame)
+                if stack:
+                    self.samples[f"{names.get(ident, ident)};{stack}"] += 1
+
+    @staticmethod
+    def _fold(frame) -> Optional[str]:
+        code = frame.f_code
+        if (Path(code.co_filename).name, code.co_name) in IDLE_FRAMES:
+            return None
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({Path(code.co_filename).parent.name}/{Path(code.co_filename).name})")
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+class RequestProfile:
+    """Outcome of profile_request: where the profile was written, if anywhere."""
+
+    def __init__(self, request_id: str, mode: str):
+        self.request_id = request_id
+        self.mode = mode
+        self.path: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+def should_profile(flag: bool = None) -> bool:
+    """A per-request flag wins; otherwise PROFILING_ENABLED decides."""
+    return settings.PROFILING_ENABLED if flag is None else bool(flag)
+
+@contextmanager
+def profile_request(request_id: str, enabled: bool = None, mode: str = None):
+    """Profile the enclosed block when enabled; yields a RequestProfile whose path is set on exit."""
+    mode = mode or settings.PROFILING_MODE
+    profile = RequestProfile(request_id, mode)
+    if not should_profile(enabled):
+        yield profile
+        return
+    if mode not in ("sampling", "cprofile"):
+        raise ValueError(f"Unknown profiling mode: {mode}")
+
+    if mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+        logger.warning("Request {} not profiled: another request holds the cProfile profiler", request_id)
+        yield profile
+        return
+
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Some other profiler (a debugger, an outer cProfile run) is active
+            _cprofile_lock.release()
+            logger.warning("Request {} not profiled: {}", request_id, e)
+            yield profile
+            return
+    else:
+        sampler = SamplingProfiler(thread_ident=threading.get_ident()).start()
+    try:
+        yield profile
+    finally:
+        # Written even when the request fails: slow failures are worth a look too
+        if mode == "cprofile":
+            profiler.disable()
+            _cprofile_lock.release()
+            profile.path = str(directory / f"{request_id}.prof")
+            profiler.dump_stats(profile.path)
+        else:
+            samples = sampler.stop()
+            profile.path = str(directory / f"{request_id}.folded")
+            with open(profile.path, "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        profile.seconds = round(time.perf_counter() - started, 3)
+        logger.info("Profile for request {} written to {} ({}s)", request_id, profile.path, profile.seconds)
+        prune(directory)
+
+def prune(directory: str = None):
+    """Delete profiles beyond PROFILING_MAX_FILES (oldest first) or older than PROFILING_RETENTION_HOURS."""
+    root = Path(directory or settings.PROFILING_DIR)
+    profiles = []
+    for path in root.glob("*"):
+        try:
+            if path.suffix in PROFILE_SUFFIXES:
+                profiles.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            pass
+    profiles = [path for _, path in sorted(profiles, reverse=True)]
+    cutoff = time.time() - settings.PROFILING_RETENTION_HOURS * 3600
+    for index, path in enumerate(profiles):
+        try:
+            if index >= settings.PROFILING_MAX_FILES or path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass  # Pruned concurrently by another request
@@ -0,0 +1,113 @@
+"""
+Progress event bus shared by ingestion, embedding and the agent workflow.
+
+Components call `emit(...)` without knowing who is listening. A request opts in by
+running its work inside `ProgressTracker.run(...)`; events are then routed to that
+request's tracker through a context variable, so concurrent requests don't mix.
+Code that hands work to another thread should submit `bind(fn)` to carry the
+tracker along.
+
+A tracker can be cancelled (e.g. when the user leaves or resets the page): the
+next `emit` under it raises RequestCancelled, so a running pipeline stops at
+its next progress point instead of finishing unobserved.
+"""
+import contextvars
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+_current_tracker = contextvars.ContextVar("progress_tracker", default=None)
+
+# Display names for the stages emitted by the pipeline
+STAGE_LABELS = {
+    "files": "Processing Documents",
+    "parse": "Parsing Pages",
+    "embed": "Embedding Chunks",
+    "index": "Building Index",
+    "node": "Running Agents",
+}
+
+class RequestCancelled(Exception):
+    """Raised by emit() inside a request whose tracker was cancelled."""
+
+class ProgressTracker:
+    """Collects the progress events of one request and computes percentages and ETAs."""
+
+    def __init__(self, request_id: str = None, listeners: List[Callable[[Dict], None]] = None):
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.listeners = list(listeners or [])
+        self._events: "queue.Queue[Dict]" = queue.Queue()
+        self._stage_started: Dict[str, float] = {}
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop the request at its next progress point."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def emit(self, stage: str, current: Optional[int] = None, total: Optional[int] = None, message: str = ""):
+        if self._cancelled.is_set():
+            raise RequestCancelled(f"Request {self.request_id} was cancelled")
+        now = time.monotonic()
+        started = self._stage_started.setdefault(stage, now)
+        percent, eta = None, None
+        if current is not None and total:
+            percent = round(min(current, total) * 100.0 / total, 1)
+            if 0 < current < total:
+                eta = round((now - started) / current * (total - current), 1)
+            if current >= total:
+                # Next run of this stage (e.g. the next file) restarts its clock
+                self._stage_started.pop(stage, None)
+
+        event = {
+            "request_id": self.request_id,
+            "stage": stage,
+            "label": STAGE_LABELS.get(stage, stage),
+            "current": current,
+            "total": total,
+            "percent": percent,
+            "eta_seconds": eta,
+            "message": message,
+            "time": time.time(),
+        }
+        self._events.put(event)
+        for listener in self.listeners:
+            listener(event)
+
+    def next_event(self, timeout: float = None) -> Optional[Dict]:
+        """Next queued event, or None if none arrives within the timeout."""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Call fn with this tracker receiving every event emitted underneath it."""
+        token = _current_tracker.set(self)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_tracker.reset(token)
+
+def current_tracker() -> Optional[ProgressTracker]:
+    return _current_tracker.get()
+
+def emit(stage: str, current: Optional[int] = None, total: Optional[int] = None, message: str = ""):
+    """
+    Report progress to the active request's tracker; a no-op outside a tracked request.
+    Raises RequestCancelled when that request has been cancelled.
+    """
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.emit(stage, current, total, message)
+
+def bind(fn: Callable) -> Callable:
+    """Wrap fn so it runs in the caller's context (tracker included) on another thread."""
+    context = contextvars.copy_context()
+    # Each call gets its own copy: a context can only be entered by one thread at a time
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
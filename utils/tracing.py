@@ -0,0 +1,142 @@
+"""
+OpenTelemetry tracing for ingestion, retrieval and the agent workflow.
+
+Spans are always created through the OpenTelemetry API, which is a no-op until
+`setup_tracing()` installs a provider (TRACING_ENABLED). Each UI submission, API
+job or batch question runs under a root span carrying its `request.id`, so its
+spans can be found next to the ID shown to the user. The OTel context lives in
+context variables, so `utils.progress.bind` carries it into worker threads too.
+"""
+import json
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from langchain_core.callbacks import BaseCallbackHandler
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import Status, StatusCode
+
+from config.settings import settings
+
+tracer = trace.get_tracer("docchat")
+
+_setup_lock = threading.Lock()
+_configured = False
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends finished spans to a local file, one OTel JSON span per line."""
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or settings.TRACING_FILE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [json.dumps(json.loads(span.to_json())) for span in spans]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+def setup_tracing() -> bool:
+    """Install the tracer provider and exporter from settings; returns whether tracing is on."""
+    global _configured
+    if not settings.TRACING_ENABLED:
+        return False
+    with _setup_lock:
+        if _configured:
+            return True
+        exporter_name = settings.TRACING_EXPORTER.lower()
+        if exporter_name == "otlp":
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+        elif exporter_name == "console":
+            exporter = ConsoleSpanExporter()
+        elif exporter_name == "file":
+            exporter = JsonlSpanExporter()
+        else:
+            raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+
+        provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _configured = True
+        return True
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+def span(name: str, attributes: Optional[Dict] = None):
+    """Start a child span of the current one; use as a context manager."""
+    return tracer.start_as_current_span(name, attributes=_clean(attributes))
+
+@contextmanager
+def request_span(name: str, request_id: str, attributes: Optional[Dict] = None):
+    """Root span of one user-visible request, tagged with its request ID."""
+    with tracer.start_as_current_span(name, attributes=_clean({**(attributes or {}), "request.id": request_id})) as root:
+        yield root
+
+def record_llm_usage(current, response):
+    """Copy prompt/completion token counts from a chat model response onto a span."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    metadata = getattr(response, "response_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens", metadata.get("prompt_eval_count"))
+    completion_tokens = usage.get("output_tokens", metadata.get("eval_count"))
+    if prompt_tokens is not None:
+        current.set_attribute("gen_ai.usage.input_tokens", prompt_tokens)
+    if completion_tokens is not None:
+        current.set_attribute("gen_ai.usage.output_tokens", completion_tokens)
+
+def _clean(attributes: Optional[Dict]) -> Dict:
+    """OTel attributes cannot be None."""
+    return {k: v for k, v in (attributes or {}).items() if v is not None}
+
+class RetrieverSpanHandler(BaseCallbackHandler):
+    """
+    LangChain callback that opens a span per retriever run, so the ensemble and
+    its BM25 and vector searches each show up with their own latency.
+    """
+
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, name: str = None, **kwargs):
+        with self._lock:
+            parent = self._spans.get(parent_run_id)
+        # Nest under the enclosing retriever run (the ensemble), else the current span
+        context = trace.set_span_in_context(parent) if parent is not None else None
+        current = tracer.start_span(
+            f"retrieve.{name or 'retriever'}", context=context, attributes={"retriever.query_chars": len(query)}
+        )
+        with self._lock:
+            self._spans[run_id] = current
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        with self._lock:
+            current = self._spans.pop(run_id, None)
+        if current is not None:
+            current.set_attribute("retriever.documents", len(documents))
+            current.end()
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            current = self._spans.pop(run_id, None)
+        if current is not None:
+            current.record_exception(error)
+            current.set_status(Status(StatusCode.ERROR, str(error)))
+            current.end()
+
+retriever_span_handler = RetrieverSpanHandler()